@@ -43,6 +43,12 @@
 #-------------------------------------------------------------------------------
 # Imports
 #-------------------------------------------------------------------------------
-from netlist2ss.netlist2ss import netlist2ss 
+from netlist2ss.netlist2ss import netlist2ss, Circuit
+from netlist2ss.numeric    import netlist2ss_numeric
+from netlist2ss.sweep      import netlist2ss_sweep, compileABCD
+from netlist2ss.tf         import transferMatrix
+from netlist2ss.mnatf      import mnaTransferMatrix
+from netlist2ss.ac         import ac_sweep
+from netlist2ss.canon      import netlistHash
 
 
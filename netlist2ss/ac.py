@@ -0,0 +1,280 @@
+## @package ac
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 23:12:48
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module calculates the frequency response of a circuit numerically
+#  for many frequencies at once. Two methods are available:
+#
+#  mna:        the nodal analysis system in the Laplace domain is stamped once
+#              as M0 + s*M1 on the union of both sparsity patterns, so the
+#              matrix of each frequency is a vectorized combination of two
+#              data arrays. The fill-reducing column ordering is calculated
+#              once and reused by the sparse LU of every frequency.
+#  hessenberg: the numeric A, B, C, and D matrices are calculated once and A
+#              is reduced to the upper Hessenberg form, so (sI - A) is solved
+#              in O(n^2) for all frequencies at once. This is the best choice
+#              for many frequencies and few states.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import numpy as np
+import scipy.linalg as la
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import sympy as si
+from   netlist2ss.netlist2ss import Error, netlistParser, calcNodesnJ, \
+                                   parseInputs
+from   netlist2ss.numeric    import dual, evalValue, deviceValues, \
+                                   storeParams, netlist2ss_numeric
+from   netlist2ss.mnatf      import sDomainMNA, sDomainOutputs
+
+#-------------------------------------------------------------------------------
+# Methods accepted by ac_sweep
+#-------------------------------------------------------------------------------
+acMethods = ['mna', 'hessenberg']
+
+#-------------------------------------------------------------------------------
+# Number of frequencies solved at once by hessenbergResponse
+#-------------------------------------------------------------------------------
+acChunk = 1024
+
+#-------------------------------------------------------------------------------
+# sharedPattern
+# Build the CSC pattern shared by M0 and M1 (with the columns in the order
+# given by perm) and the data arrays of M0 and M1 aligned with this pattern
+#
+# -Inputs
+# M0:   Dictionary of keys of the part of the matrix that doesn't depend on s
+# M1:   Dictionary of keys of the part of the matrix multiplied by s
+# n:    Size of the matrix
+# perm: Column of the original matrix used in each column of the pattern
+# -Outputs
+# indices, indptr: CSC pattern
+# d0, d1:          data arrays of M0 and M1 aligned with the pattern
+#-------------------------------------------------------------------------------
+def sharedPattern(M0, M1, n, perm):
+    pos  = np.empty(n, dtype = int)
+    pos[perm] = np.arange(0, n)
+    keys = sorted(set(M0) | set(M1), key = lambda key: (pos[key[1]], key[0]))
+    indices = np.array([key[0] for key in keys], dtype = np.int32)
+    cols    = np.array([pos[key[1]] for key in keys], dtype = int)
+    indptr  = np.searchsorted(cols, np.arange(0, n + 1)).astype(np.int32)
+    d0 = np.array([M0.get(key, 0.0) for key in keys], dtype = float)
+    d1 = np.array([M1.get(key, 0.0) for key in keys], dtype = float)
+    return (indices, indptr, d0, d1)
+
+#-------------------------------------------------------------------------------
+# mnaResponse
+# Frequency response from the nodal analysis in the Laplace domain. The
+# column ordering of the sparse LU is calculated once at a reference frequency
+# and the matrix of every frequency is built directly in this order
+#
+# -Inputs
+# M0, M1: Dictionaries of keys of M(s) = M0 + s*M1 (floats)
+# b:      (n, nIn) array with the small signal excitation of each input
+# c:      (nOut, n) array with the output equations
+# d:      (nOut, nIn) array with the direct terms
+# s:      array with the complex frequencies
+# -Outputs
+# H:      (len(s), nOut, nIn) complex array
+#-------------------------------------------------------------------------------
+def mnaResponse(M0, M1, b, c, d, s):
+    n = b.shape[0]
+    H = np.zeros((len(s), c.shape[0], b.shape[1]), dtype = complex)
+    if len(s) == 0:
+        return H
+    (indices, indptr, d0, d1) = sharedPattern(M0, M1, n, np.arange(0, n))
+    ref = sp.csc_matrix((d0 + s[len(s)//2]*d1, indices, indptr), \
+                        shape = (n, n))
+    try:
+        perm = spla.splu(ref).perm_c
+    except RuntimeError:
+        perm = np.arange(0, n)
+    (indices, indptr, d0, d1) = sharedPattern(M0, M1, n, perm)
+    for k in range(0, len(s)):
+        Mk = sp.csc_matrix((d0 + s[k]*d1, indices, indptr), shape = (n, n))
+        try:
+            y = spla.splu(Mk, permc_spec = 'NATURAL').solve(b.astype(complex))
+        except RuntimeError:
+            raise Error('Unable to solve the linear system at s = ' + \
+                        str(s[k]) + '. Check the netlist')
+        H[k] = c[:, perm] @ y + d
+    return H
+
+#-------------------------------------------------------------------------------
+# hessenbergResponse
+# Frequency response of a space state model. A is reduced to the upper
+# Hessenberg form H = Q'*A*Q once, and (sI - H)*x = Q'*B is solved for all
+# frequencies at once by the Gaussian elimination with partial pivoting, which
+# only needs to eliminate the subdiagonal.
+#
+# -Inputs
+# A, B, C, D: numeric space state matrices (numpy arrays)
+# s:          array with the complex frequencies
+# -Outputs
+# H:          (len(s), nOut, nIn) complex array
+#-------------------------------------------------------------------------------
+def hessenbergResponse(A, B, C, D, s):
+    n = A.shape[0]
+    H = np.zeros((len(s), C.shape[0], B.shape[1]), dtype = complex)
+    H[:] = D
+    if n == 0:
+        return H
+    (Hs, Q) = la.hessenberg(A, calc_q = True)
+    Bq = Q.T @ B
+    Cq = C @ Q
+    for start in range(0, len(s), acChunk):
+        sk = s[start:start + acChunk]
+        M  = sk[:, None, None]*np.eye(n) - Hs[None, :, :]
+        Y  = np.broadcast_to(Bq, (len(sk),) + Bq.shape).astype(complex)
+        for k in range(0, n - 1):
+            swap = np.abs(M[:, k + 1, k]) > np.abs(M[:, k, k])
+            top  = M[swap, k, k:]
+            M[swap, k, k:]     = M[swap, k + 1, k:]
+            M[swap, k + 1, k:] = top
+            top  = Y[swap, k, :]
+            Y[swap, k, :]      = Y[swap, k + 1, :]
+            Y[swap, k + 1, :]  = top
+            l = M[:, k + 1, k]/M[:, k, k]
+            M[:, k + 1, k:] = M[:, k + 1, k:] - l[:, None]*M[:, k, k:]
+            Y[:, k + 1, :]  = Y[:, k + 1, :]  - l[:, None]*Y[:, k, :]
+        X = np.zeros(Y.shape, dtype = complex)
+        for k in range(n - 1, -1, -1):
+            acc = Y[:, k, :] - np.einsum('fj,fjm->fm', M[:, k, k + 1:], \
+                                         X[:, k + 1:, :])
+            X[:, k, :] = acc/M[:, k, k][:, None]
+        H[start:start + acChunk] = H[start:start + acChunk] + \
+                                   np.einsum('oj,fjm->fom', Cq, X)
+    return H
+
+#-------------------------------------------------------------------------------
+# ac_sweep
+# Numeric frequency response of a circuit. Every symbol used in the netlist
+# must be given a numeric value in params, including the inputs, whose values
+# define the operating point about which the circuit is linearized. The
+# .PARAM lines of the netlist give the default values.
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   a list containing the name of variables consired to be the  inputs
+#           of the system
+# outputs:  A list containing the desired measurements from  which  the output
+#           equations will be built
+# freqs:    array with the frequencies (Hz)
+# params:   dictionary mapping the name of each parameter into its value
+# method:   'mna' (sparse LU of the nodal analysis system at each frequency) or
+#           'hessenberg' (Hessenberg reduction of the numeric A matrix)
+# -Outputs
+# H: (len(freqs), nOut, nIn) complex array where H[k, i, j] is the response of
+#    the output i to the input j at freqs[k]
+#
+# -example:
+# H = ac_sweep("v1 n1 gnd in\nr1 n1 c1 r1\nc1 c1 gnd c1", ["in"], ["Vnc1"],
+#              np.logspace(3, 9, 1000), {"in": 1, "r1": 1e3, "c1": 1e-9})
+#-------------------------------------------------------------------------------
+def ac_sweep(netlist, inputs, outputs, freqs, params = {}, method = 'mna'):
+    if not method in acMethods:
+        raise Error("Unknown method: " + str(method) + ". Use one of " + \
+                    str(acMethods))
+    s = 2j*np.pi*np.asarray(freqs, dtype = float).reshape(-1)
+    if method == 'hessenberg':
+        (A, B, C, D, DC_OP) = netlist2ss_numeric(netlist, inputs, outputs, \
+                                                 params)
+        return hessenbergResponse(A, B, C, D, s)
+
+    #---------------------------------------------------------------------------
+    # Stamp the devices. The dependency on the inputs is carried by dual numbers
+    #---------------------------------------------------------------------------
+    (compDict, compList) = netlistParser(netlist, True)
+    (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+    P  = storeParams(compList.store, params, inputs)
+    U  = parseInputs(inputs)
+    nU = len(inputs)
+    values = deviceValues(compList, P, U, 0)
+    (A0, A1, Zdok, ind) = sDomainMNA(compList, nJ, nNodes, nodesDict, values)
+    n  = nNodes + nJ + len(ind)
+    M0 = {}
+    dM = [{} for k in range(0, nU)]
+    for (key, v) in A0.items():
+        if isinstance(v, dual):
+            for (k, dv) in v.grad.items():
+                dM[k][key] = dv
+            v = v.val
+        M0[key] = float(v)
+    M1 = {}
+    for (key, v) in A1.items():
+        if isinstance(v, dual):
+            raise Error("The inputs change the value of reactive devices. " + \
+                        "Use the hessenberg method")
+        M1[key] = float(v)
+    z0 = np.zeros(n)
+    b  = np.zeros((n, nU))
+    for ((r, c), v) in Zdok.items():
+        if isinstance(v, dual):
+            for (k, dv) in v.grad.items():
+                b[r, k] = dv
+            v = v.val
+        z0[r] = v
+
+    #---------------------------------------------------------------------------
+    # Output equations. The operating point (the solution at s = 0) is only
+    # calculated when the inputs change the matrix or the outputs aren't linear
+    #---------------------------------------------------------------------------
+    (X, G) = sDomainOutputs(compDict, compList, nJ, nNodes, nodesDict, ind, \
+                            outputs)
+    unknowns = set(X)
+    index    = {X[i]: i for i in range(0, n)}
+    index.update({U[i]: n + i for i in range(0, nU)})
+    grads    = [[(index[sym], si.diff(G[i], sym)) for sym in G[i].free_symbols \
+                 if sym in index] for i in range(0, len(outputs))]
+    needOP   = any([len(dMk) != 0 for dMk in dM]) or \
+               any([len(expr.free_symbols & unknowns) != 0 \
+                    for row in grads for (k, expr) in row])
+    point    = dict(P)
+    if needOP:
+        try:
+            x0 = spla.splu(sp.csc_matrix((list(M0.values()), \
+                                          ([key[0] for key in M0], \
+                                           [key[1] for key in M0])), \
+                                         shape = (n, n))).solve(z0)
+        except RuntimeError:
+            raise Error("Unable to find the operating point. Use the " + \
+                        "hessenberg method")
+        point.update({X[i]: float(x0[i]) for i in range(0, n)})
+        for k in range(0, nU):
+            for ((r, c), dv) in dM[k].items():
+                b[r, k] = b[r, k] - dv*x0[c]
+    cd = np.zeros((len(outputs), n + nU))
+    for i in range(0, len(outputs)):
+        for (k, expr) in grads[i]:
+            cd[i, k] = evalValue(expr, point)
+    return mnaResponse(M0, M1, b, cd[:, 0:n], cd[:, n:], s)
@@ -0,0 +1,424 @@
+## @package bench
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 03:05:52
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#      This module contains a benchmark suite of netlist2ss. The circuits are
+#  built by generators parameterized by their size (RC and LC ladders,  RLC
+#  meshes, cascaded OTA stages based on examples/simOta.sp, and cascaded buck
+#  converters based on the averaged model of examples/buck_ccm.sp), and each
+#  stage of netlist2ss plus the transfer function of sisotf is timed for each
+#  size. The results are stored as JSON baselines, and a new run is compared
+#  against a baseline to find the regressions. The times depend on the machine,
+#  so a baseline must be taken on the same machine as the runs compared to it.
+#
+#      The netlist2ss-bench command is added when you install this package:
+#
+#      netlist2ss-bench --save baseline.json
+#      netlist2ss-bench --compare baseline.json
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import sys
+import json
+import time
+import platform
+import argparse
+from   sympy.core.cache  import clear_cache
+from   netlist2ss.sisotf import transferFunctions
+from   netlist2ss.numeric import netlist2ss_numeric
+from   netlist2ss.netlist2ss import simplifyLevels
+from   netlist2ss.cache  import cacheVersion
+
+#-------------------------------------------------------------------------------
+# rcLadder
+# RC ladder with n sections driven by a voltage source
+#
+# -Inputs
+# n: number of sections (and states)
+# -Outputs
+# netlist: string with the netlist
+# inputs:  list of inputs
+# outputs: list of outputs
+#-------------------------------------------------------------------------------
+def rcLadder(n):
+    lines = ["V1 n0 0 VIN"]
+    for k in range(1, n + 1):
+        lines.append("R%d n%d n%d R%d" % (k, k - 1, k, k))
+        lines.append("C%d n%d 0 C%d" % (k, k, k))
+    return ('\n'.join(lines) + '\n', ['VIN'], ['Vnn' + str(n)])
+
+#-------------------------------------------------------------------------------
+# lcLadder
+# LC low pass ladder with n sections between a source and a load resistor
+#
+# -Inputs
+# n: number of sections (2n states)
+# -Outputs
+# netlist, inputs, outputs: see rcLadder
+#-------------------------------------------------------------------------------
+def lcLadder(n):
+    lines = ["V1 in 0 VIN", "RS in n0 RS"]
+    for k in range(1, n + 1):
+        lines.append("L%d n%d n%d L%d" % (k, k - 1, k, k))
+        lines.append("C%d n%d 0 C%d" % (k, k, k))
+    lines.append("RL n%d 0 RL" % n)
+    return ('\n'.join(lines) + '\n', ['VIN'], ['Vnn' + str(n)])
+
+#-------------------------------------------------------------------------------
+# rlcMesh
+# n by n mesh of resistors driven through an inductor and loaded by a
+# capacitor at the opposite corner
+#
+# -Inputs
+# n: number of nodes of each side of the mesh (2 states)
+# -Outputs
+# netlist, inputs, outputs: see rcLadder
+#-------------------------------------------------------------------------------
+def rlcMesh(n):
+    lines = ["V1 in 0 VIN", "L1 in a0x0 L1"]
+    for i in range(0, n):
+        for j in range(0, n):
+            if j + 1 < n:
+                lines.append("RH%dx%d a%dx%d a%dx%d RH%dx%d" % \
+                             (i, j, i, j, i, j + 1, i, j))
+            if i + 1 < n:
+                lines.append("RV%dx%d a%dx%d a%dx%d RV%dx%d" % \
+                             (i, j, i, j, i + 1, j, i, j))
+    out = "a%dx%d" % (n - 1, n - 1)
+    lines.append("RL " + out + " 0 RL")
+    lines.append("CL " + out + " 0 CL")
+    return ('\n'.join(lines) + '\n', ['VIN'], ['Vn' + out])
+
+#-------------------------------------------------------------------------------
+# otaCascade
+# Cascade of n two stage OTAs (the model of examples/simOta.sp). The output of
+# each OTA drives the positive input of the next one
+#
+# -Inputs
+# n: number of OTAs (4 states each)
+# -Outputs
+# netlist, inputs, outputs: see rcLadder
+#-------------------------------------------------------------------------------
+def otaCascade(n):
+    lines = ["V1 in1s1 gnd vc-vd/2", "V2 in2s1 gnd vc+vd/2"]
+    for k in range(1, n + 1):
+        if k > 1:
+            lines.append("V%d in2s%d gnd vc" % (k + 1, k))
+            lines.append("E%d in1s%d gnd voutps%d gnd 1" % (k, k, k - 1))
+        lines = lines + [line.replace('#', str(k)) for line in [
+            "G1s# outpair1s# cms# in1s# cms# gmpairs#",
+            "G2s# outpair2s# cms# in2s# cms# gmpairs#",
+            "R1s# outpair1s# gnd 1/gm2s#",
+            "C1s# outpair1s# gnd cp2s#*(1+ks#)",
+            "R2s# outpair2s# gnd 1/gm2s#",
+            "C2s# outpair2s# gnd cp2s#*(1+ks#)",
+            "G3s# voutns# gnd outpair1s# gnd gm2s#",
+            "G4s# voutps# gnd outpair2s# gnd gm2s#",
+            "R3s# voutns# gnd 1/gm3s#",
+            "C3s# voutns# gnd 2*cp3s#",
+            "G5s# voutps# gnd voutns# gnd gm3s#",
+            "CLs# voutps# gnd cls#",
+            "ROs# voutps# gnd 1/(gds2s#+gds3s#)"]]
+    return ('\n'.join(lines) + '\n', ['vd'], ['Vnvoutps' + str(n)])
+
+#-------------------------------------------------------------------------------
+# buckCascade
+# Cascade of n buck converters (the averaged model of examples/buck_ccm.sp).
+# The output of each converter is the input of the next one
+#
+# -Inputs
+# n: number of converters (2 states each)
+# -Outputs
+# netlist, inputs, outputs: see rcLadder
+#-------------------------------------------------------------------------------
+def buckCascade(n):
+    lines = ["VIN VOUT0 GND VIN"]
+    for k in range(1, n + 1):
+        lines = lines + [line.replace('#', str(k)).replace('@', str(k - 1)) \
+                         for line in [
+            "EIN# N1s# GND VOUT@ GND Duty#",
+            "FIN# VOUT@ GND N1s# N2s# Duty#",
+            "RESR# VOUT# N3s# Resr#",
+            "COUT# N3s# GND Cout#",
+            "LIN# N2s# VOUT# L#",
+            "ROUT# VOUT# GND Rload#"]]
+    return ('\n'.join(lines) + '\n', ['VIN'], ['VnVOUT' + str(n)])
+
+#-------------------------------------------------------------------------------
+# numericLadder
+# Ladder of n resistive sections loaded by a capacitor, with a numeric value
+# for each device. It is used to time netlist2ss_numeric
+#
+# -Inputs
+# n: number of sections
+# -Outputs
+# netlist, inputs, outputs: see rcLadder
+# params:  dictionary mapping the name of each parameter into its value
+#-------------------------------------------------------------------------------
+def numericLadder(n):
+    lines  = ["V1 n0 0 VIN"]
+    params = {'VIN': 1.0, 'C1': 1e-9}
+    for k in range(1, n + 1):
+        lines.append("RS%d n%d n%d RS%d" % (k, k - 1, k, k))
+        lines.append("RP%d n%d 0 RP%d" % (k, k, k))
+        params['RS' + str(k)] = 1.0 + k*1e-3
+        params['RP' + str(k)] = 100.0
+    lines.append("C1 n%d 0 C1" % n)
+    return ('\n'.join(lines) + '\n', ['VIN'], ['Vnn' + str(n)], params)
+
+#-------------------------------------------------------------------------------
+# Generators of the suite and the default sizes
+#-------------------------------------------------------------------------------
+generators   = {'rcLadder':    rcLadder,
+                'lcLadder':    lcLadder,
+                'rlcMesh':     rlcMesh,
+                'otaCascade':  otaCascade,
+                'buckCascade': buckCascade}
+defaultSizes = {'rcLadder':    [2, 4, 6],
+                'lcLadder':    [1, 2, 4],
+                'rlcMesh':     [1, 2],
+                'otaCascade':  [1, 2],
+                'buckCascade': [1, 2, 3]}
+
+#-------------------------------------------------------------------------------
+# benchmarkCase
+# Time each stage of one circuit
+#
+# -Inputs
+# name:     name of the generator
+# size:     size of the circuit
+# repeat:   number of runs. The best time of each stage is kept. The sympy
+#           cache is cleared before each run
+# simplify: simplification level (see simplifyMatrix)
+# -Outputs
+# result:   dictionary with the generator, the size, the number of devices,
+#           the best time of each stage (times, including the 'tf' stage of
+#           sisotf), and the best total time
+#-------------------------------------------------------------------------------
+def benchmarkCase(name, size, repeat = 1, simplify = 'cancel'):
+    (netlist, inputs, outputs) = generators[name](size)
+    best = {}
+    for k in range(0, repeat):
+        #The sympy cache would make the next runs faster than the first one
+        clear_cache()
+        start = time.perf_counter()
+        (H, times) = transferFunctions(netlist, inputs, outputs, simplify)
+        times['total'] = time.perf_counter() - start
+        for (stage, elapsed) in times.items():
+            best[stage] = min(best.get(stage, elapsed), elapsed)
+    return {'name': name, 'size': size, \
+            'devices': len(netlist.splitlines()), 'times': best}
+
+#-------------------------------------------------------------------------------
+# numericCase
+# Time netlist2ss_numeric on a numericLadder
+#
+# -Inputs
+# size:   number of sections of the ladder
+# repeat: number of runs. The best time is kept
+# -Outputs
+# result: dictionary with the same keys of benchmarkCase. The only stage is
+#         'total'
+#-------------------------------------------------------------------------------
+def numericCase(size, repeat = 1):
+    (netlist, inputs, outputs, params) = numericLadder(size)
+    best = None
+    for k in range(0, repeat):
+        start = time.perf_counter()
+        netlist2ss_numeric(netlist, inputs, outputs, params)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'name': 'numericLadder', 'size': size, \
+            'devices': len(netlist.splitlines()), 'times': {'total': best}}
+
+#-------------------------------------------------------------------------------
+# runBenchmarks
+# Run the suite
+#
+# -Inputs
+# sizes:    dictionary mapping the name of each generator into a list of sizes
+# repeat:   number of runs of each case
+# simplify: simplification level
+# log:      function called with each result (None for quiet runs)
+# -Outputs
+# baseline: dictionary with the environment and the list of results, ready
+#           for json.dump
+#-------------------------------------------------------------------------------
+def runBenchmarks(sizes = defaultSizes, repeat = 1, simplify = 'cancel', \
+                  log = None):
+    results = []
+    for (name, values) in sizes.items():
+        for size in values:
+            result = benchmarkCase(name, size, repeat, simplify)
+            results.append(result)
+            if log is not None:
+                log(result)
+    return {'version': cacheVersion(), 'python': platform.python_version(), \
+            'machine': platform.machine(), 'simplify': simplify, \
+            'repeat': repeat, 'results': results}
+
+#-------------------------------------------------------------------------------
+# compareBaseline
+# Compare a run against a baseline
+#
+# -Inputs
+# run:       result of runBenchmarks
+# baseline:  result of runBenchmarks stored before
+# tolerance: ratio between the new and the old time that is a regression
+# minTime:   stages faster than this (in seconds) in both runs are ignored,
+#            since their times are mostly noise
+# -Outputs
+# regressions: list of (name, size, stage, old time, new time) sorted by the
+#              ratio between the new and the old time
+#-------------------------------------------------------------------------------
+def compareBaseline(run, baseline, tolerance = 1.5, minTime = 0.05):
+    old = {(res['name'], res['size']): res['times'] \
+           for res in baseline['results']}
+    regressions = []
+    for res in run['results']:
+        times = old.get((res['name'], res['size']))
+        if times is None:
+            continue
+        for (stage, elapsed) in res['times'].items():
+            if not stage in times or max(elapsed, times[stage]) < minTime:
+                continue
+            if elapsed > tolerance*times[stage]:
+                regressions.append((res['name'], res['size'], stage, \
+                                    times[stage], elapsed))
+    return sorted(regressions, key = lambda r: -r[4]/max(r[3], 1e-9))
+
+#-------------------------------------------------------------------------------
+# baselineMismatch
+# Find the differences between the environments of a run and of a baseline
+#
+# -Inputs
+# run:      result of runBenchmarks
+# baseline: result of runBenchmarks stored before
+# -Outputs
+# keys: list of the keys (version, python, machine, simplify) that differ
+#-------------------------------------------------------------------------------
+def baselineMismatch(run, baseline):
+    return [key for key in ['version', 'python', 'machine', 'simplify'] \
+            if run.get(key) != baseline.get(key)]
+
+#-------------------------------------------------------------------------------
+# Format a result as a line of the report
+#-------------------------------------------------------------------------------
+def formatResult(result):
+    stages = ' '.join([stage + "=%.3f" % elapsed for (stage, elapsed) in \
+                       result['times'].items() if stage != 'total'])
+    return "%-12s %3d %5d devices %8.3f s  %s" % (result['name'], \
+           result['size'], result['devices'], result['times']['total'], stages)
+
+#-------------------------------------------------------------------------------
+# Command line interface
+#-------------------------------------------------------------------------------
+def cli():
+
+    #---------------------------------------------------------------------------
+    # Check Arguments
+    #---------------------------------------------------------------------------
+    parser = argparse.ArgumentParser(description = "Benchmark the stages " + \
+                                     "of netlist2ss on synthetic circuits")
+    parser.add_argument('--only', default = None,                         \
+                        help = "comma separated list of generators " +     \
+                               "(default: " + ','.join(generators) + ")")
+    parser.add_argument('--sizes', default = None,                        \
+                        help = "comma separated list of sizes used by " +  \
+                               "all generators (default: per generator)")
+    parser.add_argument('--repeat', type = int, default = 1,              \
+                        help = "number of runs of each case (the best " + \
+                               "time is kept)")
+    parser.add_argument('--simplify', choices = simplifyLevels,           \
+                        default = 'cancel',                               \
+                        help = "simplification level (default: cancel)")
+    parser.add_argument('--save', default = None,                         \
+                        help = "store the results as a JSON baseline")
+    parser.add_argument('--compare', default = None,                      \
+                        help = "JSON baseline to compare against")
+    parser.add_argument('--tolerance', type = float, default = 1.5,       \
+                        help = "slowdown ratio reported as a regression " + \
+                               "(default: 1.5)")
+    parser.add_argument('--numeric', type = int, default = None,          \
+                        help = "time netlist2ss_numeric on a ladder with " + \
+                               "this number of sections instead of the " +  \
+                               "suite")
+    parser.add_argument('--limit', type = float, default = 1.0,           \
+                        help = "time in seconds above which --numeric " +   \
+                               "fails (default: 1.0)")
+    args = parser.parse_args()
+    names = list(generators) if args.only is None else args.only.split(',')
+    for name in names:
+        if not name in generators:
+            parser.error("unknown generator " + name)
+    if args.sizes is None:
+        sizes = {name: defaultSizes[name] for name in names}
+    else:
+        sizes = {name: [int(n) for n in args.sizes.split(',')] \
+                 for name in names}
+
+    #---------------------------------------------------------------------------
+    # Time the numeric version
+    #---------------------------------------------------------------------------
+    if args.numeric is not None:
+        result = numericCase(args.numeric, args.repeat)
+        print(formatResult(result), flush = True)
+        if result['times']['total'] > args.limit:
+            print("REGRESSION numericLadder %d: %.3f s > %.3f s" % \
+                  (args.numeric, result['times']['total'], args.limit))
+            exit(1)
+        exit(0)
+
+    #---------------------------------------------------------------------------
+    # Run the suite
+    #---------------------------------------------------------------------------
+    run = runBenchmarks(sizes, args.repeat, args.simplify, \
+                        lambda res: print(formatResult(res), flush = True))
+    if args.save is not None:
+        with open(args.save, 'w') as handle:
+            json.dump(run, handle, indent = 1)
+    if args.compare is not None:
+        with open(args.compare, 'r') as handle:
+            baseline = json.load(handle)
+        for key in baselineMismatch(run, baseline):
+            print("WARNING the baseline was taken with %s %s (now %s). " \
+                  "Take a new one on this machine with --save" % \
+                  (key, baseline.get(key), run.get(key)), file = sys.stderr)
+        regressions = compareBaseline(run, baseline, args.tolerance)
+        for (name, size, stage, old, new) in regressions:
+            print("REGRESSION %s %d %s: %.3f s -> %.3f s (%.2fx)" % \
+                  (name, size, stage, old, new, new/max(old, 1e-9)))
+        if len(regressions) != 0:
+            exit(1)
+    exit(0)
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,301 @@
+## @package budget
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 04:12:36
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#      This module contains the budgets of the symbolic derivation: a maximum
+#  wall time, a maximum operation count of the expressions (count_ops of  the
+#  result of each stage) and a maximum memory (current resident set size  of
+#  the process, including the interpreter and sympy). A budget is a hook of the
+#  Circuit class, so it is checked at the boundaries of the stages,  and  its
+#  monitor is called inside the loops of the fraction-free solver. Inside  the
+#  solver the size is the number of terms of the polynomials, which is a lower
+#  bound of their operation count.
+#
+#      netlist2ss runs the derivation in a worker process when a budget is
+#  given, so the stages that can't be interrupted (sympy itself) are cancelled
+#  by killing the worker when the time is over. When numeric values of all the
+#  parameters are given, the numeric model (see netlist2ss_numeric) is returned
+#  instead of raising the error.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import os
+import sys
+import time
+import multiprocessing
+from   netlist2ss.netlist2ss import Error
+try:
+    import resource
+except ImportError:
+    resource = None
+
+#-------------------------------------------------------------------------------
+# BudgetError Class
+# Raised when a budget is exceeded
+#
+# The parameters of the constructor are listed bellow:
+# stage: name of the stage that was running (None before the first stage)
+# kind:  'time', 'ops' or 'memory'
+# value: measured value (seconds, operations or bytes)
+# limit: value of the budget
+# ops:   largest operation count of the results so far (None if it isn't
+#        known)
+#-------------------------------------------------------------------------------
+class BudgetError(Error):
+    def __init__(self, stage, kind, value, limit, ops = None):
+        self.stage = stage
+        self.kind  = kind
+        self.limit = limit
+        self.ops   = ops
+        units = {'time': ' s', 'ops': ' ops', 'memory': ' bytes'}[kind]
+        msg   = "Budget exceeded in stage " + str(stage) + ": " + \
+                ("%.4g" % value) + units + " > " + ("%.4g" % limit) + units
+        if ops is not None and kind != 'ops':
+            msg = msg + " (expression size: " + str(ops) + " ops)"
+        Error.__init__(self, msg)
+        self.measured = value
+
+    def __reduce__(self):
+        return (BudgetError, (self.stage, self.kind, self.measured, \
+                              self.limit, self.ops))
+
+#-------------------------------------------------------------------------------
+# residentMemory
+# Current resident set size of the process in bytes (None if it isn't
+# available). The memory freed by the previous stages doesn't count, so a
+# worker that runs several queries isn't stopped by the peak of an old one.
+# Without /proc (macOS) it falls back to the peak resident set size, which
+# never decreases
+#-------------------------------------------------------------------------------
+def residentMemory():
+    try:
+        handle = open('/proc/self/statm', 'r')
+        pages  = int(handle.read().split()[1])
+        handle.close()
+        return pages*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak*1024
+
+#-------------------------------------------------------------------------------
+# largest
+# Largest of two sizes that may be None
+#-------------------------------------------------------------------------------
+def largest(a, b):
+    return a if b is None else (b if a is None else max(a, b))
+
+#-------------------------------------------------------------------------------
+# budget Class
+# Limits of a symbolic derivation. The unset limits are not checked
+#
+# The parameters of the constructor are listed bellow:
+# maxTime:   maximum wall time in seconds
+# maxOps:    maximum operation count of the expressions of a stage
+# maxMemory: maximum resident memory of the process in bytes
+#-------------------------------------------------------------------------------
+class budget:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, maxTime = None, maxOps = None, maxMemory = None):
+        self.maxTime   = maxTime
+        self.maxOps    = maxOps
+        self.maxMemory = maxMemory
+        self.start()
+
+    #---------------------------------------------------------------------------
+    # Start counting the time
+    #---------------------------------------------------------------------------
+    def start(self):
+        self.begin = time.perf_counter()
+        self.stage = None
+        self.ops   = None
+
+    #---------------------------------------------------------------------------
+    # Check the limits
+    #
+    # -Inputs
+    # stage: name of the running stage
+    # ops:   operation count of the expressions (not checked if None)
+    #---------------------------------------------------------------------------
+    def check(self, stage, ops = None):
+        if ops is not None:
+            if self.maxOps is not None and ops > self.maxOps:
+                raise BudgetError(stage, 'ops', ops, self.maxOps)
+        if self.maxTime is not None:
+            elapsed = time.perf_counter() - self.begin
+            if elapsed > self.maxTime:
+                raise BudgetError(stage, 'time', elapsed, self.maxTime, \
+                                  self.ops)
+        if self.maxMemory is not None:
+            used = residentMemory()
+            if used is not None and used > self.maxMemory:
+                raise BudgetError(stage, 'memory', used, self.maxMemory, \
+                                  self.ops)
+
+    #---------------------------------------------------------------------------
+    # Hook interface (see runStage)
+    #---------------------------------------------------------------------------
+    def __call__(self, event, record):
+        if event == 'start':
+            self.stage = record['stage']
+            self.check(self.stage)
+        else:
+            self.ops = largest(self.ops, record.get('ops'))
+            self.check(record['stage'], record.get('ops'))
+
+    #---------------------------------------------------------------------------
+    # Check called inside the loops of the solver
+    #
+    # -Inputs
+    # terms: number of terms of the last polynomial
+    #---------------------------------------------------------------------------
+    def monitor(self, terms):
+        self.check(self.stage, terms)
+
+#-------------------------------------------------------------------------------
+# budgetWorker
+# Run a query of a Circuit in the worker process. The records of the stages are
+# sent to the parent while the stages run, and the result (or the exception)
+# at the end
+#
+# -Inputs
+# conn:    end of the pipe of the worker
+# netlist: A string with a spice netlist
+# inputs:  list of inputs
+# outputs: list of outputs
+# options: dictionary with the other arguments of Circuit
+# limits:  budget of the derivation
+#-------------------------------------------------------------------------------
+def budgetWorker(conn, netlist, inputs, outputs, options, limits):
+    from netlist2ss.netlist2ss import Circuit
+    relay = lambda event, record: conn.send((event, dict(record)))
+    try:
+        circuit = Circuit(netlist, hooks = [relay], budget = limits, \
+                          **options)
+        msg = ('result', circuit.state_space(inputs, outputs))
+    except Exception as e:
+        msg = ('error', e)
+    try:
+        conn.send(msg)
+    except Exception as e:
+        #The exception can't be pickled
+        conn.send(('error', Error(type(e).__name__ + ": " + str(msg[1]))))
+    conn.close()
+
+#-------------------------------------------------------------------------------
+# runBudget
+# Calculate the space state representation of a netlist in a worker process.
+# The worker is killed when the time budget is over
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   list of inputs
+# outputs:  list of outputs
+# options:  dictionary with the other arguments of Circuit (verbose, simplify,
+#           workers, cache and profile)
+# limits:   budget of the derivation
+# hooks:    list of hooks. They run in this process and receive the records
+#           of the worker as the stages run
+# fallback: dictionary with the numeric value of every parameter (see
+#           netlist2ss_numeric). The numeric model is returned when a budget
+#           is exceeded. The BudgetError is raised if None
+# -Outputs
+# A, B, C, D, DC_OP: space state representation (numpy arrays if the numeric
+#                    fallback was used)
+#-------------------------------------------------------------------------------
+def runBudget(netlist, inputs, outputs, options, limits, hooks = [], \
+              fallback = None):
+    try:
+        return runWorker(netlist, inputs, outputs, options, limits, hooks)
+    except BudgetError as e:
+        if fallback is None:
+            raise
+        from netlist2ss.numeric import netlist2ss_numeric
+        record = {'stage': 'fallback', 'reason': str(e.value)}
+        for hook in hooks:
+            hook('start', record)
+        start = time.perf_counter()
+        res   = netlist2ss_numeric(netlist, inputs, outputs, fallback)
+        record['time'] = time.perf_counter() - start
+        for hook in hooks:
+            hook('end', record)
+        return res
+
+#-------------------------------------------------------------------------------
+# runWorker
+# Run budgetWorker and wait for its result (see runBudget)
+#-------------------------------------------------------------------------------
+def runWorker(netlist, inputs, outputs, options, limits, hooks):
+    (parent, child) = multiprocessing.Pipe(duplex = False)
+    #Not daemonic, so the worker can start the processes of parallelSimplify.
+    #It is terminated by the finally clause below
+    worker = multiprocessing.Process(target = budgetWorker, daemon = False, \
+                                     args = (child, netlist, inputs, outputs, \
+                                             options, limits))
+    limits.start()
+    worker.start()
+    child.close()
+    try:
+        while True:
+            wait = None
+            if limits.maxTime is not None:
+                wait = max(0.0, limits.maxTime - \
+                                (time.perf_counter() - limits.begin))
+            if not parent.poll(wait):
+                raise BudgetError(limits.stage, 'time', \
+                                  time.perf_counter() - limits.begin, \
+                                  limits.maxTime, limits.ops)
+            try:
+                (kind, data) = parent.recv()
+            except EOFError:
+                worker.join()
+                raise Error("The worker process died (exit code " + \
+                            str(worker.exitcode) + ")")
+            if kind == 'result':
+                return data
+            if kind == 'error':
+                raise data
+            if kind == 'start':
+                limits.stage = data['stage']
+            else:
+                limits.ops = largest(limits.ops, data.get('ops'))
+            for hook in hooks:
+                hook(kind, data)
+    finally:
+        if worker.is_alive():
+            worker.terminate()
+        worker.join()
+        parent.close()
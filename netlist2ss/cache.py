@@ -0,0 +1,204 @@
+## @package cache
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 00:02:19
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module contains a persistent on-disk cache for the results of the
+#  symbolic derivations. The entries are content addressed: the file name  is
+#  a hash of the netlist, the inputs, the outputs, the options, and a version
+#  key, so upgrading the package (or sympy) invalidates the old entries. The
+#  results are stored as pickles, and the least recently used entries are
+#  removed when the cache grows beyond its maximum size.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import sympy as si
+
+#-------------------------------------------------------------------------------
+# Format of the entries. Increment it whenever the stored results change
+#-------------------------------------------------------------------------------
+cacheFormat = 1
+
+#-------------------------------------------------------------------------------
+# cacheVersion
+# Version key of the cache entries
+#
+# -Outputs
+# version: string with the format of the entries and the versions of
+#          netlist2ss and sympy
+#-------------------------------------------------------------------------------
+def cacheVersion():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            pkg = version('netlist2ss')
+        except PackageNotFoundError:
+            pkg = 'dev'
+    except ImportError:
+        pkg = 'dev'
+    return str(cacheFormat) + '/' + pkg + '/' + si.__version__
+
+#-------------------------------------------------------------------------------
+# diskCache Class
+# Content-addressed cache stored in a directory
+#
+# The parameters of the constructor are listed bellow:
+# directory: path of the directory of the cache (it is created if needed)
+# maxSize:   maximum size of the cache in bytes
+#-------------------------------------------------------------------------------
+class diskCache:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, directory, maxSize = 1 << 30):
+        self.directory = directory
+        self.maxSize   = maxSize
+        self.version   = cacheVersion()
+        os.makedirs(directory, exist_ok = True)
+
+    #---------------------------------------------------------------------------
+    # Calculate the key of a query
+    #
+    # -Inputs
+    # netlist: A string with a spice netlist
+    # inputs:  list of input variables
+    # outputs: list of output measurements
+    # options: dictionary with the options that change the results
+    # -Outputs
+    # key:     hexadecimal string
+    #---------------------------------------------------------------------------
+    def key(self, netlist, inputs, outputs, options = {}):
+        data = json.dumps([self.version, netlist, list(inputs), \
+                           list(outputs), options], sort_keys = True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    #---------------------------------------------------------------------------
+    # Path of the file of an entry
+    #---------------------------------------------------------------------------
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    #---------------------------------------------------------------------------
+    # Read an entry. The access time of the entry is updated, so it becomes
+    # the most recently used one
+    #
+    # -Inputs
+    # key:   key of the entry
+    # -Outputs
+    # value: The stored value or None if there isn't such entry
+    #---------------------------------------------------------------------------
+    def get(self, key):
+        path = self.path(key)
+        try:
+            handle = open(path, 'rb')
+        except OSError:
+            return None
+        try:
+            value = pickle.load(handle)
+        except Exception:
+            #Corrupted entries are removed
+            handle.close()
+            self.remove(path)
+            return None
+        handle.close()
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    #---------------------------------------------------------------------------
+    # Store an entry. The file is written apart and renamed, so readers never
+    # see a partial entry. The least recently used entries are removed if the
+    # cache is too big
+    #
+    # -Inputs
+    # key:   key of the entry
+    # value: value to be stored
+    #---------------------------------------------------------------------------
+    def put(self, key, value):
+        (fd, tmp) = tempfile.mkstemp(dir = self.directory, suffix = '.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            pickle.dump(value, handle, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    #---------------------------------------------------------------------------
+    # Remove the least recently used entries until the size of the cache is at
+    # most maxSize
+    #---------------------------------------------------------------------------
+    def evict(self):
+        entries = []
+        total   = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total = total + st.st_size
+        entries.sort()
+        for (mtime, size, path) in entries:
+            if total <= self.maxSize:
+                break
+            self.remove(path)
+            total = total - size
+
+    #---------------------------------------------------------------------------
+    # Remove all entries
+    #---------------------------------------------------------------------------
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                self.remove(entry.path)
+
+    #---------------------------------------------------------------------------
+    # Remove a file ignoring the errors (another process may have removed it)
+    #---------------------------------------------------------------------------
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    #---------------------------------------------------------------------------
+    # Size of the cache in bytes
+    #---------------------------------------------------------------------------
+    def size(self):
+        return sum([entry.stat().st_size for entry in \
+                    os.scandir(self.directory) if entry.name.endswith('.pkl')])
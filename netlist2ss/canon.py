@@ -0,0 +1,166 @@
+## @package canon
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 01:12:44
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module calculates a canonical form of a netlist, so netlists  that
+#  describe the same circuit get the same hash. The canonical form is built from
+#  the output of the netlistParser (whitespace and comments are already gone):
+#
+#  - the devices are sorted by name;
+#  - all ground aliases (0, GND, gnd, etc) become 0;
+#  - the values are written as canceled sympy expressions, so 2*R and R+R  are
+#    the same value;
+#  - the nets that aren't ports are renamed #1, #2, ... in the  order  of  the
+#    first device terminal connected to them.
+#
+#  The devices keep their names (the measurements and the states refer to them),
+#  so the net renaming is exact: two netlists have the same canonical form  if
+#  and only if there is a net renaming, preserving the ports, that maps one into
+#  the other.
+#
+#      The instances of subcircuits come after the devices (sorted by name), and
+#  they are followed by the definitions of the subcircuits, whose ports keep
+#  their names. The nets of a definition measured by hierarchical names (the
+#  net m of X1.m) keep their names as well.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import hashlib
+import sympy as si
+from   netlist2ss.netlist2ss import netlistParser, componentDict
+
+#-------------------------------------------------------------------------------
+# isGround
+# Check if a net name is an alias of the ground
+#-------------------------------------------------------------------------------
+def isGround(net):
+    return net.upper() == 'GND' or net == '0'
+
+#-------------------------------------------------------------------------------
+# canonicalValue
+# Canonical string of the value of a device
+#
+# -Inputs
+# value: sympy expression
+# -Outputs
+# text:  string that is the same for equivalent rational expressions
+#-------------------------------------------------------------------------------
+def canonicalValue(value):
+    try:
+        value = si.cancel(value)
+    except Exception:
+        pass
+    return si.srepr(value)
+
+#-------------------------------------------------------------------------------
+# canonicalNetlist
+# Canonical form of a parsed netlist
+#
+# -Inputs
+# compDict: The component dictionary generated by the netlistParser
+# ports:    list with the net names that keep their names (the nets used by the
+#           measurements, for example)
+# subckts:  Write the definitions of the subcircuits after the instances
+# measured: dictionary mapping the name of the definitions into the nets that
+#           keep their names besides the ports (see measuredNets)
+# -Outputs
+# text:     string with one device per line. It is used for hashing and it isn't
+#           a valid netlist
+#-------------------------------------------------------------------------------
+def canonicalNetlist(compDict, ports = [], subckts = True, measured = {}):
+    ports = set(ports)
+    nets  = {}
+    lines = []
+    for name in sorted(compDict.keys()):
+        comp  = compDict[name]
+        nodes = canonicalNets(comp.getNodes(), ports, nets)
+        lines.append(' '.join([name] + nodes + \
+                              [canonicalValue(comp.getValue())]))
+    store = getattr(compDict, 'store', None)
+    if store is None or len(store.instances) == 0:
+        return '\n'.join(lines) + '\n'
+    for name in sorted(store.instances.keys()):
+        inst  = store.instances[name]
+        nodes = canonicalNets(inst.getNodes(), ports, nets)
+        lines.append(' '.join([name] + nodes + [inst.getSubckt()]))
+    #The definitions are shared by the netlist and by the definitions, so
+    #they are written once
+    for name in sorted(store.subckts.keys() if subckts else []):
+        defn = store.subckts[name]
+        lines.append(' '.join(['.SUBCKT', name] + defn.ports))
+        keep = defn.ports + sorted(measured.get(name, set()))
+        lines.append(canonicalNetlist(componentDict(defn.store), keep, \
+                                      False) + '.ENDS')
+    return '\n'.join(lines) + '\n'
+
+#-------------------------------------------------------------------------------
+# canonicalNets
+# Rename the nets of a device (see canonicalNetlist)
+#
+# -Inputs
+# nodes: list with the nets of the device
+# ports: set with the nets that keep their names
+# nets:  dictionary mapping the nets into their new names (it is updated)
+# -Outputs
+# nodes: list with the new names
+#-------------------------------------------------------------------------------
+def canonicalNets(nodes, ports, nets):
+    names = []
+    for net in nodes:
+        if isGround(net):
+            net = '0'
+        elif not net in ports:
+            if not net in nets:
+                nets[net] = '#' + str(len(nets) + 1)
+            net = nets[net]
+        names.append(net)
+    return names
+
+#-------------------------------------------------------------------------------
+# netlistHash
+# Structural hash of a netlist. It doesn't change when the devices are
+# reordered, the internal nets are renamed, the ground alias changes, the
+# whitespace or the comments change, or a value is written in another way
+#
+# -Inputs
+# netlist: A string with a spice netlist
+# ports:   list with the net names that keep their names
+# -Outputs
+# key:     hexadecimal string (sha256 of the canonical form)
+#
+# -example:
+# netlistHash("V1 in 0 VIN\nR1 in x R\nC1 x 0 C", ["x"])
+#-------------------------------------------------------------------------------
+def netlistHash(netlist, ports = []):
+    (compDict, compList) = netlistParser(netlist)
+    text = canonicalNetlist(compDict, ports)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,418 @@
+## @package ffsolve
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 09:12:44
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module contains a fraction-free sparse elimination engine used  to
+#  solve the symbolic nodal analysis system. The entries of the system are
+#  mapped into the polynomial ring of  the circuit parameters, each row is
+#  eliminated using only ring operations, and the common factors of each row
+#  are cancelled after every step in order to avoid expression swell.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import sympy as si
+from   sympy.polys.constructor import construct_domain
+
+#-------------------------------------------------------------------------------
+# polyDomain
+# Find the fraction field of polynomials in which all entries of the  system
+# can be represented exactly.
+#
+# -Inputs
+# values: list of sympy expressions
+# -Outputs
+# K:      The fraction field (sympy FracField) or None if the entries can't be
+#         represented exactly as rational functions (floats, radicals, etc)
+# elems:  The entries converted into elements of K
+#-------------------------------------------------------------------------------
+def polyDomain(values):
+    if len(values) == 0:
+        return (None, [])
+    dom, elems = construct_domain(values, field = True)
+    if not (dom.is_FractionField and dom.is_Exact):
+        return (None, [])
+    return (dom.field, elems)
+
+#-------------------------------------------------------------------------------
+# primitiveRow
+# Cancel the common factor shared by all entries of a row
+#
+# -Inputs
+# row: dictionary mapping the column index into a polynomial
+# -Outputs
+# row: the same row divided by the gcd of its entries
+#-------------------------------------------------------------------------------
+def primitiveRow(row):
+    g = None
+    for p in row.values():
+        g = p if g is None else g.gcd(p)
+        if g == 1 or g == -1:
+            return row
+    if g is None or g == 1:
+        return row
+    return {col: p.exquo(g) for (col, p) in row.items()}
+
+#-------------------------------------------------------------------------------
+# commonTerm
+# Calculate the greatest term (monomial times integer) dividing all the terms
+# of the given polynomials. This is a cheap alternative to the polynomial gcd
+# that cancels the factors introduced when the denominators are cleared.
+#
+# -Inputs
+# polys: list of non-zero polynomials of the same ring
+# -Outputs
+# (monom, coeff): exponent vector and coefficient of the common term
+#-------------------------------------------------------------------------------
+def commonTerm(polys):
+    R     = polys[0].ring
+    monom = None
+    coeff = R.domain.zero
+    for p in polys:
+        for m in p.itermonoms():
+            monom = m if monom is None else R.monomial_gcd(monom, m)
+        coeff = R.domain.gcd(coeff, p.content())
+    return (monom, coeff)
+
+#-------------------------------------------------------------------------------
+# choosePivot
+# Choose the pivot among the active rows using the Markowitz cost of the entry
+# and the size of the polynomial as a tie breaker.
+#
+# -Inputs
+# rows:    dictionary mapping the row index into a sparse row
+# colRows: dictionary mapping the column index into the set of rows in which
+#          the column has a non-zero entry
+# cols:    set of columns that can be used as pivots
+# -Outputs
+# (r, c):  row and column of the pivot, or None if there isn't any
+#-------------------------------------------------------------------------------
+def choosePivot(rows, colRows, cols):
+    best = None
+    for c in cols:
+        nc = len(colRows[c])
+        for r in colRows[c]:
+            cost = ((len(rows[r]) - 1)*(nc - 1), len(rows[r][c]), r, c)
+            if best is None or cost < best:
+                best = cost
+    if best is None:
+        return None
+    return (best[2], best[3])
+
+#-------------------------------------------------------------------------------
+# sparseRows
+# Collect the non-zero entries of the system A*X = Z, map them into the ring of
+# polynomials of the circuit parameters, and clear the denominators  of  each
+# row. The right hand side is stored in the column n of each row.
+#
+# -Inputs
+# A:       Square sympy matrix (dense or sparse)
+# Z:       Column vector with the right hand side
+# -Outputs
+# R:       The polynomial ring (None if the entries  can't be  represented  as
+#          rational functions)
+# rows:    dictionary mapping the row index into a sparse row
+# colRows: dictionary mapping the column index into the set of rows in which
+#          the column has a non-zero entry
+#
+# The scale of each row (see fieldRows) is stored in scales if it isn't None.
+# A ZeroDivisionError is raised if the system doesn't have any entry
+#-------------------------------------------------------------------------------
+def sparseRows(A, Z, scales = None):
+    n    = A.shape[0]
+    keys = [key for (key, v) in A.todok().items() if v != 0]
+    keys = keys + [(key[0], n) for (key, v) in Z.todok().items() if v != 0]
+    vals = [A[key] if key[1] != n else Z[key[0], 0] for key in keys]
+    (K, elems) = polyDomain(vals)
+    if K is None:
+        if len(vals) != 0:
+            return (None, None, None)
+        raise ZeroDivisionError('Singular system')
+    return fieldRows(K, dict(zip(keys, elems)), n, scales)
+
+#-------------------------------------------------------------------------------
+# fieldRows
+# Same as sparseRows, but the entries are already elements of the fraction
+# field
+#
+# -Inputs
+# K:       The fraction field (sympy FracField)
+# entries: dictionary mapping (row, col) into a non-zero element of K
+# n:       Number of unknowns (column n holds the right hand side)
+# scales:  dictionary that receives the factor (element of K) by which each
+#          row was multiplied. Nothing is stored if None
+# -Outputs
+# R, rows, colRows: see sparseRows
+#-------------------------------------------------------------------------------
+def fieldRows(K, entries, n, scales = None):
+    R = K.ring
+    fracRows = {}
+    for (key, elem) in entries.items():
+        fracRows.setdefault(key[0], {})[key[1]] = elem
+    rows = {}
+    for (r, fracRow) in fracRows.items():
+        den = R.one
+        for elem in fracRow.values():
+            den = den.lcm(elem.denom)
+        rows[r] = primitiveRow({c: elem.numer*den.exquo(elem.denom) \
+                                for (c, elem) in fracRow.items()})
+        if scales is not None:
+            c = next(iter(fracRow))
+            scales[r] = K.new(rows[r][c], R.one)/fracRow[c]
+    colRows = {c: set() for c in range(0, n)}
+    for (r, row) in rows.items():
+        for c in row:
+            if c != n:
+                colRows[c].add(r)
+    return (R, rows, colRows)
+
+#-------------------------------------------------------------------------------
+# eliminate
+# Sparse Bareiss elimination. Every entry of the active rows is a minor of the
+# original system, so the common factor introduced by the previous  pivot  is
+# cancelled by an exact division at each step. The columns of the unknowns that
+# are not needed are eliminated first.
+#
+# -Inputs
+# R:       The polynomial ring
+# rows:    dictionary mapping the row index into a sparse row (it is consumed)
+# colRows: dictionary mapping the column index into the set of rows in which
+#          the column has a non-zero entry (it is consumed)
+# n:       Number of unknowns (column n holds the right hand side)
+# needed:  Set with the indexes of the unknowns that must be eliminated last
+# steps:   list that receives, for each step, the index of the pivot row and a
+#          dictionary mapping the other rows into their entry in  the  pivot
+#          column (see forwardSubstitution). Nothing is stored if None
+# prev:    pivot of the previous step, when the elimination of a bordered
+#          system continues (one if None)
+# monitor: function called after each step with the number of terms of the
+#          pivot row. It may raise an exception to stop the elimination
+# -Outputs
+# pivots:  list of (column, pivot row) in the elimination order
+# last:    last pivot, which is the determinant of  the  system  (apart  from
+#          the sign)
+#
+# A ZeroDivisionError is raised if the system is singular
+#-------------------------------------------------------------------------------
+def eliminate(R, rows, colRows, n, needed, steps = None, prev = None, \
+              monitor = None):
+    others  = set(range(0, n)) - needed
+    pending = set(needed)
+    pivots  = []
+    prev    = R.one if prev is None else prev
+    for step in range(0, n):
+        cols  = others if len(others) != 0 else pending
+        pivot = choosePivot(rows, colRows, cols)
+        if pivot is None:
+            raise ZeroDivisionError('Singular system')
+        (p, k) = pivot
+        prow = rows.pop(p)
+        for c in prow:
+            if c != n:
+                colRows[c].discard(p)
+        cols.discard(k)
+        pivots.append((k, prow))
+        a    = prow[k]
+        mult = {}
+        for (r, row) in rows.items():
+            b = row.pop(k, None)
+            if b is None:
+                #Rows without entries in the pivot column are only rescaled
+                if a != prev:
+                    for c in row:
+                        row[c] = (a*row[c]).exquo(prev)
+                continue
+            mult[r] = b
+            for c in set(row) | set(prow):
+                if c == k:
+                    continue
+                v = a*row.get(c, R.zero) - b*prow.get(c, R.zero)
+                if v:
+                    row[c] = v.exquo(prev) if prev != 1 else v
+                    if c != n:
+                        colRows[c].add(r)
+                elif c in row:
+                    del row[c]
+                    if c != n:
+                        colRows[c].discard(r)
+        del colRows[k]
+        prev = a
+        if steps is not None:
+            steps.append((p, mult))
+        if monitor is not None:
+            monitor(sum([len(v) for v in prow.values()]))
+    return (pivots, prev)
+
+#-------------------------------------------------------------------------------
+# forwardSubstitution
+# Apply the steps of a previous elimination to another right hand side, as if
+# it were an extra column of the system. Every entry is still a minor, so the
+# divisions are exact
+#
+# -Inputs
+# R:      The polynomial ring
+# pivots: list of (column, pivot row) returned by eliminate
+# steps:  list of steps recorded by eliminate
+# b:      dictionary mapping the row index into the right hand side (elements
+#         of R, already multiplied by the scale of the row)
+# -Outputs
+# rhs: list with the right hand side of each pivot row (see backSubstitution)
+#-------------------------------------------------------------------------------
+def forwardSubstitution(R, pivots, steps, b):
+    rhs  = []
+    prev = R.one
+    for ((k, prow), (p, mult)) in zip(pivots, steps):
+        a  = prow[k]
+        bp = b.pop(p, R.zero)
+        rhs.append(bp)
+        new = {}
+        for r in (set(b) | set(mult)) if bp else b:
+            v = a*b.get(r, R.zero)
+            if bp and r in mult:
+                v = v - mult[r]*bp
+            if v:
+                new[r] = v.exquo(prev) if prev != 1 else v
+        b    = new
+        prev = a
+    return rhs
+
+#-------------------------------------------------------------------------------
+# backSubstitution
+# Fraction-free back substitution. The last pivot is the determinant of the
+# system (apart from the sign), so det*x_k is a polynomial for every k.  The
+# pivot rows only refer to the unknowns eliminated after them, so the back
+# substitution stops as soon as all needed unknowns are known
+#
+# -Inputs
+# R:       The polynomial ring
+# pivots:  list of (column, pivot row) returned by eliminate
+# det:     last pivot returned by eliminate
+# n:       Number of unknowns (column n holds the right hand side)
+# needed:  Set with the indexes of the unknowns that must be calculated
+# rhs:     right hand side of each pivot row (see forwardSubstitution). The
+#          column n of the pivot rows is used if None
+# N:       Result of a previous call with the same rhs, which is extended
+# monitor: function called with the number of terms of each new unknown
+# -Outputs
+# N: Dictionary mapping the index of the unknown into det*x_k
+#-------------------------------------------------------------------------------
+def backSubstitution(R, pivots, det, n, needed, rhs = None, N = None, \
+                     monitor = None):
+    N = {} if N is None else N
+    for step in range(len(pivots) - 1, -1, -1):
+        if needed.issubset(N):
+            break
+        (k, prow) = pivots[step]
+        if k in N:
+            continue
+        b   = prow.get(n, R.zero) if rhs is None else rhs[step]
+        acc = det*b
+        for (c, v) in prow.items():
+            if c != k and c != n:
+                acc = acc - v*N[c]
+        N[k] = acc.exquo(prow[k])
+        if monitor is not None:
+            monitor(len(N[k]))
+    return N
+
+#-------------------------------------------------------------------------------
+# fractionFreeSolve
+# Solve the linear system A*X = Z using  a  sparse fraction-free  elimination
+# over the polynomial ring of the circuit parameters. The unknowns  that  are
+# not needed are eliminated first, which is the same as computing  the  Schur
+# complement of the system onto the needed unknowns, and the back substitution
+# stops as soon as all needed unknowns are known.
+#
+# -Inputs
+# A:      Square sympy matrix (dense or sparse)
+# Z:      Column vector with the right hand side
+# needed: Indexes of the unknowns that must be calculated (all of them if None)
+# -Outputs
+# X: Dictionary mapping the index of the unknown into its value. None is
+#    returned when the entries can't be represented as rational functions
+#
+# A ZeroDivisionError is raised if the system is singular
+#-------------------------------------------------------------------------------
+def fractionFreeSolve(A, Z, needed = None):
+    n = A.shape[0]
+    (R, rows, colRows) = sparseRows(A, Z)
+    if R is None:
+        return None
+    needed = set(range(0, n)) if needed is None else set(needed)
+    (pivots, det) = eliminate(R, rows, colRows, n, needed)
+    N = backSubstitution(R, pivots, det, n, needed)
+    return {k: polyQuotient(num, det) for (k, num) in N.items()}
+
+#-------------------------------------------------------------------------------
+# polyQuotient
+# Build the sympy expression of num/det cancelling their common term
+#
+# -Inputs
+# num: numerator (element of the polynomial ring)
+# det: denominator (non-zero element of the same ring)
+# -Outputs
+# x:   sympy expression
+#-------------------------------------------------------------------------------
+def polyQuotient(num, det):
+    if not num:
+        return si.S.Zero
+    term = commonTerm([num, det])
+    return num.quo_term(term).as_expr()/det.quo_term(term).as_expr()
+
+#-------------------------------------------------------------------------------
+# factorSystem
+# Eliminate the system A*X = Z and keep everything needed to solve it again
+# for other unknowns (back substitution only) or for other right hand sides
+# (forward and back substitution), without a new elimination
+#
+# -Inputs
+# A:       Square sympy matrix (dense or sparse)
+# Z:       Column vector with the right hand side
+# needed:  Indexes of the unknowns that are eliminated last (all of them if
+#          None)
+# monitor: function called after each step (see eliminate)
+# -Outputs
+# factor: tuple (R, scales, pivots, steps, det) (see sparseRows, eliminate),
+#         or None when the entries can't be represented as rational functions
+#
+# A ZeroDivisionError is raised if the system is singular
+#-------------------------------------------------------------------------------
+def factorSystem(A, Z, needed = None, monitor = None):
+    n      = A.shape[0]
+    scales = {}
+    (R, rows, colRows) = sparseRows(A, Z, scales)
+    if R is None:
+        return None
+    needed = set(range(0, n)) if needed is None else set(needed)
+    steps  = []
+    (pivots, det) = eliminate(R, rows, colRows, n, needed, steps, None, \
+                              monitor)
+    return (R, scales, pivots, steps, det)
@@ -0,0 +1,365 @@
+## @package incremental
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 02:31:08
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module solves the nodal analysis system of a circuit that was
+#  changed after it was solved (a device was added, see Circuit.add_component)
+#  without eliminating it again. The fraction-free elimination of the
+#  original system A0*X = Z0 is kept. The k rows r that changed are written as
+#
+#      A0[r, :]*X + u[r] = Z0[r]
+#      dA[r, :]*X - u[r] = dZ[r]
+#
+#  which is the Woodbury (bordered) form of the low rank change. The  first
+#  equations are the original ones with an extra column per changed row, so
+#  their elimination is a forward substitution of that column. Only the k new
+#  rows (plus the rows of the unknowns added by new devices) are eliminated
+#  against the pivot rows kept from the original elimination, and the k x k
+#  block left at the end is eliminated as usual. The  fraction-free divisions
+#  continue from the last pivot of the original system, so the entries never
+#  grow beyond the size of the ones of a fresh elimination.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+from   netlist2ss.ffsolve import polyDomain, primitiveRow, eliminate, \
+                                 forwardSubstitution, backSubstitution, \
+                                 polyQuotient
+
+#-------------------------------------------------------------------------------
+# unknownKeys
+# Name each unknown of the nodal analysis by the net or by the device it
+# belongs to, so the unknowns can be matched after the netlist changes
+#
+# -Inputs
+# compDict:  The component dictionary generated by the netlistParser
+# nJ:        Size of the J matrix
+# nNodes:    Number of nodes in the nodal analysis
+# nodesDict: Dictionary corelating the net name with the node number
+# -Outputs
+# keys: list with the key of each unknown (in the concatenation of V and J)
+#-------------------------------------------------------------------------------
+def unknownKeys(compDict, nJ, nNodes, nodesDict):
+    keys = [None]*(nNodes + nJ)
+    for (net, i) in nodesDict.items():
+        if i != -1:
+            keys[i] = ('V', net)
+    for (name, comp) in compDict.items():
+        if comp.getE1Idx() is not None:
+            keys[nNodes + comp.getE1Idx()] = ('J', name, 1)
+        if comp.getE2Idx() is not None:
+            keys[nNodes + comp.getE2Idx()] = ('J', name, 2)
+    store = getattr(compDict, 'store', None)
+    if store is not None:
+        for inst in store.instances.values():
+            for (j, e) in enumerate(inst.getCurrents() or []):
+                keys[nNodes + e] = ('J', inst.getName(), j + 1)
+    return keys
+
+#-------------------------------------------------------------------------------
+# rowBasis
+# Find a basis of the space spanned by a set of sparse rows and write each row
+# as a combination of the rows of the basis
+#
+# -Inputs
+# rows:  list of dictionaries mapping the column into a non-zero element of a
+#        field
+# -Outputs
+# basis: list with the indexes of the rows of the basis
+# L:     list with one dictionary per row mapping the position in the basis
+#        into the coefficient of the combination
+#-------------------------------------------------------------------------------
+def rowBasis(rows):
+    echelon = []
+    basis   = []
+    L       = []
+    for (i, row) in enumerate(rows):
+        row   = dict(row)
+        combo = {}
+        for (c, erow, ecombo) in echelon:
+            if not c in row:
+                continue
+            f = row[c]/erow[c]
+            for (col, v) in erow.items():
+                row[col] = row.get(col, v.field.zero) - f*v
+                if not row[col]:
+                    del row[col]
+            for (b, v) in ecombo.items():
+                combo[b] = combo.get(b, v.field.zero) + f*v
+        if len(row) == 0:
+            L.append({b: v for (b, v) in combo.items() if v})
+            continue
+        b = len(basis)
+        basis.append(i)
+        ecombo = {key: -v for (key, v) in combo.items()}
+        ecombo[b] = next(iter(row.values())).field.one
+        echelon.append((next(iter(row)), row, ecombo))
+        L.append({b: ecombo[b]})
+    return (basis, L)
+
+#-------------------------------------------------------------------------------
+# baseSystem Class
+# Factored nodal analysis system used as the starting point of the updates
+#
+# The parameters of the constructor are listed bellow:
+# A:       The A matrix of the nodal analysis (sympy sparse matrix)
+# Z:       The Z matrix of the nodal analysis
+# keys:    The key of each unknown (see unknownKeys)
+# factor:  The factorization of A and Z (see factorSystem)
+# monitor: function called by the back substitution (see backSubstitution)
+#-------------------------------------------------------------------------------
+class baseSystem:
+
+    #---------------------------------------------------------------------------
+    # Updates that change more rows are solved from scratch
+    #---------------------------------------------------------------------------
+    maxRank = 8
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, A, Z, keys, factor, monitor = None):
+        self.A       = {key: v for (key, v) in A.todok().items() if v != 0}
+        self.Z       = {key[0]: v for (key, v) in Z.todok().items() if v != 0}
+        self.keys    = keys
+        self.index   = {key: i for (i, key) in enumerate(keys)}
+        self.factor  = factor
+        self.monitor = monitor
+        self.K       = factor[0].to_field()
+        self.N       = {}
+        self.cols    = {}
+
+    #---------------------------------------------------------------------------
+    # Numerators of the solution of the original system
+    #
+    # -Inputs
+    # needed: set with the indexes (of the original system) of the unknowns
+    # -Outputs
+    # N: Dictionary mapping the index of the unknown into det*x_k
+    #---------------------------------------------------------------------------
+    def solution(self, needed):
+        (R, scales, pivots, steps, det) = self.factor
+        return backSubstitution(R, pivots, det, len(self.keys), needed, None, \
+                                self.N, self.monitor)
+
+    #---------------------------------------------------------------------------
+    # Entries of an extra column in the pivot rows
+    #
+    # -Inputs
+    # coeffs: dictionary mapping the rows (of the original system) into the
+    #         entries of the column (elements of the field of the system)
+    # -Outputs
+    # rhs: list with the entry of each pivot row (see forwardSubstitution)
+    # D:   common denominator of the entries. The extra column multiplies u/D
+    #---------------------------------------------------------------------------
+    def extraColumn(self, coeffs):
+        (R, scales, pivots, steps, det) = self.factor
+        key = tuple(sorted([(r, c.as_expr()) for (r, c) in coeffs.items()], \
+                           key = str))
+        if not key in self.cols:
+            coeffs = {r: c*scales[r] for (r, c) in coeffs.items()}
+            D = R.one
+            for c in coeffs.values():
+                D = D.lcm(c.denom)
+            b = {r: c.numer*D.exquo(c.denom) for (r, c) in coeffs.items()}
+            self.cols[key] = (forwardSubstitution(R, pivots, steps, b), D)
+        return self.cols[key]
+
+    #---------------------------------------------------------------------------
+    # Solve the changed system
+    #
+    # -Inputs
+    # A:      The A matrix of the changed system (sympy sparse matrix)
+    # Z:      The Z matrix of the changed system
+    # keys:   The key of each unknown of the changed system
+    # needed: Indexes of the unknowns that must be calculated
+    # -Outputs
+    # X: Dictionary mapping the index of the unknown into its value, or None if
+    #    the change can't be applied as an update (a device was removed, too
+    #    many rows changed, or the new values aren't rational functions)
+    #
+    # A ZeroDivisionError is raised if the changed system is singular
+    #---------------------------------------------------------------------------
+    def solve(self, A, Z, keys, needed):
+        (R, scales, pivots, steps, det) = self.factor
+        n   = len(self.keys)
+        cur = {key: i for (i, key) in enumerate(keys)}
+        if not set(self.keys).issubset(cur):
+            return None
+        idx = [self.index.get(key) for key in keys]
+        new = [i for i in range(0, len(keys)) if idx[i] is None]
+
+        #-----------------------------------------------------------------------
+        # Rows of the original system that changed
+        #-----------------------------------------------------------------------
+        A0 = {(cur[self.keys[i]], cur[self.keys[j]]): v \
+              for ((i, j), v) in self.A.items()}
+        Z0 = {cur[self.keys[i]]: v for (i, v) in self.Z.items()}
+        A1 = {key: v for (key, v) in A.todok().items() if v != 0}
+        Z1 = {key[0]: v for (key, v) in Z.todok().items() if v != 0}
+        dA = {key: A1.get(key, 0) - A0.get(key, 0) for key in set(A0) | \
+              set(A1) if idx[key[0]] is not None and \
+              A1.get(key, 0) != A0.get(key, 0)}
+        dZ = {r: Z1.get(r, 0) - Z0.get(r, 0) for r in set(Z0) | set(Z1) \
+              if idx[r] is not None and Z1.get(r, 0) != Z0.get(r, 0)}
+        rows = sorted(set([key[0] for key in dA]) | set(dZ))
+        if len(rows) == 0 and len(new) == 0:
+            N = self.solution(set([idx[t] for t in needed]))
+            return {t: polyQuotient(N[idx[t]], det) for t in needed}
+        if len(rows) + len(new) > self.maxRank:
+            return None
+
+        #-----------------------------------------------------------------------
+        # Changes of the rows and rows of the new unknowns in the fraction field
+        # of the original parameters and of the new values. The column n is the
+        # right hand side and the new unknowns come after it
+        #-----------------------------------------------------------------------
+        pos = {t: idx[t] for t in range(0, len(keys)) if idx[t] is not None}
+        entries = {}
+        for (key, v) in dA.items():
+            entries[(rows.index(key[0]), pos.get(key[1]), key[1])] = v
+        for (r, v) in dZ.items():
+            entries[(rows.index(r), n, None)] = v
+        for (key, v) in A1.items():
+            if idx[key[0]] is None:
+                entries[(len(rows) + new.index(key[0]), pos.get(key[1]), \
+                         key[1])] = v
+        for (r, v) in Z1.items():
+            if idx[r] is None:
+                entries[(len(rows) + new.index(r), n, None)] = v
+        (K, elems) = polyDomain(list(entries.values()) + list(self.K.symbols))
+        if K is None:
+            return None
+        changes = [{} for i in range(0, len(rows) + len(new))]
+        for ((i, c, t), elem) in zip(entries.keys(), elems):
+            if elem:
+                changes[i][c if c is not None else ('new', t)] = elem
+
+        #-----------------------------------------------------------------------
+        # The change of a device touches several rows, but the changes of the
+        # rows are usually multiples of each other (rank one for two terminal
+        # devices). Each independent change becomes one extra unknown u[j]
+        # with the column sum(L[i][j]*e[rows[i]])
+        #-----------------------------------------------------------------------
+        (basis, L) = rowBasis(changes[0:len(rows)])
+        k = len(basis)
+        m = len(new)
+        try:
+            extra = [self.extraColumn({idx[rows[i]]: \
+                                       self.K.from_expr(L[i][j].as_expr()) \
+                                       for i in range(0, len(rows)) \
+                                       if j in L[i]}) for j in range(0, k)]
+        except Exception:
+            return None
+        for t in new:
+            pos[t] = n + 1 + k + new.index(t)
+        border = []
+        for i in basis + list(range(len(rows), len(rows) + m)):
+            row = {(pos[c[1]] if isinstance(c, tuple) else c): elem \
+                   for (c, elem) in changes[i].items()}
+            if i < len(rows):
+                j = basis.index(i)
+                row[n + 1 + j] = -K.new(extra[j][1].set_ring(K.ring), \
+                                        K.ring.one)
+            border.append(row)
+
+        #-----------------------------------------------------------------------
+        # Clear the denominators of the new rows
+        #-----------------------------------------------------------------------
+        R1   = K.ring
+        conv = (lambda p: p) if R1 == R else (lambda p: p.set_ring(R1))
+        for i in range(0, k + m):
+            if len(border[i]) == 0:
+                raise ZeroDivisionError('Singular system')
+            den = R1.one
+            for elem in border[i].values():
+                den = den.lcm(elem.denom)
+            border[i] = primitiveRow({c: elem.numer*den.exquo(elem.denom) \
+                                      for (c, elem) in border[i].items()})
+
+        #-----------------------------------------------------------------------
+        # Eliminate the new rows against the pivot rows of the original system
+        #-----------------------------------------------------------------------
+        prev = R1.one
+        for (step, (c, prow)) in enumerate(pivots):
+            prow = {col: conv(v) for (col, v) in prow.items()}
+            for i in range(0, k):
+                if extra[i][0][step]:
+                    prow[n + 1 + i] = conv(extra[i][0][step])
+            a = prow[c]
+            for row in border:
+                b = row.pop(c, None)
+                if b is None:
+                    if a != prev:
+                        for col in row:
+                            row[col] = (a*row[col]).exquo(prev)
+                    continue
+                for col in set(row) | set(prow):
+                    if col == c:
+                        continue
+                    v = a*row.get(col, R1.zero) - b*prow.get(col, R1.zero)
+                    if v:
+                        row[col] = v.exquo(prev) if prev != 1 else v
+                    elif col in row:
+                        del row[col]
+            prev = a
+
+        #-----------------------------------------------------------------------
+        # Eliminate the block of the extra and of the new unknowns
+        #-----------------------------------------------------------------------
+        block   = {i: {(col - n - 1 if col != n else k + m): v \
+                       for (col, v) in border[i].items()} \
+                   for i in range(0, k + m)}
+        colRows = {j: set([i for i in block if j in block[i]]) \
+                   for j in range(0, k + m)}
+        (bpivots, det1) = eliminate(R1, block, colRows, k + m, \
+                                    set(range(0, k + m)), None, prev)
+        Nb = backSubstitution(R1, bpivots, det1, k + m, set(range(0, k + m)))
+
+        #-----------------------------------------------------------------------
+        # Back substitution of the pivot rows of the original system
+        #-----------------------------------------------------------------------
+        base = set([idx[t] for t in needed if idx[t] is not None])
+        N    = {}
+        for step in range(len(pivots) - 1, -1, -1):
+            if base.issubset(N):
+                break
+            (c, prow) = pivots[step]
+            acc = det1*conv(prow.get(n, R.zero))
+            for i in range(0, k):
+                if extra[i][0][step]:
+                    acc = acc - conv(extra[i][0][step])*Nb[i]
+            for (col, v) in prow.items():
+                if col != c and col != n:
+                    acc = acc - conv(v)*N[col]
+            N[c] = acc.exquo(conv(prow[c]))
+        return {t: polyQuotient(N[idx[t]] if idx[t] is not None else \
+                                Nb[pos[t] - n - 1], det1) for t in needed}
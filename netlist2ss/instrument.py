@@ -0,0 +1,250 @@
+## @package instrument
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 02:31:07
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#      This module contains the instrumentation of the stages of the  Circuit
+#  class. Each stage (parse, nodes, mna, states, outputs, solve, calcABCD, etc)
+#  produces a record with its wall time and, when profiling is enabled,  the
+#  peak memory allocated during the stage (tracemalloc) and the size of  the
+#  expressions it returned (count_ops and the depth of the expression trees).
+#
+#      The records are delivered to hooks, which are callables receiving  the
+#  event ('start' or 'end') and the record. The records are dictionaries  of
+#  plain numbers and strings, so they can be sent to a metrics system as they
+#  are. The stageStats class is a hook that collects the records, and the
+#  printStage hook implements the verbose mode.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import time
+import tracemalloc
+import sympy as si
+
+#-------------------------------------------------------------------------------
+# Description of the stages printed by the verbose mode
+#-------------------------------------------------------------------------------
+stageNames = {'parse':    'Parsing Netlist',
+              'nodes':    'Numbering the nodes',
+              'reduce':   'Reducing subcircuits',
+              'mna':      'Building nodal analysys matrices',
+              'states':   'Isolating states',
+              'outputs':  'Isolating outputs',
+              'solve':    'Solve linear system',
+              'update':   'Updating the solution',
+              'inputs':   'Isolating inputs',
+              'calcABCD': 'Calculating A,B,C and D matrices',
+              'simplify': 'Simplifying',
+              'cache':    'Reading the cache'}
+
+#-------------------------------------------------------------------------------
+# exprDepth
+# Depth of the tree of a sympy expression (a symbol or a number has depth 1)
+#-------------------------------------------------------------------------------
+def exprDepth(expr):
+    depth = 0
+    stack = [(expr, 1)]
+    while len(stack) != 0:
+        (expr, d) = stack.pop()
+        depth = max(depth, d)
+        stack.extend([(arg, d + 1) for arg in expr.args])
+    return depth
+
+#-------------------------------------------------------------------------------
+# exprSize
+# Size of the expressions held by the result of a stage. Matrices, lists,
+# tuples, sets and dictionaries are walked, and the devices count by their
+# values. Anything else is ignored
+#
+# -Inputs
+# obj:   result of a stage
+# -Outputs
+# ops:   total number of operations (count_ops) of the expressions (None if
+#        the result doesn't hold sympy expressions or matrices)
+# depth: depth of the deepest expression tree (None as well)
+#-------------------------------------------------------------------------------
+def exprSize(obj):
+    ops   = 0
+    depth = 0
+    found = False
+    seen  = set()
+    stack = [obj]
+    while len(stack) != 0:
+        item = stack.pop()
+        if isinstance(item, si.MatrixBase):
+            found = True
+            stack.extend(item.values())
+        elif isinstance(item, si.Basic):
+            found = True
+            ops   = ops + si.count_ops(item)
+            depth = max(depth, exprDepth(item))
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif hasattr(item, 'getValue') and not id(item) in seen:
+            #Devices are listed both in compDict and in compList
+            seen.add(id(item))
+            stack.append(item.getValue())
+    if not found:
+        return (None, None)
+    return (ops, depth)
+
+#-------------------------------------------------------------------------------
+# runStage
+# Run a stage and deliver its record to the hooks
+#
+# -Inputs
+# hooks:   list of callables hook(event, record)
+# profile: measure the peak memory and the size of the result. Both are slow,
+#          so they are left out of the record if False. Only the size is
+#          measured if 'size'
+# stage:   name of the stage
+# func:    function that implements the stage
+# args:    arguments of func
+# -Outputs
+# result:  The result of func
+# record:  dictionary with the stage name, the wall time in seconds (time) and,
+#          if profiling, the peak memory in bytes (memory), the operation count
+#          (ops) and the expression depth (depth)
+#-------------------------------------------------------------------------------
+def runStage(hooks, profile, stage, func, *args):
+    record = {'stage': stage}
+    for hook in hooks:
+        hook('start', record)
+    trace  = profile == True
+    if trace:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start  = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        record['time'] = time.perf_counter() - start
+        if trace:
+            record['memory'] = tracemalloc.get_traced_memory()[1] - base
+            if not tracing:
+                tracemalloc.stop()
+    if profile:
+        #The stages that don't return expressions (parse, nodes) have no size
+        (ops, depth) = exprSize(result)
+        if ops is not None:
+            (record['ops'], record['depth']) = (ops, depth)
+    for hook in hooks:
+        hook('end', record)
+    return (result, record)
+
+#-------------------------------------------------------------------------------
+# printStage
+# Hook of the verbose mode. It prints the name of each stage when it starts and
+# its record when it ends
+#-------------------------------------------------------------------------------
+def printStage(event, record):
+    if event == 'start':
+        print(stageNames.get(record['stage'], record['stage']) + "...")
+        return
+    msg = "    " + record['stage'] + ": %.4f s" % record['time']
+    if 'memory' in record:
+        msg = msg + ", peak %.1f KiB" % (record['memory']/1024.0)
+    if 'ops' in record:
+        msg = msg + ", %d ops, depth %d" % (record['ops'], record['depth'])
+    print(msg)
+
+#-------------------------------------------------------------------------------
+# stageStats Class
+# Hook that collects the records of the stages. The same instance can be shared
+# by several circuits, so a whole batch ends up in a single object
+#-------------------------------------------------------------------------------
+class stageStats:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.records = []
+
+    #---------------------------------------------------------------------------
+    # Hook interface
+    #---------------------------------------------------------------------------
+    def __call__(self, event, record):
+        if event == 'end':
+            self.records.append(dict(record))
+
+    #---------------------------------------------------------------------------
+    # Aggregate the records by stage
+    #
+    # -Outputs
+    # summary: dictionary mapping the stage into a dictionary with the number
+    #          of runs (calls), the total time (time) and the largest memory,
+    #          ops and depth of the runs that were profiled
+    #---------------------------------------------------------------------------
+    def summary(self):
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(record['stage'], {'calls': 0, \
+                                                         'time': 0.0})
+            entry['calls'] = entry['calls'] + 1
+            entry['time']  = entry['time'] + record['time']
+            for field in ['memory', 'ops', 'depth']:
+                if field in record:
+                    entry[field] = max(entry.get(field, 0), record[field])
+        return summary
+
+    #---------------------------------------------------------------------------
+    # Total wall time of the stages
+    #---------------------------------------------------------------------------
+    def total(self):
+        return sum([record['time'] for record in self.records])
+
+    #---------------------------------------------------------------------------
+    # Plain dictionary (ready for json.dumps)
+    #---------------------------------------------------------------------------
+    def asDict(self):
+        return {'records': [dict(record) for record in self.records], \
+                'summary': self.summary(), 'total': self.total()}
+
+    #---------------------------------------------------------------------------
+    # Table with one line per stage
+    #---------------------------------------------------------------------------
+    def __str__(self):
+        lines = ["%-10s %6s %10s %12s %10s %6s" % ('stage', 'calls', \
+                 'time (s)', 'memory (B)', 'ops', 'depth')]
+        for (stage, entry) in self.summary().items():
+            lines.append("%-10s %6d %10.4f %12s %10s %6s" % (stage, \
+                         entry['calls'], entry['time'], \
+                         entry.get('memory', '-'), entry.get('ops', '-'), \
+                         entry.get('depth', '-')))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return self.__str__()
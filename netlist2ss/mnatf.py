@@ -0,0 +1,276 @@
+## @package mnatf
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 20:05:37
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module calculates the transfer functions of a circuit straight from
+#  the nodal analysis in the Laplace domain, without building the space state
+#  representation. Capacitors are stamped as s*C and inductors as s*L, and the
+#  system M(s)*X = b is solved by the sparse fraction-free elimination over the
+#  polynomial ring of s and the circuit parameters. The transfer function of an
+#  output c*X + d is then
+#
+#      H(s) = (c*N(s) + d*det(M(s))) / det(M(s))
+#
+#  where N = det(M)*X comes from the fraction-free back substitution, so the
+#  numerator and the denominator are polynomials from the start and a single
+#  elimination per input gives the transfer functions of all outputs.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import sympy as si
+from   netlist2ss.netlist2ss import Error, netlistParser, calcNodesnJ, \
+                                    stamp, stampDevices, unknownSymbols, \
+                                    parseOutputs, parseInputs, simplifyLevels
+from   netlist2ss.ffsolve    import polyDomain, fieldRows, eliminate, \
+                                    backSubstitution, fractionFreeSolve
+from   netlist2ss.tf         import tfFromPolys
+
+#-------------------------------------------------------------------------------
+# sDomainMNA
+# Construct the nodal analysis matrices in the Laplace domain as A + s*S. The
+# row of the J matrix of each capacitor becomes s*C*(V1 - V2) - J = 0 and each
+# inductor gets an extra unknown (its current) appended after the J matrix,
+# with the row V1 - V2 - s*L*I = 0
+#
+# The values are given apart from the components, so the same stamps can  be
+# filled with sympy expressions or with numbers
+#
+# -Inputs
+# compList:  The component list generated by the netlistParser
+# nJ:        Size of the J matrix
+# nNodes:    Number of nodes in the nodal analysis
+# nodesDict: Dictionary corelating the net name with the node number
+# values:    List with the value of each component
+# -Outputs:
+# A:   Dictionary of keys of the part of the matrix that doesn't depend on s
+# S:   Dictionary of keys of the part of the matrix multiplied by s
+# Z:   Dictionary of keys of the Z matrix
+# ind: List with the inductors (in the order of the extra unknowns)
+#-------------------------------------------------------------------------------
+def sDomainMNA(compList, nJ, nNodes, nodesDict, values):
+    (A, Z) = stampDevices(compList, nNodes, nodesDict, values, \
+                          [0 for comp in compList])
+    S   = {}
+    ind = []
+    for (comp, value) in zip(compList, values):
+        nodes = comp.getNodes()
+        n1 = nodesDict[nodes[0]]
+        n2 = nodesDict[nodes[1]]
+        if comp.getType() == 'C':
+            e1 = nNodes + comp.getE1Idx()
+            for key in [(e1, n1), (e1, n2)]:
+                if key in A:
+                    S[key] = A.pop(key)*value
+            stamp(A, e1, e1, -1)
+        elif comp.getType() == 'L':
+            k = nNodes + nJ + len(ind)
+            if n1 != -1:
+                stamp(A, n1, k, 1)
+                stamp(A, k, n1, 1)
+            if n2 != -1:
+                stamp(A, n2, k, -1)
+                stamp(A, k, n2, -1)
+            stamp(S, k, k, -value)
+            ind.append(comp)
+    return (A, S, Z, ind)
+
+#-------------------------------------------------------------------------------
+# sDomainOutputs
+# Build the output equations as a function of the unknowns of sDomainMNA. The
+# states are replaced by the voltage across the capacitors and by the current
+# of the inductors
+#
+# -Inputs
+# compDict:  The component dictionary generated by the netlistParser
+# compList:  The component list generated by the netlistParser
+# nJ:        Size of the J matrix
+# nNodes:    Number of nodes in the nodal analysis
+# nodesDict: Dictionary corelating the net name with the node number
+# ind:       List with the inductors returned by sDomainMNA
+# outputs:   A list containing the desired measurements from which the output
+#            equations will be built
+# -Outputs
+# X: column vector with the placeholders of the unknowns
+# G: column vector containing the set of output equations
+#-------------------------------------------------------------------------------
+def sDomainOutputs(compDict, compList, nJ, nNodes, nodesDict, ind, outputs):
+    (V, J) = unknownSymbols(nNodes, nJ)
+    I = [si.Dummy('I%d' % k) for k in range(0, len(ind))]
+    X = si.Matrix(list(V[0:nNodes, 0]) + list(J) + I)
+    sub = {ind[k].getST(): I[k] for k in range(0, len(ind))}
+    for comp in compList:
+        if comp.getType() == 'C':
+            nodes = comp.getNodes()
+            sub[comp.getST()] = V[nodesDict[nodes[0]]] - V[nodesDict[nodes[1]]]
+    G = parseOutputs(compDict, nodesDict, V, J, outputs).xreplace(sub)
+    return (X, G)
+
+#-------------------------------------------------------------------------------
+# fieldResponse
+# Solve M(s)*X = b by the sparse fraction-free elimination and  calculate  the
+# responses c*X + d. The unknowns used by the outputs are eliminated last, so
+# only their part of the back substitution is done.
+#
+# -Inputs
+# K: The fraction field of the parameters and s (sympy FracField)
+# M: Dictionary of keys of the matrix (elements of K)
+# b: List with the right hand side (elements of K)
+# c: List with the output equations (lists of elements of K)
+# d: List with the direct term of each output (elements of K)
+# n: Size of the system
+# -Outputs
+# H: List with the transfer function of each output (elements of K)
+#
+# A ZeroDivisionError is raised if the system is singular
+#-------------------------------------------------------------------------------
+def fieldResponse(K, M, b, c, d, n):
+    entries = dict(M)
+    for k in range(0, n):
+        if b[k]:
+            entries[(k, n)] = b[k]
+    needed = set([k for row in c for k in range(0, n) if row[k]])
+    (R, rows, colRows) = fieldRows(K, entries, n)
+    (pivots, det) = eliminate(R, rows, colRows, n, needed)
+    N   = backSubstitution(R, pivots, det, n, needed)
+    det = K.new(det, R.one)
+    H   = []
+    for (row, dk) in zip(c, d):
+        num = det*dk
+        for k in needed:
+            if row[k]:
+                num = num + row[k]*K.new(N[k], R.one)
+        H.append(num/det)
+    return H
+
+#-------------------------------------------------------------------------------
+# mnaTransferMatrix
+# Transfer functions of all input/output pairs calculated from the nodal
+# analysis in the Laplace domain. Inputs that change the matrix of the system
+# (duty cycle, gains, etc) and nonlinear outputs are linearized at the
+# operating point, which is the solution of the system at s = 0.
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   a list containing the name of variables consired to be the  inputs
+#           of the system
+# outputs:  A list containing the desired measurements from  which  the output
+#           equations will be built
+# s:        symbol of the Laplace variable
+# simplify: simplification level of the coefficients (see simplifyMatrix)
+# -Outputs
+# H: list of lists where H[i][j] = (num, den) is the transfer function from
+#    the input j to the output i as coefficient lists (highest power first)
+#
+# -example:
+# H = mnaTransferMatrix("v1 n1 gnd in\nr1 n1 c1 r1\nc1 c1 gnd c1", ["in"],
+#                       ["Vnc1"])
+#-------------------------------------------------------------------------------
+def mnaTransferMatrix(netlist, inputs, outputs, s = si.Symbol('s'), \
+                      simplify = 'cancel'):
+    if not simplify in simplifyLevels:
+        raise Error("Unknown simplification level: " + str(simplify) + \
+                    ". Use one of " + str(simplifyLevels))
+    #The subcircuits are flattened, since s is kept in the system
+    (compDict, compList) = netlistParser(netlist, True)
+    (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+    (A, S, Z, ind) = sDomainMNA(compList, nJ, nNodes, nodesDict, \
+                                [comp.getValue() for comp in compList])
+    n = nNodes + nJ + len(ind)
+    A = {key: si.sympify(A.get(key, 0) + s*S.get(key, 0)) \
+         for key in set(A) | set(S)}
+    A = {key: v for (key, v) in A.items() if v != 0}
+    Z = {key: si.sympify(v) for (key, v) in Z.items() if v != 0}
+    (X, G) = sDomainOutputs(compDict, compList, nJ, nNodes, nodesDict, ind, \
+                            outputs)
+    U = parseInputs(inputs)
+
+    #---------------------------------------------------------------------------
+    # Small signal excitation (b) and output equations (c, d)
+    #---------------------------------------------------------------------------
+    M  = si.SparseMatrix(n, n, A)
+    Zv = si.SparseMatrix(n, 1, Z)
+    b  = Zv.jacobian(U) - si.Matrix.hstack(*[M.diff(u)*X \
+                                             for u in U])
+    c  = G.jacobian(X)
+    d  = G.jacobian(U)
+    if s in b.free_symbols:
+        raise Error("The inputs change the value of reactive devices. " + \
+                    "Use the space state path")
+
+    #---------------------------------------------------------------------------
+    # Replace the unknowns by the operating point
+    #---------------------------------------------------------------------------
+    used = (b.free_symbols | c.free_symbols | d.free_symbols) & set(X)
+    if len(used) != 0:
+        needed = set([i for i in range(0, n) if X[i] in used])
+        try:
+            sol = fractionFreeSolve(M.xreplace({s: 0}), Zv, needed)
+            if sol is None:
+                sol = M.xreplace({s: 0}).inv()*Zv
+        except:
+            raise Error("Unable to find the operating point. Use the " + \
+                        "space state path")
+        op = {X[i]: sol[i] for i in needed}
+        b  = b.xreplace(op)
+        c  = c.xreplace(op)
+        d  = d.xreplace(op)
+
+    #---------------------------------------------------------------------------
+    # Solve the system once per input. The entries are mapped into the fraction
+    # field of the parameters and s, so the numerators and the denominators are
+    # polynomials without common factors. Floats, radicals, etc are solved  as
+    # sympy expressions
+    #---------------------------------------------------------------------------
+    (K, elems) = polyDomain(list(A.values()) + list(b) + list(c) + \
+                            list(d) + [s])
+    if K is not None:
+        conv = K.from_expr
+        MK   = {key: conv(v) for (key, v) in A.items()}
+        cK   = [[conv(v) for v in c[i, :]] for i in range(0, len(outputs))]
+    H = [[None]*len(inputs) for i in range(0, len(outputs))]
+    for j in range(0, len(inputs)):
+        try:
+            if K is None:
+                resp = list(c*M.LUsolve(b[:, j]) + d[:, j])
+            else:
+                resp = fieldResponse(K, MK, [conv(v) for v in b[:, j]], cK, \
+                                     [conv(v) for v in d[:, j]], n)
+        except:
+            raise Error('Unable to solve the linear system. Check the netlist')
+        for i in range(0, len(outputs)):
+            if K is None:
+                H[i][j] = tfFromPolys(resp[i], si.S.One, s, simplify)
+            else:
+                H[i][j] = tfFromPolys(resp[i].numer.as_expr(), \
+                                      resp[i].denom.as_expr(), s, simplify, \
+                                      False)
+    return H
@@ -36,9 +36,18 @@
 #-------------------------------------------------------------------------------
 # import necessary modules
 #-------------------------------------------------------------------------------
+import os
 import re
+import mmap
+import array
+import numbers
+from   concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import sympy as si
+from   netlist2ss.ffsolve     import fractionFreeSolve, factorSystem
+from   netlist2ss.cache       import diskCache
+from   netlist2ss.incremental import baseSystem, unknownKeys
+from   netlist2ss.instrument  import runStage, printStage, stageStats
 
 #-------------------------------------------------------------------------------
 # Error Class
@@ -50,79 +59,761 @@ class Error(Exception):
     def __str__(self):
         return repr(self.value)
 
+#-------------------------------------------------------------------------------
+# Device types. The type code of a device is its index in this string
+#-------------------------------------------------------------------------------
+deviceTypes = 'VILRCEHGFT'
+
+#-------------------------------------------------------------------------------
+# componentStore Class
+# Struct-of-arrays storage of the devices of a netlist. Each device is a row of
+# compact arrays (type code, four terminals, J indexes and value id), the values
+# are interned in a side table (each distinct value is parsed once, and it is
+# only converted to a sympy expression when a symbolic stage needs it), and the
+# nodes and the J indexes are numbered as the devices are appended, so there is
+# no separate pass for them. The component class is a view of a row.
+#
+# The terminals hold the node numbers. The ground aliases are stored as -1-k,
+# where k is the index of the alias in the grounds list, and the unused
+# terminals of the 2 terminal devices are 0. The J indexes of the devices
+# without entries in J are -1. The arrays grow as the netlist is parsed, and
+# arrays() returns them as numpy arrays without copying them
+#
+# The instances of subcircuits aren't devices. They are kept apart, in the
+# instances dictionary, and the definitions of the subcircuits are kept in the
+# subckts dictionary (see subcircuit), which is shared by the store of the
+# netlist and the stores of the definitions
+#
+# The parameters (.PARAM lines) are kept in the params dictionary, and the
+# values of the parameters that aren't symbolic (see setParams) are replaced
+# in the values of the devices when their sympy expressions are built, which
+# happens when they are stamped. Both dictionaries are shared with the
+# definitions
+#-------------------------------------------------------------------------------
+class componentStore:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self):
+        self.names     = []
+        self.index     = {}
+        self.types     = array.array('b')
+        self.nets      = array.array('i')
+        self.e1        = array.array('i')
+        self.e2        = array.array('i')
+        self.vals      = array.array('i')
+        self.texts     = []
+        self.codes     = []
+        self.values    = []
+        self.valueIds  = {}
+        self.nodeNames = []
+        self.grounds   = []
+        self.nodesDict = {}
+        self.states    = {}
+        self.instances = {}
+        self.subckts   = {}
+        self.params    = {}
+        self.known     = {}
+        self.nJ        = 0
+        self.nNodes    = 0
+
+    #---------------------------------------------------------------------------
+    # Number of devices
+    #---------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.names)
+
+    #---------------------------------------------------------------------------
+    # Id of a value in the side table. Equal values share the same entry. The
+    # strings are only compiled (to catch syntax errors while parsing), and the
+    # sympy expression is built by expr
+    #
+    # -Inputs
+    # value: string or sympy expression
+    # -Outputs
+    # id:    index of the value in the side table
+    #---------------------------------------------------------------------------
+    def valueId(self, value):
+        if not value in self.valueIds:
+            code = None
+            try:
+                if isinstance(value, str):
+                    code = compile(value.strip(), '<value>', 'eval')
+                else:
+                    si.sympify(value)
+            except:
+                raise Error('Unable to parse "' + str(value) + '"')
+            self.texts.append(value)
+            self.codes.append(code)
+            self.values.append(None)
+            self.valueIds[value] = len(self.texts) - 1
+        return self.valueIds[value]
+
+    #---------------------------------------------------------------------------
+    # Sympy expression of a value (built on the first call). The known
+    # parameters are replaced by their values
+    #---------------------------------------------------------------------------
+    def expr(self, vid):
+        if self.values[vid] is None:
+            try:
+                value = si.sympify(self.texts[vid])
+            except:
+                raise Error('Unable to parse "' + str(self.texts[vid]) + '"')
+            if len(self.known) != 0:
+                value = value.xreplace(self.known)
+            self.values[vid] = value
+        return self.values[vid]
+
+    #---------------------------------------------------------------------------
+    # Name of the symbols used by the values and by the .PARAM lines, including
+    # the ones of the subcircuits
+    #---------------------------------------------------------------------------
+    def symbolNames(self):
+        names = set(self.params.keys())
+        for text in self.texts:
+            names.update([sym.name for sym in si.sympify(text).free_symbols])
+        for defn in self.subckts.values():
+            names.update(defn.store.symbolNames())
+        return names
+
+    #---------------------------------------------------------------------------
+    # Add a parameter (.PARAM line)
+    #
+    # -Inputs
+    # name:  name of the parameter
+    # value: string with its value (a number or an expression of the other
+    #        parameters)
+    #---------------------------------------------------------------------------
+    def addParam(self, name, value):
+        if name in self.params:
+            raise Error(name + ": Duplicated parameter.")
+        try:
+            compile(value, '<value>', 'eval')
+        except SyntaxError:
+            raise Error('Unable to parse "' + value + '"')
+        self.params[name] = value
+
+    #---------------------------------------------------------------------------
+    # Choose which parameters are replaced by their values. The values given by
+    # the .PARAM lines are replaced unless params says otherwise. The numbers
+    # are made exact (1e-12 becomes 1/10**12), so the system is still solved by
+    # the fraction-free elimination
+    #
+    # -Inputs
+    # params: dictionary mapping the name of the parameters into their values
+    #         (numbers, or strings and sympy expressions of the other
+    #         parameters), or into None to keep them symbolic
+    #---------------------------------------------------------------------------
+    def setParams(self, params = {}):
+        values = dict(self.params)
+        for (name, value) in params.items():
+            values[str(name)] = value
+        known = {}
+        for name in values.keys():
+            self.resolveParam(name, values, known, [])
+        self.known.clear()
+        self.known.update({si.Symbol(name): value for (name, value) in \
+                           known.items() if value is not None})
+        #The values and the models of the subcircuits are built again
+        for store in [self] + [defn.store for defn in self.subckts.values()]:
+            store.values = [None]*len(store.values)
+        for defn in self.subckts.values():
+            defn.model = None
+
+    #---------------------------------------------------------------------------
+    # Value of a parameter as a function of the symbolic ones (see setParams)
+    #
+    # -Inputs
+    # name:   name of the parameter
+    # values: dictionary mapping the name of the parameters into their values
+    # known:  dictionary with the parameters already resolved (it is updated)
+    # active: list with the parameters being resolved (to find cycles)
+    # -Outputs
+    # value:  sympy expression (None if the parameter is symbolic)
+    #---------------------------------------------------------------------------
+    def resolveParam(self, name, values, known, active):
+        if name in known:
+            return known[name]
+        if name in active:
+            raise Error("The parameter " + name + " depends on itself")
+        value = values[name]
+        if value is None:
+            known[name] = None
+            return None
+        try:
+            if isinstance(value, numbers.Integral):
+                value = si.Integer(int(value))
+            elif isinstance(value, numbers.Real):
+                value = si.Rational(repr(float(value)))
+            else:
+                value = si.sympify(value, rational = True)
+        except:
+            raise Error('Unable to parse the parameter ' + name + ' = "' + \
+                        str(value) + '"')
+        sub = {}
+        for sym in value.free_symbols:
+            if str(sym) in values:
+                dep = self.resolveParam(str(sym), values, known, \
+                                        active + [name])
+                if dep is not None:
+                    sub[sym] = dep
+        known[name] = value.xreplace(sub)
+        return known[name]
+
+    #---------------------------------------------------------------------------
+    # Evaluate a value without sympy
+    #
+    # -Inputs
+    # vid:   id of the value
+    # names: dictionary mapping the name of each parameter into its value
+    #        (numbers or objects with the same arithmetic, like dual numbers)
+    # -Outputs
+    # value: the result, or None when the value uses names that aren't in names
+    #        or can't be evaluated this way (the sympy expression must be used)
+    #---------------------------------------------------------------------------
+    def evaluate(self, vid, names):
+        code = self.codes[vid]
+        #The names are looked up one by one, since names can be large
+        if code is None or not all([name in names for name in code.co_names]):
+            return None
+        try:
+            return eval(code, {'__builtins__': {}}, names)
+        except Exception:
+            return None
+
+    #---------------------------------------------------------------------------
+    # Terminal of a net. New nets get the next node number, and the ground
+    # aliases are node -1
+    #---------------------------------------------------------------------------
+    def terminal(self, net):
+        node = self.nodesDict.get(net)
+        if node is None:
+            if net.upper() == 'GND' or net == '0':
+                node = -1
+                self.grounds.append(net)
+            else:
+                node = self.nNodes
+                self.nodeNames.append(net)
+                self.nNodes = self.nNodes + 1
+            self.nodesDict[net] = node
+        return node if node >= 0 else -1 - self.grounds.index(net)
+
+    #---------------------------------------------------------------------------
+    # Names of the nets of the terminals of a device
+    #---------------------------------------------------------------------------
+    def netNames(self, index):
+        count = 4 if deviceTypes[self.types[index]] in 'EHGFT' else 2
+        return [self.nodeNames[t] if t >= 0 else self.grounds[-1 - t] \
+                for t in self.nets[4*index:4*index + count]]
+
+    #---------------------------------------------------------------------------
+    # Append a device
+    #
+    # -Inputs
+    # name:  Component name (Example: V1, R1, R2, etc). The devices of a
+    #        flattened subcircuit have hierarchical names (X1.R1), and their
+    #        type is given by the last part of the name
+    # nodes: A list with the name of the nets (2 or 4 of them)
+    # value: string or sympy expression with the value of the device
+    # -Outputs
+    # comp:  view of the new device
+    #---------------------------------------------------------------------------
+    def append(self, name, nodes, value):
+        if name in self.index or name in self.instances:
+            raise Error(name + ": Duplicated device.")
+        kind = name[name.rfind('.') + 1:][0:1].upper()
+        code = deviceTypes.find(kind) if kind != '' else -1
+        if code < 0 or len(nodes) != (4 if kind in 'EHGFT' else 2):
+            raise Error("Unsuported device " + name)
+        vid = self.valueId(value)
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        self.types.append(code)
+        self.nets.extend([self.terminal(net) for net in nodes] + \
+                         [0]*(4 - len(nodes)))
+        self.vals.append(vid)
+        #Independent voltage sources, voltage controled voltage sources,
+        #current controled current sources, and capacitors use a row of J,
+        #and current controled voltage sources use two rows
+        e1 = e2 = -1
+        if deviceTypes[code] in 'VFEC':
+            e1 = self.nJ
+            self.nJ = self.nJ + 1
+        elif deviceTypes[code] in 'HT':
+            e1 = self.nJ
+            e2 = self.nJ + 1
+            self.nJ = self.nJ + 2
+        self.e1.append(e1)
+        self.e2.append(e2)
+        return component(self, len(self.names) - 1)
+
+    #---------------------------------------------------------------------------
+    # Append an instance of a subcircuit. The nets of the instance are numbered
+    # as the nets of the devices. The subcircuit may be defined later, so it is
+    # checked by checkInstances
+    #
+    # -Inputs
+    # name:   Instance name (Example: X1)
+    # nodes:  A list with the name of the nets connected to the ports
+    # subckt: Name of the subcircuit
+    # -Outputs
+    # inst:   the new subcircuitInstance
+    #---------------------------------------------------------------------------
+    def addInstance(self, name, nodes, subckt):
+        if name in self.index or name in self.instances:
+            raise Error(name + ": Duplicated device.")
+        for net in nodes:
+            self.terminal(net)
+        self.instances[name] = subcircuitInstance(name, nodes, subckt)
+        return self.instances[name]
+
+    #---------------------------------------------------------------------------
+    # Check that the instances of the netlist and of the definitions refer to
+    # existing subcircuits with the same number of ports, and that no
+    # subcircuit instantiates itself (directly or not)
+    #---------------------------------------------------------------------------
+    def checkInstances(self):
+        stores = [self] + [defn.store for defn in self.subckts.values()]
+        for store in stores:
+            for inst in store.instances.values():
+                defn = self.subckts.get(inst.getSubckt())
+                if defn is None:
+                    raise Error(inst.getName() + ": Unknown subcircuit " + \
+                                inst.getSubckt())
+                if len(defn.ports) != len(inst.getNodes()):
+                    raise Error(inst.getName() + ": The subcircuit " + \
+                                defn.name + " has " + str(len(defn.ports)) + \
+                                " ports")
+        for defn in self.subckts.values():
+            pending = [inst.getSubckt() for inst in \
+                       defn.store.instances.values()]
+            seen    = set()
+            while len(pending) != 0:
+                name = pending.pop()
+                if name == defn.name:
+                    raise Error("The subcircuit " + name + \
+                                " instantiates itself")
+                if not name in seen:
+                    seen.add(name)
+                    insts = self.subckts[name].store.instances
+                    pending.extend([inst.getSubckt() for inst in \
+                                    insts.values()])
+
+    #---------------------------------------------------------------------------
+    # The arrays of the store as numpy arrays (they share the memory, so they
+    # are only valid until the next append)
+    #
+    # -Outputs
+    # arrays: dictionary with the type codes (types), the terminals (nets, one
+    #         row per device), the J indexes (e1, e2) and the value ids (vals)
+    #---------------------------------------------------------------------------
+    def arrays(self):
+        return {'types': np.frombuffer(self.types, dtype = np.int8),
+                'nets':  np.frombuffer(self.nets, dtype = np.intc)\
+                         .reshape((-1, 4)),
+                'e1':    np.frombuffer(self.e1, dtype = np.intc),
+                'e2':    np.frombuffer(self.e2, dtype = np.intc),
+                'vals':  np.frombuffer(self.vals, dtype = np.intc)}
+
 #-------------------------------------------------------------------------------
 # Component Class
-# This class contains basic definition of a spice component
+# This class contains basic definition of a spice component. It is a view of a
+# row of a componentStore, so it doesn't hold any data by itself
 #
 # The parameters of the constructor are listed bellow:
-# name:  Component name (Example: V1, R1, R2, etc)
-# nodes: A list with the name of the nets in  which the component is connected 
-#        (Example: ['n1', 'n2', ...])
-# value: An expression retrieved  from the 'value' field of  the spice netlist
-#        (Example: '1e-2*a+b'). This expression is  parsed and assumed  to  be 
-#        the value of the component 
+# store: The componentStore of the netlist
+# index: The row of the device in the store
 #-------------------------------------------------------------------------------
 class component:
 
+    __slots__ = ('store', 'index')
+
     #---------------------------------------------------------------------------
     # Constructor
     #---------------------------------------------------------------------------
-    def __init__(self, name, nodes, value): 
-        self.type   = name[0].upper()
-        self.nodes  = nodes
-        try:
-            self.value = si.sympify(value)
-        except:
-            raise Error('Unable to parse "' + value + '"')
-        self.e1Idx = None
-        self.e2Idx = None
-        if (self.type in 'LC'):
-            self.st = si.symbols('state_var_' + name)     
-        else:
-            self.st = None
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
 
     #---------------------------------------------------------------------------
     # Get fixed parameters of the component
     #---------------------------------------------------------------------------
+    def getName(self):
+        return self.store.names[self.index]
+
     def getType(self):
-        return self.type
+        return deviceTypes[self.store.types[self.index]]
 
     def getNodes(self):
-        return self.nodes
+        return self.store.netNames(self.index)
 
     def getValue(self):
-        return self.value
+        return self.store.expr(self.store.vals[self.index])
+
+    def getValueId(self):
+        return self.store.vals[self.index]
+
+    def getNumericValue(self, names):
+        return self.store.evaluate(self.store.vals[self.index], names)
 
     def getST(self):
-        return self.st
+        if not self.getType() in 'LC':
+            return None
+        if not self.index in self.store.states:
+            self.store.states[self.index] = si.symbols('state_var_' + \
+                                                       self.getName())
+        return self.store.states[self.index]
+
+    #---------------------------------------------------------------------------
+    # Change the value of the component
+    #---------------------------------------------------------------------------
+    def setValue(self, value):
+        self.store.vals[self.index] = self.store.valueId(value)
 
     #---------------------------------------------------------------------------
     # Get and set the indexes in the J matrix   
     #---------------------------------------------------------------------------
     def setE1Idx(self, e1Idx):
-        self.e1Idx = e1Idx
+        self.store.e1[self.index] = -1 if e1Idx is None else e1Idx
 
     def setE2Idx(self, e2Idx):
-        self.e2Idx = e2Idx
+        self.store.e2[self.index] = -1 if e2Idx is None else e2Idx
 
     def getE1Idx(self):
-        return self.e1Idx
+        e1Idx = self.store.e1[self.index]
+        return None if e1Idx < 0 else e1Idx
 
     def getE2Idx(self):
-        return self.e2Idx
+        e2Idx = self.store.e2[self.index]
+        return None if e2Idx < 0 else e2Idx
 
     #---------------------------------------------------------------------------
     # String callbacks in order facilitate debugging 
     #---------------------------------------------------------------------------
     def __str__(self):
-        return "< " + self.type       + ", " + str(self.nodes) + ", " + \
-                      str(self.value) + ", " + str(self.e1Idx) + ", " + \
-                      str(self.e2Idx) + ", " + str(self.st)    + " >"
+        return "< " + self.getType()        + ", " + str(self.getNodes()) + \
+               ", " + str(self.getValue())  + ", " + str(self.getE1Idx()) + \
+               ", " + str(self.getE2Idx())  + ", " + str(self.getST())    + \
+               " >"
 
     def __repr__(self):
-        return "< " + self.type       + ", " + str(self.nodes) + ", " + \
-                      str(self.value) + ", " + str(self.e1Idx) + ", " + \
-                      str(self.e2Idx) + ", " + str(self.st)    + " >"
+        return self.__str__()
+
+#-------------------------------------------------------------------------------
+# subcircuit Class
+# Definition of a subcircuit (the lines between .SUBCKT and .ENDS). The devices
+# of the definition are kept in their own componentStore, where the ports are
+# the first nodes, and the ground is the ground of the netlist. The reduced
+# model of the definition (see the subckt module) is calculated once and it is
+# shared by all instances
+#
+# The parameters of the constructor are listed bellow:
+# name:  Name of the subcircuit
+# ports: A list with the name of the ports
+#-------------------------------------------------------------------------------
+class subcircuit:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, name, ports):
+        self.name  = name
+        self.ports = ports
+        self.store = componentStore()
+        self.model = None
+        for net in ports:
+            if net in self.store.nodesDict:
+                raise Error(name + ": Duplicated port " + net)
+            if self.store.terminal(net) < 0:
+                raise Error(name + ": The ground can't be a port")
+
+#-------------------------------------------------------------------------------
+# subcircuitInstance Class
+# Instance of a subcircuit (X line)
+#
+# The parameters of the constructor are listed bellow:
+# name:   Instance name (Example: X1)
+# nodes:  A list with the name of the nets connected to the ports
+# subckt: Name of the subcircuit
+#-------------------------------------------------------------------------------
+class subcircuitInstance:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, name, nodes, subckt):
+        self.name     = name
+        self.nodes    = nodes
+        self.subckt   = subckt
+        self.currents = None
+
+    #---------------------------------------------------------------------------
+    # Get fixed parameters of the instance
+    #---------------------------------------------------------------------------
+    def getName(self):
+        return self.name
+
+    def getNodes(self):
+        return self.nodes
+
+    def getSubckt(self):
+        return self.subckt
+
+    #---------------------------------------------------------------------------
+    # Entries of J of the currents kept by the model of the subcircuit (None
+    # until the subcircuit is reduced, see reduceSubcircuits)
+    #---------------------------------------------------------------------------
+    def getCurrents(self):
+        return self.currents
+
+    def setCurrents(self, currents):
+        self.currents = currents
+
+    #---------------------------------------------------------------------------
+    # Print the instance as a netlist line
+    #---------------------------------------------------------------------------
+    def __str__(self):
+        return ' '.join([self.name] + self.nodes + [self.subckt])
+
+    def __repr__(self):
+        return self.__str__()
+
+#-------------------------------------------------------------------------------
+# componentList Class
+# The devices of a componentStore as a sequence of component views, in the
+# order of the netlist (the compList of netlistParser)
+#-------------------------------------------------------------------------------
+class componentList:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, store):
+        self.store = store
+
+    #---------------------------------------------------------------------------
+    # Sequence interface
+    #---------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [component(self.store, k) for k in \
+                    range(*i.indices(len(self.store)))]
+        if i < 0:
+            i = i + len(self.store)
+        if i < 0 or i >= len(self.store):
+            raise IndexError('component index out of range')
+        return component(self.store, i)
+
+    def __iter__(self):
+        for i in range(0, len(self.store)):
+            yield component(self.store, i)
+
+    def __str__(self):
+        return str(list(self))
+
+    def __repr__(self):
+        return self.__str__()
+
+#-------------------------------------------------------------------------------
+# componentDict Class
+# The devices of a componentStore as a dictionary of component views indexed by
+# the device name (the compDict of netlistParser)
+#-------------------------------------------------------------------------------
+class componentDict:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, store):
+        self.store = store
+
+    #---------------------------------------------------------------------------
+    # Mapping interface
+    #---------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, name):
+        return component(self.store, self.store.index[name])
+
+    def __contains__(self, name):
+        return name in self.store.index
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def keys(self):
+        return list(self.store.names)
+
+    def values(self):
+        return list(componentList(self.store))
+
+    def items(self):
+        return list(zip(self.store.names, componentList(self.store)))
+
+    def get(self, name, default = None):
+        return self[name] if name in self else default
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+    def __repr__(self):
+        return self.__str__()
+
+#-------------------------------------------------------------------------------
+# Pattern of a netlist line. A single precompiled pattern matches the empty
+# lines, the comments, the 2 terminal devices (the groups name2, net  and
+# value2), the 4 terminal devices (the groups name4, net and value4), the
+# .SUBCKT lines (the groups subckt and ports), the .ENDS lines (the groups ends
+# and endsName), the instances of subcircuits (the groups nameX and nets) and
+# the .PARAM lines (the groups param and assigns, which are split by
+# paramPattern)
+#-------------------------------------------------------------------------------
+netPattern   = r"[ \t]+([A-Za-z0-9_]+)"
+valPattern   = r"[ \t]+([A-Za-z0-9+*/()\- \.]+)"
+netsPattern  = r"(?:[ \t]+[A-Za-z0-9_]+)"
+paramPattern = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*" + \
+                          r"([A-Za-z0-9+*/()\-\.]+)")
+linePattern = re.compile(r"[ \t]*(?:\*.*|" + \
+                         r"(?P<name2>[VvIiLlRrCc][A-Za-z0-9_]*)" + \
+                         netPattern*2 + valPattern + \
+                         r"[ \t]*(?:;.*)?|" + \
+                         r"(?P<name4>[EeHhGgFfTt][A-Za-z0-9_]*)" + \
+                         netPattern*4 + valPattern + \
+                         r"[ \t]*(?:;.*)?|" + \
+                         r"(?P<subckt>(?i:\.subckt))" + \
+                         r"(?P<ports>" + netsPattern + r"+)" + \
+                         r"[ \t]*(?:;.*)?|" + \
+                         r"(?P<ends>(?i:\.ends))" + \
+                         r"(?:[ \t]+(?P<endsName>[A-Za-z0-9_]+))?" + \
+                         r"[ \t]*(?:;.*)?|" + \
+                         r"(?P<nameX>[Xx][A-Za-z0-9_]*)" + \
+                         r"(?P<nets>" + netsPattern + r"{2,})" + \
+                         r"[ \t]*(?:;.*)?|" + \
+                         r"(?P<param>(?i:\.param))" + \
+                         r"(?P<assigns>(?:[ \t]+" + paramPattern.pattern + \
+                         r")+)" + \
+                         r"[ \t]*(?:;.*)?)?")
+
+#-------------------------------------------------------------------------------
+# Netlist files larger than this (in bytes) are memory mapped
+#-------------------------------------------------------------------------------
+mmapThreshold = 1 << 24
+
+#-------------------------------------------------------------------------------
+# netlistLines
+# Iterate over the lines of a netlist without loading it as a whole
+#
+# -Inputs
+# source: A spice netlist given as a raw string, a file object, or a path
+#         (pathlib.Path). Large files are memory mapped
+# -Outputs
+# A generator of the lines (without the line breaks)
+#-------------------------------------------------------------------------------
+def netlistLines(source):
+    if isinstance(source, str):
+        yield from source.splitlines()
+    elif hasattr(source, 'read'):
+        for line in source:
+            yield line.rstrip('\r\n')
+    else:
+        with open(source, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size < mmapThreshold:
+                for line in handle:
+                    yield line.decode('utf-8').rstrip('\r\n')
+                return
+            with mmap.mmap(handle.fileno(), 0, access = mmap.ACCESS_READ) \
+                 as mm:
+                for line in iter(mm.readline, b''):
+                    yield line.decode('utf-8').rstrip('\r\n')
+
+#-------------------------------------------------------------------------------
+# streamComponents
+# Parse a netlist one line at a time and yield its components as they are
+# found. The errors report the number of the line
+#
+# The devices between .SUBCKT and .ENDS go to the store of the definition
+# (see subcircuit), the X lines become instances of the subcircuits (see
+# componentStore.addInstance), and the .PARAM lines (.PARAM name=value ...)
+# become parameters of the store. None of them is yielded
+#
+# -Inputs
+# source: A spice netlist given as a raw string, a file object, or a path
+#         (see netlistLines)
+# store:  componentStore that receives the devices (a new one if None)
+# -Outputs
+# A generator of component instances (views of the store)
+#-------------------------------------------------------------------------------
+def streamComponents(source, store = None):
+    store  = componentStore() if store is None else store
+    match  = linePattern.fullmatch
+    defn   = None
+    number = 0
+    for (number, line) in enumerate(netlistLines(source), 1):
+        m = match(line)
+        if m is None:
+            raise Error("Line " + str(number) + ": Error when processing " + \
+                        "the line \"" + line + "\". Unsuported device, " + \
+                        "net name or device  value")
+        if m.lastindex is None:
+            #Empty line or comment
+            continue
+        groups = m.groups()
+        target = store if defn is None else defn.store
+        try:
+            if groups[0] is not None:
+                comp = target.append(groups[0], [groups[1], groups[2]], \
+                                     groups[3])
+            elif groups[4] is not None:
+                comp = target.append(groups[4], list(groups[5:9]), groups[9])
+            elif m.group('subckt') is not None:
+                if defn is not None:
+                    raise Error("Nested subcircuit definitions aren't " + \
+                                "supported")
+                ports = m.group('ports').split()
+                if ports[0] in store.subckts:
+                    raise Error(ports[0] + ": Duplicated subcircuit.")
+                defn  = subcircuit(ports[0], ports[1:])
+                defn.store.subckts = store.subckts
+                defn.store.params  = store.params
+                defn.store.known   = store.known
+                store.subckts[defn.name] = defn
+                continue
+            elif m.group('ends') is not None:
+                if defn is None:
+                    raise Error(".ENDS without .SUBCKT")
+                name = m.group('endsName')
+                if name is not None and name != defn.name:
+                    raise Error(".ENDS " + name + " closes the subcircuit " + \
+                                defn.name)
+                defn = None
+                continue
+            elif m.group('nameX') is not None:
+                nets = m.group('nets').split()
+                target.addInstance(m.group('nameX'), nets[:-1], nets[-1])
+                continue
+            else:
+                if defn is not None:
+                    raise Error("Parameters inside subcircuits aren't " + \
+                                "supported. Move the .PARAM line out of " + \
+                                defn.name)
+                for (name, value) in paramPattern.findall(m.group('assigns')):
+                    store.addParam(name, value)
+                continue
+        except Error as e:
+            raise Error("Line " + str(number) + ": " + str(e.value))
+        if defn is None:
+            yield comp
+    if defn is not None:
+        raise Error("Line " + str(number) + ": Missing .ENDS of the " + \
+                    "subcircuit " + defn.name)
+    store.checkInstances()
+    if len(store.params) != 0:
+        store.setParams()
 
 #-------------------------------------------------------------------------------
 # netlistParser
@@ -131,56 +822,74 @@ class component:
 # the component class.
 #
 # -Inputs
-# netlist:  A spice netlist given as a raw string
+# netlist:  A spice netlist given as a raw string, a file object, or a path
+#           (see netlistLines)
+# flatten:  Replace the instances of subcircuits by their devices (see
+#           flattenStore). Otherwise they are kept in the store
 # -Outputs
-# compDict: The component dictionary 
-#-------------------------------------------------------------------------------
-def netlistParser(netlist):
-    #Regex patterns
-    patternEmptyLines = r"^[ \t]*$|^[ \t]*\*.*"
-    pattern2tDevices  = r"^[ \t]*([VvIiLlRrCc][A-Za-z0-9_]*)[ \t]+" + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9+*/()\- \.]+)[ \t]*(;.*)?$"
-    pattern4tDevices  = r"^[ \t]*([EeHhGgFfTt][A-Za-z0-9_]*)[ \t]+"   + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9_]+)[ \t]+" + \
-                        r"([A-Za-z0-9+*/()\- \.]+)[ \t]*(;.*)?$"
-    #Split the netlist in lines and fillout the component dictionary
-    compDict = {}
-    compList = []
-    lineList = re.findall("(.*)\n*", netlist)
-    for line in lineList:
-        #Remove empty line and comment
-        if(re.search(patternEmptyLines, line)):
-            continue
-        #Find 2 terminal devices
-        elif(re.search(pattern2tDevices, line)):
-            compDesc = re.findall(pattern2tDevices, line)[0]
-            if compDesc[0] in compDict.keys():
-                raise Error(compDesc[0] + ": Duplicated device.")
-            compDict[compDesc[0]] = component(compDesc[0],               \
-                                              [compDesc[1],compDesc[2]], \
-                                              compDesc[3])
-            compList.append(compDict[compDesc[0]])
-        #Find 4 terminal devices
-        elif(re.search(pattern4tDevices, line)):
-            compDesc = re.findall(pattern4tDevices, line)[0]
-            if compDesc[0] in compDict.keys():
-                raise Error(compDesc[0] + ": Duplicated device.")
-            compDict[compDesc[0]] = component(compDesc[0],      \
-                                    [compDesc[1], compDesc[2],  \
-                                     compDesc[3],compDesc[4]],  \
-                                    compDesc[5])
-            compList.append(compDict[compDesc[0]])
-        #Invalid line
-        else:
-            raise Error("Error when processing the line \"" + line +
-                        "\". Unsuported device, net name or device  value")
+# compDict: The component dictionary (see componentDict)
+# compList: The list of components in the order of the netlist (see
+#           componentList). Both are views of the same componentStore
+#-------------------------------------------------------------------------------
+def netlistParser(netlist, flatten = False):
+    store = componentStore()
+    for comp in streamComponents(netlist, store):
+        pass
+    if flatten and len(store.instances) != 0:
+        store = flattenStore(store)
+    return (componentDict(store), componentList(store))
+
+#-------------------------------------------------------------------------------
+# flattenStore
+# Replace the instances of subcircuits by copies of their devices. The devices
+# and the internal nets of the instances get hierarchical names: the device R1
+# and the net mid of the instance X1 become X1.R1 and X1.mid (X1.Y1.R1 for the
+# instance Y1 inside X1)
+#
+# -Inputs
+# store: componentStore with instances of subcircuits
+# -Outputs
+# flat:  new componentStore without instances
+#-------------------------------------------------------------------------------
+def flattenStore(store):
+    flat = componentStore()
+    flat.params = store.params
+    flat.known  = store.known
+    flattenInto(flat, store, '', {})
+    return flat
+
+#-------------------------------------------------------------------------------
+# flattenInto
+# Copy the devices of a store (and of its instances) into a flat store
+#
+# -Inputs
+# flat:   componentStore that receives the devices
+# store:  componentStore that is copied
+# prefix: prefix of the names of the devices and of the internal nets
+# ports:  dictionary mapping the ports of the store into the nets of flat
+#-------------------------------------------------------------------------------
+def flattenInto(flat, store, prefix, ports):
+    for i in range(0, len(store)):
+        flat.append(prefix + store.names[i], \
+                    [flatNet(name, prefix, ports) for name in \
+                     store.netNames(i)], store.texts[store.vals[i]])
+    for inst in store.instances.values():
+        defn = store.subckts[inst.getSubckt()]
+        nets = [flatNet(name, prefix, ports) for name in inst.getNodes()]
+        flattenInto(flat, defn.store, prefix + inst.getName() + '.', \
+                    dict(zip(defn.ports, nets)))
 
-    return (compDict, compList)
+#-------------------------------------------------------------------------------
+# flatNet
+# Name of a net of a subcircuit in the flattened netlist (see flattenInto). The
+# ground keeps its name
+#-------------------------------------------------------------------------------
+def flatNet(name, prefix, ports):
+    if name in ports:
+        return ports[name]
+    if name.upper() == 'GND' or name == '0':
+        return name
+    return prefix + name
 
 #-------------------------------------------------------------------------------
 # calcNodesnJ
@@ -196,9 +905,18 @@ def netlistParser(netlist):
 # nodesDict: Dictionary corelating the net name with the node number
 #
 # This function also updates the J matrix index of each afected  component  in
-# the component list  
+# the component list. The devices of a componentStore are numbered while they
+# are parsed, so its numbering is returned as it is, once the instances of
+# subcircuits get their entries of J (see reduceSubcircuits)
 #-------------------------------------------------------------------------------
 def calcNodesnJ(compList):
+    if isinstance(compList, componentList):
+        store = compList.store
+        if len(store.instances) != 0:
+            #Imported here, since subckt depends on this module
+            from netlist2ss.subckt import reduceSubcircuits
+            reduceSubcircuits(store)
+        return (store.nJ, store.nNodes, store.nodesDict)
     nJ         = 0
     nNodes     = 0
     nodesDict  = {}
@@ -226,38 +944,58 @@ def calcNodesnJ(compList):
     return (nJ, nNodes, nodesDict) 
 
 #-------------------------------------------------------------------------------
-# nodalAnalysisMatrices
-# Construct the nodal analysis matrices
+# stamp
+# Add a value to an entry of a matrix stored as a dictionary of keys
 #
 # -Inputs
-# compDict:  The component dictionary generated by the netlistParser
-# nJ:        Size of the J matrix
+# dok:   Dictionary mapping (row, col) into the value of the entry
+# row:   Row of the entry
+# col:   Column of the entry
+# value: Value to be added to the entry
+#-------------------------------------------------------------------------------
+def stamp(dok, row, col, value):
+    key = (row, col)
+    if key in dok:
+        dok[key] = dok[key] + value
+    else:
+        dok[key] = value
+
+#-------------------------------------------------------------------------------
+# stampDevices
+# Collect the stamps of all devices of the nodal analysis as  (row, col) ->
+# value triplets. The rows and columns of the A matrix are the nodes followed
+# by the indexes of the J matrix, so G, B, C, and D are the four blocks of A,
+# and I and E are the two blocks of Z.
+#
+# The values are given apart from the components, so the same stamps can  be
+# filled with sympy expressions or with numbers
+#
+# -Inputs
+# compList:  The component list generated by the netlistParser
 # nNodes:    Number of nodes in the nodal analysis
 # nodesDict: Dictionary corelating the net name with the node number 
+# values:    List with the value of each component
+# states:    List with the state variable of each component (None if the
+#            component doesn't have a state)
 # -Outputs:
-# A: The A matrix is a concatenation of the G, B, C, and D matrices
-# Z: Z is a column vector which is the concatenation of I and E matrices
+# A: Dictionary of keys of the A matrix
+# Z: Dictionary of keys of the Z matrix
 #-------------------------------------------------------------------------------
-def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
+def stampDevices(compList, nNodes, nodesDict, values, states):
 
     #---------------------------------------------------------------------------
-    # Alocate matrices
+    # Alocate the dictionaries of keys
     #---------------------------------------------------------------------------
-    G = si.zeros(nNodes, nNodes)
-    I = si.zeros(nNodes, 1)
-    if nJ != 0:
-        B = si.zeros(nNodes, nJ)
-        C = si.zeros(nJ, nNodes)
-        D = si.zeros(nJ, nJ)
-        E = si.zeros(nJ, 1)
+    A = {}
+    Z = {}
 
     #---------------------------------------------------------------------------
     # Loop trough all components 
     #---------------------------------------------------------------------------
-    for comp in compList:
+    for (comp, value, st) in zip(compList, values, states):
 
         #-----------------------------------------------------------------------
-        # Read nodes and J matrix indexes
+        # Read nodes and J matrix indexes (as rows/columns of the A matrix)
         #-----------------------------------------------------------------------
         nodes = comp.getNodes()
         n1 = nodesDict[nodes[0]]
@@ -267,23 +1005,28 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             n4 = nodesDict[nodes[3]] 
         e1 = comp.getE1Idx()
         e2 = comp.getE2Idx()
+        if e1 is not None:
+            e1 = nNodes + e1
+        if e2 is not None:
+            e2 = nNodes + e2
 
         #-----------------------------------------------------------------------
         # fill the G matrix with resistors from the netlist
         #-----------------------------------------------------------------------
         if comp.getType() == 'R':
+            g = 1/value
             #If  neither  side  of  the element is  connected  to  ground then 
             #subtract it from appropriate location in matrix.
             if n1 != -1 and n2 != -1:
-                G[n1, n2] = G[n1, n2] - 1/comp.getValue()
-                G[n2, n1] = G[n2, n1] - 1/comp.getValue()
+                stamp(A, n1, n2, -g)
+                stamp(A, n2, n1, -g)
             #If node 1 is not connected to ground, add element to  diagonal of 
             #matrix
             if n1 != -1:
-                G[n1, n1] = G[n1, n1] + 1/comp.getValue()
+                stamp(A, n1, n1, g)
             #Ditto for node 2.
             if n2 != -1:
-                G[n2, n2] = G[n2, n2] + 1/comp.getValue()
+                stamp(A, n2, n2, g)
 
         #-----------------------------------------------------------------------
         # fill the G  matrix  with  voltage  controled  current  sources  from 
@@ -293,19 +1036,19 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #If neither n1 and n3 is  connected  to  ground  then  sum  it  to 
             #appropriate location in matrix.
             if n1 != -1 and n3 != -1:
-                G[n1, n3] = G[n1, n3] + comp.getValue()
+                stamp(A, n1, n3, value)
             #If neither n1 and n4 is connected to ground then subtract it from
             #appropriate location in matrix.
             if n1 != -1 and n4 != -1:
-                G[n1, n4] = G[n1, n4] - comp.getValue()
+                stamp(A, n1, n4, -value)
             #If neither n2 and n3 is connected to ground then subtract it from
             #appropriate location in matrix.
             if n2 != -1 and n3 != -1:
-                G[n2, n3] = G[n2, n3] - comp.getValue()
+                stamp(A, n2, n3, -value)
             #If neither n2 and  n4  is  connected to ground  then  sum  it  to 
             #appropriate location in matrix.
             if n2 != -1 and n4 != -1:
-                G[n2, n4] = G[n2, n4] + comp.getValue()
+                stamp(A, n2, n4, value)
 
         #-----------------------------------------------------------------------
         # fill the I matrix with independent  current  sources  and  inductors 
@@ -315,11 +1058,11 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then subtract the current 
             #in the correct location in the matrix 
             if n1 != -1:
-                I[n1] = I[n1] - comp.getValue()
+                stamp(Z, n1, 0, -value)
             #Check if node 2 is  connected to ground, then sum the  current in
             #the correct location in the matrix 
             if n2 != -1:
-                I[n2] = I[n2] + comp.getValue()
+                stamp(Z, n2, 0, value)
         
         #-----------------------------------------------------------------------
         # fill the I matrix with inductors from the netlist.
@@ -332,11 +1075,11 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then subtract the current
             #in the correct location in the matrix 
             if n1 != -1:
-                I[n1] = I[n1] - comp.getST()
+                stamp(Z, n1, 0, -st)
             #Check if node 2  is  connected to ground, then sum the current in 
             #the correct location in the matrix 
             if n2 != -1:
-                I[n2] = I[n2] + comp.getST()
+                stamp(Z, n2, 0, st)
 
         #-----------------------------------------------------------------------
         # Fill the C  and  B  matrices  with  independent voltage  sources and 
@@ -346,15 +1089,15 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then fill-out the B and C 
             #matrix
             if n1 != -1:  
-                B[n1, e1] = 1      
-                C[e1, n1] = 1 
+                stamp(A, n1, e1, 1)
+                stamp(A, e1, n1, 1)
             #Check if node 2 is connected to ground, then fill-out the B and C
             #matrix
             if n2 != -1:  
-                B[n2, e1] = -1     
-                C[e1, n2] = -1
+                stamp(A, n2, e1, -1)
+                stamp(A, e1, n2, -1)
             #E matrix
-            E[e1] = comp.getValue()
+            stamp(Z, e1, 0, value)
 
         #-----------------------------------------------------------------------
         # Fill the C and B matrices with capacitors from the netlist.
@@ -367,15 +1110,15 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then fill-out the B and C 
             #matrix
             if n1 != -1:  
-                B[n1, e1] = 1      
-                C[e1, n1] = 1 
+                stamp(A, n1, e1, 1)
+                stamp(A, e1, n1, 1)
             #Check if node 2 is connected to ground, then fill-out the B and C
             #matrix
             if n2 != -1:  
-                B[n2, e1] = -1     
-                C[e1, n2] = -1
+                stamp(A, n2, e1, -1)
+                stamp(A, e1, n2, -1)
             #E matrix
-            E[e1] = comp.getST()
+            stamp(Z, e1, 0, st)
 
         #-----------------------------------------------------------------------
         # Fill the B and C matrices with  voltage controlled  voltage  sources
@@ -384,21 +1127,21 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then fill-out the B and C 
             #matrix
             if n1 != -1:  
-                B[n1, e1] = 1      
-                C[e1, n1] = 1 
+                stamp(A, n1, e1, 1)
+                stamp(A, e1, n1, 1)
             #Check if node 2 is connected to ground, then fill-out the B and C
             #matrix
             if n2 != -1:  
-                B[n2, e1] = -1     
-                C[e1, n2] = -1
+                stamp(A, n2, e1, -1)
+                stamp(A, e1, n2, -1)
             #Check if node 3  is  connected  to  ground, then  fill-out  the C 
             #matrix
             if n3 != -1:      
-                C[e1, n3] = -comp.getValue()
+                stamp(A, e1, n3, -value)
             #Check if node 4  is  connected  to  ground, then fill-out  the  C 
             #matrix
             if n4 != -1:      
-                C[e1, n4] = comp.getValue()
+                stamp(A, e1, n4, value)
 
         #-----------------------------------------------------------------------
         # Fill the B and C matrices  with current controlled  current  sources
@@ -407,21 +1150,21 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1  is  connected  to  ground, then fill-out  the  B
             #matrix
             if n1 != -1:  
-                B[n1, e1] = comp.getValue() 
+                stamp(A, n1, e1, value)
             #Check if node 2  is  connected  to  ground, then fill-out  the  B
             #matrix
             if n2 != -1:  
-                B[n2, e1] = -comp.getValue()
+                stamp(A, n2, e1, -value)
             #Check if ctrl 1  is  connected  to  ground, then fill-out  the  B
             #and C matrix
             if n3 != -1:   
-                B[n3, e1] = 1   
-                C[e1, n3] = 1
+                stamp(A, n3, e1, 1)
+                stamp(A, e1, n3, 1)
             #Check if ctrl 2  is  connected  to  ground, then fill-out  the  B
             #and C matrix
             if n4 != -1:   
-                B[n4, e1] = -1   
-                C[e1, n4] = -1
+                stamp(A, n4, e1, -1)
+                stamp(A, e1, n4, -1)
 
         #-----------------------------------------------------------------------
         # Fill the B and C matrices with current  controlled  voltage  sources 
@@ -430,25 +1173,25 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then fill-out the B and C
             #matrix
             if n1 != -1:  
-                B[n1, e2] = 1
-                C[e1, n1] = 1
+                stamp(A, n1, e2, 1)
+                stamp(A, e1, n1, 1)
             #Check if node 2 is connected to ground, then fill-out the B and C
             #matrix
             if n2 != -1:  
-                B[n2, e2] = -1
-                C[e1, n2] = -1
+                stamp(A, n2, e2, -1)
+                stamp(A, e1, n2, -1)
             #Check if node 3 is connected to ground, then fill-out the B and C
             #matrix
             if n3 != -1:   
-                B[n3, e1] = 1   
-                C[e2, n3] = 1
+                stamp(A, n3, e1, 1)
+                stamp(A, e2, n3, 1)
             #Check if node 4 is connected to ground, then fill-out the B and C
             #matrix
             if n4 != -1:   
-                B[n4, e1] = -1   
-                C[e2, n4] = -1
+                stamp(A, n4, e1, -1)
+                stamp(A, e2, n4, -1)
             #D matrix
-            D[e1, e1] = -comp.getValue()
+            stamp(A, e1, e1, -value)
 
         #-----------------------------------------------------------------------
         # Ideal transformer 
@@ -457,47 +1200,76 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
             #Check if node 1 is connected to ground, then fill-out the B and C
             #matrix
             if n1 != -1:  
-                B[n1, e1] = 1
-                C[e2, n1] = -comp.getValue()
+                stamp(A, n1, e1, 1)
+                stamp(A, e2, n1, -value)
             #Check if node 2 is connected to ground, then fill-out the B and C
             #matrix
             if n2 != -1:  
-                B[n2, e1] = -1
-                C[e2, n2] = comp.getValue()
+                stamp(A, n2, e1, -1)
+                stamp(A, e2, n2, value)
             #Check if node 3 is connected to ground, then fill-out the B and C
             #matrix
             if n3 != -1:   
-                B[n3, e2] = 1   
-                C[e2, n3] = 1
+                stamp(A, n3, e2, 1)
+                stamp(A, e2, n3, 1)
             #Check if node 4 is connected to ground, then fill-out the B and C
             #matrix
             if n4 != -1:   
-                B[n4, e2] = -1   
-                C[e2, n4] = -1
+                stamp(A, n4, e2, -1)
+                stamp(A, e2, n4, -1)
             #D matrix
-            D[e1, e2] = comp.getValue()
-            D[e1, e1] = 1
+            stamp(A, e1, e2, value)
+            stamp(A, e1, e1, 1)
 
-    #---------------------------------------------------------------------------
-    # Calculate the A and Z matrices 
-    #---------------------------------------------------------------------------
-    if nJ != 0:
-        A = (G.row_join(B)).col_join(C.row_join(D))
-        Z = I.col_join(E)
-    else:
-        A = G
-        Z = I
+    return (A, Z)
 
+#-------------------------------------------------------------------------------
+# nodalAnalysisMatrices
+# Construct the nodal analysis matrices. The stamps of the devices are collected
+# as (row, col) -> value triplets and the matrices are returned as sparse sympy
+# matrices, so the assembly cost grows with the number of devices and not with
+# the square of the number of nodes. The instances of subcircuits are stamped
+# by their port models (see the subckt module).
+#
+# -Inputs
+# compDict:  The component dictionary generated by the netlistParser
+# nJ:        Size of the J matrix
+# nNodes:    Number of nodes in the nodal analysis
+# nodesDict: Dictionary corelating the net name with the node number 
+# -Outputs:
+# A: The A matrix is a concatenation of the G, B, C, and D matrices
+# Z: Z is a column vector which is the concatenation of I and E matrices
+#-------------------------------------------------------------------------------
+def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
+    (A, Z) = stampDevices(compList, nNodes, nodesDict,                 \
+                          [comp.getValue() for comp in compList],       \
+                          [comp.getST() for comp in compList])
+    store  = getattr(compList, 'store', None)
+    if store is not None and len(store.instances) != 0:
+        #Imported here, since subckt depends on this module
+        from netlist2ss.subckt import stampInstances
+        stampInstances(store, nNodes, nodesDict, A, Z)
+    n = nNodes + nJ
+    A = si.SparseMatrix(n, n, {key: v for (key, v) in A.items() if v != 0})
+    Z = si.SparseMatrix(n, 1, {key: v for (key, v) in Z.items() if v != 0})
     return (A, Z)  
 
 #-------------------------------------------------------------------------------
 # solveSystem
-# Solve the symbolic nodal analysis system 
+# Solve the symbolic nodal analysis system. The system is solved by the sparse
+# fraction-free elimination engine whenever all entries are rational functions
+# of the circuit parameters. Otherwise (floats, radicals, transcendental values,
+# etc), the system is solved by the symbolic inverse.
 #
 # -Inputs
 # A:      The A matrix is a concatenation of the G, B, C, and D matrices
 # Z:      Z is a column vector which is the concatenation of I and E  matrices
 # nNodes: Number of nodes in the nodal analysis
+# needed: Indexes (in the concatenation of V and J) of the unknowns that  must
+#         be calculated. All of them are calculated if None. The ones that are
+#         not needed are returned as their placeholders
+# unknowns: Placeholders (V, J) of the unknowns (see unknownSymbols). New ones
+#         are created if None
 # -Outputs
 # V:      The V matrix contains the voltage in all nodes of the system
 # J:      The J matrix contains the current flowing trough  current  controled 
@@ -505,20 +1277,84 @@ def nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict):
 #         controled  voltage   sources,   independent   voltage   source,  and 
 #         capacitors
 #-------------------------------------------------------------------------------
-def solveSystem(A, Z, nNodes):
+def solveSystem(A, Z, nNodes, needed = None, unknowns = None):
+    n = A.shape[0]
     try:
-        X = A.inv()*Z
-    except: 
+        X = fractionFreeSolve(A, Z, needed)
+        if X is None:
+            X = A.inv()*Z
+            X = {i: X[i] for i in range(0, n)}
+    except:
         raise Error('Unable to solve the linear system. Check the netlist')
+    #The unknowns that weren't solved keep their placeholders, so using them
+    #leaves a symbol in the results instead of a silent nan
+    if unknowns is None:
+        unknowns = unknownSymbols(nNodes, n - nNodes)
+    P = list(unknowns[0][0:nNodes, 0]) + list(unknowns[1])
+    X = si.Matrix(n, 1, [X[i] if (needed is None or i in needed) and i in X \
+                         else P[i] for i in range(0, n)])
     V = X[0:nNodes, 0]
     J = X[nNodes: , 0]
     V = V.col_join(si.zeros(1, 1))
     return (V, J)
 
+#-------------------------------------------------------------------------------
+# unknownSymbols
+# Create placeholder symbols for the unknowns  of the nodal  analysis.  They
+# are used to build the state and output equations before solving the system,
+# so only the unknowns that are actually consumed need to be calculated.
+#
+# -Inputs
+# nNodes: Number of nodes in the nodal analysis
+# nJ:     Size of the J matrix
+# -Outputs
+# V:      Placeholders for the node voltages (the ground is appended as zero)
+# J:      Placeholders for the J matrix
+#-------------------------------------------------------------------------------
+def unknownSymbols(nNodes, nJ):
+    V = si.Matrix(nNodes, 1, [si.Dummy('V%d' % i) for i in range(0, nNodes)])
+    J = si.Matrix(nJ, 1, [si.Dummy('J%d' % i) for i in range(0, nJ)])
+    V = V.col_join(si.zeros(1, 1))
+    return (V, J)
+
+#-------------------------------------------------------------------------------
+# neededUnknowns
+# Find which unknowns of the nodal analysis are used by a set of equations
+#
+# -Inputs
+# exprs:  List of matrices built with the placeholders of unknownSymbols
+# V:      Placeholders for the node voltages
+# J:      Placeholders for the J matrix
+# -Outputs
+# needed: Set of indexes (in the concatenation of V and J) of the unknowns used
+#-------------------------------------------------------------------------------
+def neededUnknowns(exprs, V, J):
+    used = set()
+    for expr in exprs:
+        used = used | expr.free_symbols
+    unknowns = list(V[0:V.shape[0] - 1, 0]) + list(J)
+    return set([i for i in range(0, len(unknowns)) if unknowns[i] in used])
+
+#-------------------------------------------------------------------------------
+# replaceUnknowns
+# Replace the placeholders of unknownSymbols with the solution of the system
+#
+# -Inputs
+# expr:   Matrix built with the placeholders of unknownSymbols
+# V, J:   Placeholders for the node voltages and for the J matrix
+# Vs, Js: Solution of the nodal analysis system
+# -Outputs
+# expr:   The same matrix as a function of the solution
+#-------------------------------------------------------------------------------
+def replaceUnknowns(expr, V, J, Vs, Js):
+    sub = dict(zip(list(V) + list(J), list(Vs) + list(Js)))
+    return expr.xreplace(sub)
+
 #-------------------------------------------------------------------------------
 # stateEquations
 # Returns a vector listing all the states and a vector containing  the  set of 
-# equations for each state
+# equations for each state. The states of the instances of subcircuits come
+# after the states of the devices (see the subckt module)
 #
 # -Inputs
 # compDict:  The component dictionary generated by the netlistParser
@@ -556,6 +1392,14 @@ def stateEquations (compList, nodesDict, V, J):
             F.append(J[comp.getE1Idx()]/comp.getValue())
             X.append(comp.getST())
             nST = nST + 1
+    store = getattr(compList, 'store', None)
+    if store is not None and len(store.instances) != 0:
+        #Imported here, since subckt depends on this module
+        from netlist2ss.subckt import instanceStates
+        (XI, FI) = instanceStates(store, nodesDict, V, J)
+        X   = X + XI
+        F   = F + FI
+        nST = nST + len(XI)
 
     #---------------------------------------------------------------------------
     # reshape the output
@@ -591,10 +1435,23 @@ def parseOutputs (compDict, nodesDict, V, J, outputs):
     #---------------------------------------------------------------------------
     # Loop trough all outputs      
     #---------------------------------------------------------------------------
+    store = getattr(compDict, 'store', None)
     for i in range(0, len(outputs)):
         meas = outputs[i][0:2]
         name = outputs[i][2:]
 
+        #-----------------------------------------------------------------------
+        # Measurement inside an instance of a subcircuit (see the subckt module)
+        #-----------------------------------------------------------------------
+        if store is not None and len(store.instances) != 0 and \
+           not name in nodesDict and not name in compDict:
+            #Imported here, since subckt depends on this module
+            from netlist2ss.subckt import instanceOutput
+            value = instanceOutput(store, nodesDict, V, J, meas, name)
+            if value is not None:
+                G[i] = value
+                continue
+
         #-----------------------------------------------------------------------
         # Node voltage measurement
         #-----------------------------------------------------------------------
@@ -706,6 +1563,123 @@ def parseInputs (inputs):
     U = si.Matrix(len(inputs), 1, si.sympify(inputs)) 
     return U
 
+#-------------------------------------------------------------------------------
+# Simplification levels accepted by simplifyMatrix, from the cheapest to  the
+# most expensive one
+#-------------------------------------------------------------------------------
+simplifyLevels = ['none', 'cancel', 'factor', 'full']
+
+#-------------------------------------------------------------------------------
+# simplifyMatrix
+# Simplify all entries of a matrix. The cost of each level is predictable:
+#
+# none:   the entries are returned as they are
+# cancel: the entries are written as a single fraction of expanded polynomials
+#         without common factors (cheap)
+# factor: same as cancel, but the numerator and denominator are factored
+# full:   sympy simplify, which tries several heuristics (expensive)
+#
+# -Inputs
+# M:     sympy matrix
+# level: one of the levels listed above
+# -Outputs
+# M:     simplified matrix
+#-------------------------------------------------------------------------------
+def simplifyMatrix(M, level):
+    if not level in simplifyLevels:
+        raise Error("Unknown simplification level: " + str(level) + \
+                    ". Use one of " + str(simplifyLevels))
+    if level == 'cancel':
+        return M.applyfunc(si.cancel)
+    elif level == 'factor':
+        return M.applyfunc(si.factor)
+    elif level == 'full':
+        return si.simplify(M)
+    return M
+
+#-------------------------------------------------------------------------------
+# simplifyEntries
+# Simplify a list of expressions. This is the task run by each worker of
+# parallelSimplify, so it must be a module level function
+#
+# -Inputs
+# exprs: list of sympy expressions
+# level: simplification level (see simplifyMatrix)
+# -Outputs
+# exprs: list of simplified expressions
+#-------------------------------------------------------------------------------
+def simplifyEntries(exprs, level):
+    return list(simplifyMatrix(si.Matrix(len(exprs), 1, exprs), level))
+
+#-------------------------------------------------------------------------------
+# parallelSimplify
+# Simplify the entries of several matrices in a pool of processes. The entries
+# that are numbers are skipped, and the other ones are split in chunks with
+# about the same number of operations (largest first), so the  workers  stay
+# busy even when the size of the entries is very different.
+#
+# -Inputs
+# matrices: list of sympy matrices
+# level:    simplification level (see simplifyMatrix)
+# workers:  number of processes
+# -Outputs
+# matrices: list with the simplified matrices
+#-------------------------------------------------------------------------------
+def parallelSimplify(matrices, level, workers):
+    if not level in simplifyLevels:
+        raise Error("Unknown simplification level: " + str(level) + \
+                    ". Use one of " + str(simplifyLevels))
+    entries = [(m, i) for m in range(0, len(matrices)) \
+                      for i in range(0, len(matrices[m])) \
+                      if not si.sympify(matrices[m][i]).is_Number]
+    if level == 'none' or len(entries) == 0:
+        return list(matrices)
+    #Longest processing time first: each entry goes to the lightest chunk
+    sizes  = {key: si.count_ops(matrices[key[0]][key[1]]) for key in entries}
+    chunks = [[] for k in range(0, min(2*workers, len(entries)))]
+    loads  = [0]*len(chunks)
+    for key in sorted(entries, key = lambda key: -sizes[key]):
+        k = loads.index(min(loads))
+        chunks[k].append(key)
+        loads[k] = loads[k] + sizes[key] + 1
+    #Simplify the chunks and reassemble the matrices
+    result = [M.as_mutable() for M in matrices]
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        jobs = [pool.submit(simplifyEntries, \
+                            [matrices[m][i] for (m, i) in chunk], level) \
+                for chunk in chunks]
+        for (chunk, job) in zip(chunks, jobs):
+            for ((m, i), expr) in zip(chunk, job.result()):
+                result[m][i] = expr
+    return result
+
+#-------------------------------------------------------------------------------
+# linearOP
+# Calculate the operating point of the states when the state equations  are
+# affine in the states (F = JX*X + F0). In this case the operating point comes
+# from the linear system JX*X = -F0, which is solved by the fraction-free
+# elimination engine instead of the general sympy solver.
+#
+# -Inputs
+# F:  column vector with a equation for each state
+# X:  column vector listing all states
+# JX: jacobian of F with relation to X (it doesn't depend on X)
+# -Outputs
+# X_OP: column vector with the states at the operating point
+#-------------------------------------------------------------------------------
+def linearOP(F, X, JX):
+    nST = len(X)
+    if nST == 0:
+        return si.zeros(0, 1)
+    F0  = F.xreplace({X[i]: 0 for i in range(0, nST)})
+    try:
+        sol = fractionFreeSolve(JX, -F0)
+        if sol is None:
+            sol = JX.inv()*(-F0)
+    except:
+        raise Error("The isn't a single solution. Check the netlist.")
+    return si.Matrix(nST, 1, [sol[i] for i in range(0, nST)])
+
 #-------------------------------------------------------------------------------
 # calcABCD
 # Calculate A, B, C, D, and DC_OP matrices
@@ -715,6 +1689,7 @@ def parseInputs (inputs):
 # X: column vector listing all states
 # G: column vector containing the set of output equations 
 # U: column vector listing all inputs of the system
+# simplify: simplification level of the results (see simplifyMatrix)
 # -Outputs
 # A: state matrix
 # B: input matrix
@@ -722,31 +1697,381 @@ def parseInputs (inputs):
 # D: feedforward matrix
 # DC_OP: operating point
 #-------------------------------------------------------------------------------
-def calcABCD (F, X, G, U):
-    #Calculate the state at the operating point
+def calcABCD (F, X, G, U, simplify = 'full'):
+    #The jacobian of [F; G] with relation to [X; U] is calculated once and the
+    #last column keeps [F; G], so a single substitution of the operating point
+    #is needed to get A, B, C, D, and DC_OP
     nST  = len(X)
-    sol  = si.solve(F, X)
-    #dummy fix for the empty solution case
-    if sol == [] and nST != 0:
-        raise Error("The isn't a single solution. Check the netlist.")
-    for stVar in X:
-        if not stVar in sol.keys():
+    nIn  = len(U)
+    H    = F.col_join(G)
+    M    = H.jacobian(X.col_join(U)).row_join(H)
+    JX   = M[0:nST, 0:nST]
+    #Calculate the state at the operating point
+    if len(JX.free_symbols & set(X)) == 0:
+        X_OP = linearOP(F, X, JX)
+    else:
+        sol  = si.solve(F, X)
+        #dummy fix for the empty solution case
+        if sol == [] and nST != 0:
             raise Error("The isn't a single solution. Check the netlist.")
-    X_OP = si.Matrix(nST, 1, [sol[X[i]] for i in range(0, nST)])
+        for stVar in X:
+            if not stVar in sol.keys():
+                raise Error("The isn't a single solution. Check the netlist.")
+        X_OP = si.Matrix(nST, 1, [sol[X[i]] for i in range(0, nST)])
     #Linearized system (if the system is not linear) at the operating point 
-    A = F.jacobian(X).subs([ (X[i], X_OP[i]) for i in range(0, nST) ])
-    A = si.simplify(A)
-    B = F.jacobian(U).subs([ (X[i], X_OP[i]) for i in range(0, nST) ])
-    B = si.simplify(B)
-    C = G.jacobian(X).subs([ (X[i], X_OP[i]) for i in range(0, nST) ])
-    C = si.simplify(C)
-    D = G.jacobian(U).subs([ (X[i], X_OP[i]) for i in range(0, nST) ])
-    D = si.simplify(D)
-    #Calculate the outputs of the system at the operating point
-    DC_OP = G.subs([ (X[i], X_OP[i]) for i in range(0, nST) ])
-    DC_OP = si.simplify(DC_OP)
+    M = M.xreplace({X[i]: X_OP[i] for i in range(0, nST)})
+    A = simplifyMatrix(M[0:nST, 0:nST], simplify)
+    B = simplifyMatrix(M[0:nST, nST:nST + nIn], simplify)
+    C = simplifyMatrix(M[nST:, 0:nST], simplify)
+    D = simplifyMatrix(M[nST:, nST:nST + nIn], simplify)
+    #Outputs of the system at the operating point
+    DC_OP = simplifyMatrix(M[nST:, nST + nIn:], simplify)
     return (A, B, C, D, DC_OP)
        
+#-------------------------------------------------------------------------------
+# Circuit Class
+# Stateful version of netlist2ss. The parsing, the nodal analysis  matrices,
+# the state equations, and the solution of the nodal analysis system are built
+# lazily and cached, so several queries with different inputs and outputs on
+# the same netlist only recompute the output equations and calcABCD. Only the
+# unknowns needed by the queries are solved, and the ones that were  already
+# solved are reused by the next queries.
+#
+# The time spent in each stage is accumulated in the times dictionary, and a
+# record of each run of a stage is delivered to the hooks and collected in the
+# stats attribute (see the instrument module).
+#
+# The parameters of the constructor are listed bellow:
+# netlist:  A string with a spice netlist
+# verbose:  Print the name and the record of each stage (see printStage)
+# simplify: Simplification level of the results (see simplifyMatrix)
+# workers:  Number of processes used to simplify the results (see
+#           parallelSimplify). They are simplified serially if None
+# cache:    Directory (or diskCache instance) of a persistent cache of the
+#           results of state_space. Nothing is cached if None
+# profile:  Record the peak memory and the size of the expressions of each
+#           stage besides the wall time (it slows down the stages)
+# hooks:    list of callables hook(event, record) called when each stage
+#           starts and ends (see runStage)
+# budget:   limits of the derivation (see the budget module). They are checked
+#           when the stages start and end and inside the loops of the solver,
+#           and a BudgetError is raised when they are exceeded
+# params:   dictionary mapping the name of the parameters into their values, or
+#           into None to keep them symbolic. The parameters of the .PARAM lines
+#           that aren't symbolic are replaced by their values when the devices
+#           are stamped (see componentStore.setParams)
+#-------------------------------------------------------------------------------
+class Circuit:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, netlist, verbose = False, simplify = 'cancel', \
+                 workers = None, cache = None, profile = False, hooks = None, \
+                 budget = None, params = None):
+        if not simplify in simplifyLevels:
+            raise Error("Unknown simplification level: " + str(simplify) + \
+                        ". Use one of " + str(simplifyLevels))
+        self.netlist  = netlist
+        self.verbose  = verbose
+        self.simplify = simplify
+        self.workers  = workers
+        self.cache    = diskCache(cache) if isinstance(cache, str) else cache
+        self.comps    = None
+        self.models   = None
+        self.nodes    = None
+        self.mna      = None
+        self.unknowns = None
+        self.states   = None
+        self.keys     = None
+        self.base     = None
+        self.solution = {}
+        self.times    = {}
+        self.profile  = profile
+        self.stats    = stageStats()
+        self.hooks    = [self.stats] + list(hooks if hooks is not None else [])
+        self.budget   = budget
+        self.params   = params
+        self.monitor  = None
+        if verbose == True:
+            self.hooks.append(printStage)
+        if budget is not None:
+            self.hooks.append(budget)
+            self.monitor = budget.monitor
+            #The errors of the budget report the size of the expressions
+            if not profile:
+                self.profile = 'size'
+
+    #---------------------------------------------------------------------------
+    # Print a message in the verbose mode
+    #---------------------------------------------------------------------------
+    def log(self, msg):
+        if self.verbose == True:
+            print(msg)
+
+    #---------------------------------------------------------------------------
+    # Run a stage, accumulate its run time and deliver its record to the hooks
+    #
+    # -Inputs
+    # stage: name of the stage in the times dictionary
+    # func:  function that implements the stage
+    # args:  arguments of func
+    # -Outputs
+    # The result of func
+    #---------------------------------------------------------------------------
+    def run(self, stage, func, *args):
+        (result, record) = runStage(self.hooks, self.profile, stage, func, \
+                                    *args)
+        self.times[stage] = self.times.get(stage, 0.0) + record['time']
+        return result
+
+    #---------------------------------------------------------------------------
+    # Cached stages
+    #---------------------------------------------------------------------------
+    def getComponents(self):
+        if self.comps is None:
+            self.comps = self.run('parse', netlistParser, self.netlist)
+            if self.params is not None:
+                self.comps[1].store.setParams(self.params)
+        return self.comps
+
+    def getNodes(self):
+        if self.nodes is None:
+            self.getModels()
+            (compDict, compList) = self.getComponents()
+            self.nodes = self.run('nodes', calcNodesnJ, compList)
+        return self.nodes
+
+    def getModels(self):
+        if self.models is None:
+            (compDict, compList) = self.getComponents()
+            self.models = {}
+            if len(compList.store.instances) != 0:
+                #Imported here, since subckt depends on this module
+                from netlist2ss.subckt import reduceSubcircuits
+                self.models = self.run('reduce', reduceSubcircuits, \
+                                       compList.store)
+        return self.models
+
+    def getMNA(self):
+        if self.mna is None:
+            self.getModels()
+            (compDict, compList) = self.getComponents()
+            (nJ, nNodes, nodesDict) = self.getNodes()
+            self.mna = self.run('mna', nodalAnalysisMatrices, \
+                                compList, nJ, nNodes, nodesDict)
+        return self.mna
+
+    def getUnknowns(self):
+        if self.unknowns is None:
+            (nJ, nNodes, nodesDict) = self.getNodes()
+            self.unknowns = unknownSymbols(nNodes, nJ)
+        return self.unknowns
+
+    def getKeys(self):
+        if self.keys is None:
+            (compDict, compList) = self.getComponents()
+            (nJ, nNodes, nodesDict) = self.getNodes()
+            self.keys = unknownKeys(compDict, nJ, nNodes, nodesDict)
+        return self.keys
+
+    def getStates(self):
+        if self.states is None:
+            self.getModels()
+            (compDict, compList) = self.getComponents()
+            (nJ, nNodes, nodesDict) = self.getNodes()
+            (V, J) = self.getUnknowns()
+            self.states = self.run('states', stateEquations, \
+                                   compList, nodesDict, V, J)
+        return self.states
+
+    #---------------------------------------------------------------------------
+    # Solve the nodal analysis system for the unknowns that weren't solved yet.
+    # The elimination of the first solve is kept (see baseSystem), so the next
+    # queries only need the back substitution, and the devices added by
+    # add_component are applied as a low rank update
+    #
+    # -Inputs
+    # needed: Indexes (in the concatenation of V and J) of the unknowns
+    # -Outputs
+    # V, J:   Solution of the nodal analysis system (the unknowns that weren't
+    #         solved keep their placeholders, see unknownSymbols)
+    #---------------------------------------------------------------------------
+    def solve(self, needed):
+        (nJ, nNodes, nodesDict) = self.getNodes()
+        missing = set(needed) - set(self.solution.keys())
+        if len(missing) != 0:
+            (A, Z) = self.getMNA()
+            X = None
+            if self.base is not None:
+                try:
+                    X = self.run('update', self.base.solve, A, Z, \
+                                 self.getKeys(), missing)
+                except ZeroDivisionError:
+                    raise Error('Unable to solve the linear system. ' + \
+                                'Check the netlist')
+            if X is None:
+                X = self.run('solve', self.factorize, A, Z, missing)
+            for i in missing:
+                self.solution[i] = X[i]
+        (V, J) = self.getUnknowns()
+        P = list(V[0:nNodes, 0]) + list(J)
+        X = [self.solution.get(i, P[i]) for i in range(0, nNodes + nJ)]
+        V = si.Matrix(nNodes, 1, X[0:nNodes]).col_join(si.zeros(1, 1))
+        J = si.Matrix(nJ, 1, X[nNodes:])
+        return (V, J)
+
+    #---------------------------------------------------------------------------
+    # Eliminate the nodal analysis system and keep its factorization. Systems
+    # that aren't rational functions of the parameters are solved by
+    # solveSystem and can't be updated
+    #
+    # -Inputs
+    # A, Z:   The nodal analysis matrices
+    # needed: Indexes of the unknowns
+    # -Outputs
+    # X: Dictionary mapping the index of the unknown into its value
+    #---------------------------------------------------------------------------
+    def factorize(self, A, Z, needed):
+        (nJ, nNodes, nodesDict) = self.getNodes()
+        try:
+            factor = factorSystem(A, Z, needed, self.monitor)
+            if factor is not None:
+                self.base = baseSystem(A, Z, self.getKeys(), factor, \
+                                       self.monitor)
+                return self.base.solve(A, Z, self.getKeys(), needed)
+        except ZeroDivisionError:
+            raise Error('Unable to solve the linear system. Check the netlist')
+        self.base = None
+        (Vs, Js) = solveSystem(A, Z, nNodes, needed, self.getUnknowns())
+        X = list(Vs[0:nNodes, 0]) + list(Js)
+        return {i: X[i] for i in needed}
+
+    #---------------------------------------------------------------------------
+    # Change the value of a device. This isn't an incremental update: the parsed
+    # netlist and the nodes are kept, but the next queries solve the nodal
+    # analysis again from scratch. The low rank update of add_component
+    # doesn't skip the back substitution, which costs more than the
+    # elimination it saves when only a value changes
+    #
+    # -Inputs
+    # name:  name of the device
+    # value: new value (string or sympy expression)
+    #---------------------------------------------------------------------------
+    def update_component(self, name, value):
+        (compDict, compList) = self.getComponents()
+        if not name in compDict.keys():
+            raise Error("Device " + name + " doesn't exist")
+        compDict[name].setValue(value)
+        self.base = None
+        self.reset(False)
+
+    #---------------------------------------------------------------------------
+    # Add a device to the circuit. The next queries update the solution of the
+    # nodal analysis instead of solving it again
+    #
+    # -Inputs
+    # line: netlist line of the device
+    #---------------------------------------------------------------------------
+    def add_component(self, line):
+        (compDict, compList) = self.getComponents()
+        (newDict, newList) = netlistParser(line)
+        if len(newList) != 1:
+            raise Error("Expected a single device in \"" + line + "\"")
+        comp = newList[0]
+        compList.store.append(comp.getName(), comp.getNodes(), \
+                              comp.store.texts[comp.getValueId()])
+        self.reset(True)
+
+    #---------------------------------------------------------------------------
+    # Discard the cached stages that depend on the devices. The factorization
+    # of the nodal analysis system is kept
+    #
+    # -Inputs
+    # topology: True if the nodes or the J matrix changed
+    #---------------------------------------------------------------------------
+    def reset(self, topology):
+        self.mna      = None
+        self.states   = None
+        self.solution = {}
+        if topology:
+            self.nodes    = None
+            self.unknowns = None
+            self.keys     = None
+
+    #---------------------------------------------------------------------------
+    # Key of a query in the persistent cache. The netlist is replaced by its
+    # canonical form (see canonicalNetlist), with the nets measured by the
+    # outputs as ports (the hierarchical ones as ports of their definitions).
+    # The order of the states is part of the key, since it defines the order
+    # of the rows and columns of A
+    #---------------------------------------------------------------------------
+    def cacheKey(self, inputs, outputs):
+        #Imported here, since canon and subckt depend on this module
+        from netlist2ss.canon  import canonicalNetlist
+        from netlist2ss.subckt import hierarchyStates, measuredNets
+        (compDict, compList) = self.getComponents()
+        ports    = [out[2:] for out in outputs if out[0:2] == 'Vn']
+        measured = measuredNets(compList.store, ports)
+        states   = hierarchyStates(compList.store)
+        return self.cache.key(canonicalNetlist(compDict, ports, True, \
+                                               measured), inputs, outputs, \
+                              {'simplify': self.simplify, 'states': states})
+
+    #---------------------------------------------------------------------------
+    # Calculate the space state representation of the system
+    #
+    # -Inputs
+    # inputs:  a list containing the name of variables consired to be the inputs
+    #          of the system
+    # outputs: A list containing the desired measurements from which the output
+    #          equations will be built
+    # -Outputs
+    # A: state matrix
+    # B: input matrix
+    # C: output matrix
+    # D: feedforward matrix
+    # DC_OP: operating point
+    #---------------------------------------------------------------------------
+    def state_space(self, inputs, outputs):
+        if self.budget is not None:
+            self.budget.start()
+        if self.cache is not None:
+            key = self.cacheKey(inputs, outputs)
+            res = self.run('cache', self.cache.get, key)
+            if res is not None:
+                self.log("Loaded from the cache")
+                return res
+        (compDict, compList) = self.getComponents()
+        for u in inputs:
+            if si.Symbol(str(u)) in compList.store.known:
+                raise Error("The input " + str(u) + " is a parameter with " + \
+                            "a numeric value. Keep it symbolic with " + \
+                            "params = {'" + str(u) + "': None}")
+        (nJ, nNodes, nodesDict) = self.getNodes()
+        (V, J) = self.getUnknowns()
+        (X, F) = self.getStates()
+        #Select which one of the nodal analysis results are output equations 
+        G = self.run('outputs', parseOutputs, \
+                     compDict, nodesDict, V, J, outputs)
+        #Solve the linear system only for the unknowns used by F and G
+        (Vs, Js) = self.solve(neededUnknowns([F, G], V, J))
+        F = replaceUnknowns(F, V, J, Vs, Js)
+        G = replaceUnknowns(G, V, J, Vs, Js)
+        #Input variables
+        U = self.run('inputs', parseInputs, inputs)
+        #Return the space state representation of the system
+        res = self.run('calcABCD', calcABCD, F, X, G, U, 'none')
+        if self.workers is not None and self.workers > 1:
+            res = tuple(self.run('simplify', parallelSimplify, \
+                                 res, self.simplify, self.workers))
+        else:
+            res = self.run('simplify', lambda: tuple([simplifyMatrix(M, \
+                           self.simplify) for M in res]))
+        if self.cache is not None:
+            self.cache.put(key, res)
+        return res
+
 #-------------------------------------------------------------------------------
 # netlist2ss
 # Convert a netlist to a space state representation of the system.
@@ -757,6 +2082,26 @@ def calcABCD (F, X, G, U):
 #           of the system
 # outputs:  A list containing the desired measurements from  which  the output
 #           equations will be built 
+# verbose:  Print the name and the record of each stage
+# simplify: Simplification level of the results: 'none', 'cancel', 'factor',
+#           or 'full' (see simplifyMatrix). The default keeps the results of
+#           the previous versions. Circuit defaults to 'cancel'
+# workers:  Number of processes used to simplify the results. They are 
+#           simplified serially if None
+# cache:    Directory (or diskCache instance) of a persistent cache of the
+#           results. Nothing is cached if None
+# profile:  Record the peak memory and the size of the expressions of each
+#           stage besides the wall time
+# hooks:    list of callables hook(event, record) called when each stage
+#           starts and ends. A stageStats instance collects the records
+# budget:   limits of the derivation (see the budget module). The derivation
+#           runs in a worker process, which is killed when the time is over
+# fallback: dictionary with the numeric value of every parameter, including
+#           the inputs (see netlist2ss_numeric). The numeric model is returned
+#           when the budget is exceeded. A BudgetError is raised if None
+# params:   dictionary mapping the name of the parameters into their values, or
+#           into None to keep them symbolic (see Circuit). The parameters of the
+#           .PARAM lines are replaced by their values unless they are symbolic
 # -Outputs
 # A: state matrix
 # B: input matrix
@@ -768,34 +2113,22 @@ def calcABCD (F, X, G, U):
 # (A, B, C, D, OP) = netlist2ss("e1 n1 gnd in\nr1 n1 c1 r1\n 
 #                                c1 c1 gnd c1", ["in"], ["Vnc1"])
 #-------------------------------------------------------------------------------
-def netlist2ss(netlist, inputs, outputs, verbose = False):
-    #Parse netlist
-    if verbose == True:
-        print("Parsing Netlist...")
-    (compDict, compList) = netlistParser(netlist)
-    #Calculate the number of nodes and the size of the J matrix
-    if verbose == True:
-        print("Building nodal analysys matrices...")
-    (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
-    #Build the nodal analysis matrices
-    (A, Z) = nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict)
-    #Solve the linear system
-    if verbose == True:
-        print("Solve linear system...")
-    (V, J) = solveSystem(A, Z, nNodes)
-    #Select which one of the nodal analysis results are state equations
-    if verbose == True:
-        print("Isolating states...")
-    (X, F) = stateEquations (compList, nodesDict, V, J)
-    #Select which one of the nodal analysis results are output equations 
-    if verbose == True:
-        print("Isolating outputs...")
-    G = parseOutputs (compDict, nodesDict, V, J, outputs)
-    #Input variables
-    if verbose == True:
-        print("Isolating inputs...")
-    U = parseInputs (inputs)
-    #Return the space state representation of the system
-    if verbose == True:
-        print("Calculating A,B,C and D matrices...")
-    return calcABCD (F, X, G, U)
+def netlist2ss(netlist, inputs, outputs, verbose = False, simplify = 'full', \
+               workers = None, cache = None, profile = False, hooks = None, \
+               budget = None, fallback = None, params = None):
+    if budget is not None:
+        #Imported here, since budget depends on this module
+        from netlist2ss.budget import runBudget
+        options = {'verbose': verbose, 'simplify': simplify, \
+                   'workers': workers, 'cache': cache, 'profile': profile, \
+                   'params': params}
+        if fallback is not None and params is not None:
+            #The numeric values of params are also used by the fallback
+            values = {str(name): value for (name, value) in params.items() \
+                      if isinstance(value, numbers.Real)}
+            values.update(fallback)
+            fallback = values
+        return runBudget(netlist, inputs, outputs, options, budget, \
+                         list(hooks if hooks is not None else []), fallback)
+    return Circuit(netlist, verbose, simplify, workers, cache, profile, \
+                   hooks, params = params).state_space(inputs, outputs)
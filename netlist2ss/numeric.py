@@ -0,0 +1,417 @@
+## @package numeric
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 15:02:31
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module contains a fully numeric version of netlist2ss. The device
+#  values are evaluated with the numeric parameters given by the user, the
+#  nodal analysis system is stamped into a scipy sparse matrix and solved by
+#  a sparse LU factorization, and the A, B, C, D, and DC_OP matrices are
+#  returned as numpy arrays.
+#
+#      The dependency of the device values on the inputs is carried by first
+#  order dual numbers, so the linearization about the operating point is the
+#  same one calculated by the symbolic version.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import sympy as si
+from   netlist2ss.netlist2ss import Error, netlistParser, calcNodesnJ, \
+                                   stampDevices, unknownSymbols,      \
+                                   stateEquations, parseOutputs, parseInputs
+
+#-------------------------------------------------------------------------------
+# Dual Class
+# First order dual number. It holds a value and its derivatives with relation
+# to the states and inputs of the system
+#
+# The parameters of the constructor are listed bellow:
+# val:  Value of the number
+# grad: Dictionary mapping the index of the variable into the derivative
+#-------------------------------------------------------------------------------
+class dual:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, val, grad):
+        self.val  = val
+        self.grad = grad
+
+    #---------------------------------------------------------------------------
+    # Arithmetic used by the stamps
+    #---------------------------------------------------------------------------
+    def __add__(self, other):
+        if not isinstance(other, dual):
+            return dual(self.val + other, self.grad)
+        grad = dict(self.grad)
+        for (k, v) in other.grad.items():
+            grad[k] = grad.get(k, 0.0) + v
+        return dual(self.val + other.val, grad)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __neg__(self):
+        return dual(-self.val, {k: -v for (k, v) in self.grad.items()})
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if not isinstance(other, dual):
+            return dual(self.val*other, \
+                        {k: v*other for (k, v) in self.grad.items()})
+        return dual(self.val*other.val, (self*other.val + other*self.val).grad)
+
+    def __rmul__(self, other):
+        return self*other
+
+    def __pos__(self):
+        return self
+
+    def __pow__(self, other):
+        if isinstance(other, dual):
+            return NotImplemented
+        scale = other*self.val**(other - 1)
+        return dual(self.val**other, \
+                    {k: v*scale for (k, v) in self.grad.items()})
+
+    def __rtruediv__(self, other):
+        scale = -other/(self.val*self.val)
+        return dual(other/self.val, \
+                    {k: v*scale for (k, v) in self.grad.items()})
+
+    def __truediv__(self, other):
+        return self*(1.0/other)
+
+    #---------------------------------------------------------------------------
+    # String callbacks in order facilitate debugging
+    #---------------------------------------------------------------------------
+    def __repr__(self):
+        return "< " + str(self.val) + ", " + str(self.grad) + " >"
+
+#-------------------------------------------------------------------------------
+# numericParams
+# Convert the user parameters into a substitution dictionary. The values are
+# plain floats keyed by name, so no sympy object is built per parameter (see
+# evalValue)
+#
+# -Inputs
+# params: dictionary mapping the name (or sympy symbol) of each parameter into
+#         its numeric value
+# -Outputs
+# P: dictionary mapping the names into floats
+#-------------------------------------------------------------------------------
+def numericParams(params):
+    return {str(name): float(value) for (name, value) in params.items()}
+
+#-------------------------------------------------------------------------------
+# storeParams
+# Convert the user parameters into a substitution dictionary that also holds
+# the parameters of the .PARAM lines. The user values override the ones of the
+# .PARAM lines, and the inputs are kept symbolic in the values of the devices
+# (their .PARAM values are used as the operating point)
+#
+# -Inputs
+# store:  The componentStore of the parsed netlist
+# params: dictionary mapping the name of each parameter into its numeric value
+# inputs: list with the name of the inputs
+# -Outputs
+# P: dictionary mapping the names into floats
+#-------------------------------------------------------------------------------
+def storeParams(store, params, inputs):
+    P = numericParams(params)
+    if len(store.params) == 0:
+        return P
+    given = {str(name): value for (name, value) in params.items() \
+             if str(name) in store.params}
+    #The .PARAM values of the inputs that weren't given are their operating
+    #point
+    ops = [str(u) for u in inputs if str(u) in store.params]
+    if any([not u in given for u in ops]):
+        store.setParams(given)
+        for u in ops:
+            value = store.known.get(si.Symbol(u))
+            if not u in P and value is not None:
+                P[u] = float(value)
+    given.update({u: None for u in ops})
+    store.setParams(given)
+    for (sym, value) in store.known.items():
+        if not str(sym) in P and len(value.free_symbols) == 0:
+            P[str(sym)] = float(value)
+    return P
+
+#-------------------------------------------------------------------------------
+# evalValue
+# Evaluate an expression at a numeric point. Only the free symbols of the
+# expression are looked up
+#
+# -Inputs
+# expr: sympy expression
+# P:    dictionary mapping the names of the parameters (see numericParams) and
+#       the placeholders of the unknowns, the states and the inputs (sympy
+#       symbols) into floats
+# -Outputs
+# The value of the expression as a float
+#-------------------------------------------------------------------------------
+def evalValue(expr, P):
+    sub = {}
+    for sym in expr.free_symbols:
+        if sym in P:
+            sub[sym] = P[sym]
+        elif not isinstance(sym, si.Dummy) and sym.name in P:
+            sub[sym] = P[sym.name]
+    try:
+        return float(expr.xreplace(sub))
+    except (TypeError, ValueError):
+        raise Error('Unable to evaluate "' + str(expr) + '". Missing ' + \
+                    'numeric value for ' +                             \
+                    str(sorted([str(sym) for sym in                    \
+                                expr.free_symbols if not sym in sub])))
+
+#-------------------------------------------------------------------------------
+# deviceValues
+# Evaluate the value of all devices. Values that depend on the inputs are
+# returned as dual numbers. Repeated value expressions are evaluated once, and
+# they are evaluated without sympy (see componentStore.evaluate) unless they
+# use something besides the parameters and the arithmetic operators.
+#
+# -Inputs
+# compList: The component list generated by the netlistParser
+# P:        dictionary mapping the names of the parameters into floats
+# U:        column vector listing all inputs of the system
+# nST:      Number of states (the inputs follow the states in the dual numbers)
+# -Outputs
+# values:   list with the value of each component
+#-------------------------------------------------------------------------------
+def deviceValues(compList, P, U, nST):
+    inputs = set(U)
+    names  = dict(P)
+    for i in range(0, len(U)):
+        if str(U[i]) in P:
+            names[str(U[i])] = dual(P[str(U[i])], {nST + i: 1.0})
+    cache  = {}
+    values = []
+    for comp in compList:
+        key = comp.getValueId()
+        if not key in cache:
+            value = comp.getNumericValue(names)
+            if value is None:
+                value = symbolicValue(comp.getValue(), P, U, nST, inputs)
+            elif not isinstance(value, dual):
+                value = float(value)
+            cache[key] = value
+        values.append(cache[key])
+    return values
+
+#-------------------------------------------------------------------------------
+# symbolicValue
+# Evaluate the value of a device from its sympy expression (see deviceValues)
+#-------------------------------------------------------------------------------
+def symbolicValue(expr, P, U, nST, inputs):
+    syms = expr.free_symbols & inputs
+    if len(syms) == 0:
+        return evalValue(expr, P)
+    grad = {}
+    for i in range(0, len(U)):
+        if U[i] in syms:
+            grad[nST + i] = evalValue(si.diff(expr, U[i]), P)
+    return dual(evalValue(expr, P), grad)
+
+#-------------------------------------------------------------------------------
+# linearize
+# Evaluate a set of equations and their gradients with relation to the unknowns
+# of the nodal analysis, the states, and the inputs at a numeric point
+#
+# -Inputs
+# F:     column vector with the equations
+# index: dictionary mapping the symbols of the unknowns, the states, and the
+#        inputs into their column in the gradient
+# size:  number of columns of the gradient
+# P:     dictionary with the point (see evalValue)
+# -Outputs
+# f:     numpy array with the value of the equations
+# Df:    scipy sparse matrix with the gradient of the equations
+#-------------------------------------------------------------------------------
+def linearize(F, index, size, P):
+    f    = np.zeros(F.shape[0])
+    rows = []
+    cols = []
+    vals = []
+    for i in range(0, F.shape[0]):
+        f[i] = evalValue(F[i], P)
+        for sym in F[i].free_symbols:
+            if sym in index:
+                rows.append(i)
+                cols.append(index[sym])
+                vals.append(evalValue(si.diff(F[i], sym), P))
+    Df = sp.csr_matrix((vals, (rows, cols)), shape = (F.shape[0], size))
+    return (f, Df)
+
+#-------------------------------------------------------------------------------
+# netlist2ss_numeric
+# Convert a netlist to a numeric space state representation of the system.
+# Every symbol used in the netlist must be given a numeric value in params,
+# including the inputs, whose values define the operating point. The .PARAM
+# lines of the netlist give the default values.
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   a list containing the name of variables consired to be the  inputs
+#           of the system
+# outputs:  A list containing the desired measurements from  which  the output
+#           equations will be built
+# params:   dictionary mapping the name of each parameter into its value
+# -Outputs
+# A: state matrix (numpy array)
+# B: input matrix (numpy array)
+# C: output matrix (numpy array)
+# D: feedforward matrix (numpy array)
+# DC_OP: operating point (numpy array with one entry per output)
+#
+# -example:
+# (A, B, C, D, OP) = netlist2ss_numeric("v1 n1 gnd in\nr1 n1 c1 r1\n
+#                                        c1 c1 gnd c1", ["in"], ["Vnc1"],
+#                                       {"in": 1, "r1": 1e3, "c1": 1e-9})
+#-------------------------------------------------------------------------------
+def netlist2ss_numeric(netlist, inputs, outputs, params = {}, verbose = False):
+    #Parse netlist
+    if verbose == True:
+        print("Parsing Netlist...")
+    (compDict, compList) = netlistParser(netlist, True)
+    (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+    n  = nNodes + nJ
+    P  = storeParams(compList.store, params, inputs)
+    U  = parseInputs(inputs)
+    nU = len(inputs)
+    #State and output equations as a function of the nodal analysis unknowns
+    if verbose == True:
+        print("Isolating states and outputs...")
+    (V, J) = unknownSymbols(nNodes, nJ)
+    (X, F) = stateEquations (compList, nodesDict, V, J)
+    G = parseOutputs (compDict, nodesDict, V, J, outputs)
+    nST = len(X)
+
+    #---------------------------------------------------------------------------
+    # Stamp the devices. The states and the inputs are carried as dual numbers
+    #---------------------------------------------------------------------------
+    if verbose == True:
+        print("Building nodal analysys matrices...")
+    values = deviceValues(compList, P, U, nST)
+    stIdx  = {X[i]: i for i in range(0, nST)}
+    states = [None if comp.getST() is None else \
+              dual(0.0, {stIdx[comp.getST()]: 1.0}) for comp in compList]
+    (Adok, Zdok) = stampDevices(compList, nNodes, nodesDict, values, states)
+    rows  = []
+    cols  = []
+    vals  = []
+    drows = [[] for k in range(0, nU)]
+    dcols = [[] for k in range(0, nU)]
+    dvals = [[] for k in range(0, nU)]
+    for ((r, c), v) in Adok.items():
+        if isinstance(v, dual):
+            for (k, d) in v.grad.items():
+                drows[k - nST].append(r)
+                dcols[k - nST].append(c)
+                dvals[k - nST].append(d)
+            v = v.val
+        rows.append(r)
+        cols.append(c)
+        vals.append(v)
+    M  = sp.csc_matrix((vals, (rows, cols)), shape = (n, n))
+    dM = [sp.csr_matrix((dvals[k], (drows[k], dcols[k])), shape = (n, n)) \
+          for k in range(0, nU)]
+    Z  = np.zeros((n, 1 + nST + nU))
+    for ((r, c), v) in Zdok.items():
+        if isinstance(v, dual):
+            for (k, d) in v.grad.items():
+                Z[r, 1 + k] = d
+            v = v.val
+        Z[r, 0] = v
+
+    #---------------------------------------------------------------------------
+    # Solve the nodal analysis system for the operating point of the unknowns
+    # with the states at zero and for their derivatives with relation to the
+    # states and the inputs
+    #---------------------------------------------------------------------------
+    if verbose == True:
+        print("Solve linear system...")
+    try:
+        lu = spla.splu(M)
+        Xz = lu.solve(Z)
+    except RuntimeError:
+        raise Error('Unable to solve the linear system. Check the netlist')
+    xb = Xz[:, 0]
+    Xs = Xz[:, 1:1 + nST]
+    Xu = Xz[:, 1 + nST:]
+
+    #---------------------------------------------------------------------------
+    # The state equations are affine in the unknowns and in the states, so the
+    # operating point of the states comes from a single linear solve
+    #---------------------------------------------------------------------------
+    if verbose == True:
+        print("Calculating A,B,C and D matrices...")
+    unknowns = list(V[0:nNodes, 0]) + list(J)
+    index = {unknowns[i]: i for i in range(0, n)}
+    index.update({X[i]: n + i for i in range(0, nST)})
+    index.update({U[i]: n + nST + i for i in range(0, nU)})
+    size  = n + nST + nU
+    point = dict(P)
+    point.update({unknowns[i]: float(xb[i]) for i in range(0, n)})
+    point.update({X[i]: 0.0 for i in range(0, nST)})
+    (f, Df) = linearize(F, index, size, point)
+    A = Df[:, 0:n] @ Xs + Df[:, n:n + nST].toarray()
+    try:
+        s0 = np.linalg.solve(A, -f) if nST != 0 else np.zeros(0)
+    except np.linalg.LinAlgError:
+        raise Error("The isn't a single solution. Check the netlist.")
+    x0 = xb + Xs @ s0
+
+    #---------------------------------------------------------------------------
+    # Linearize the state and output equations at the operating point
+    #---------------------------------------------------------------------------
+    if nU != 0:
+        Xu = Xu - lu.solve(np.column_stack([dM[k] @ x0 for k in range(0, nU)]))
+    point.update({unknowns[i]: float(x0[i]) for i in range(0, n)})
+    point.update({X[i]: float(s0[i]) for i in range(0, nST)})
+    (f, Df) = linearize(F, index, size, point)
+    (g, Dg) = linearize(G, index, size, point)
+    B = Df[:, 0:n] @ Xu + Df[:, n + nST:].toarray()
+    C = Dg[:, 0:n] @ Xs + Dg[:, n:n + nST].toarray()
+    D = Dg[:, 0:n] @ Xu + Dg[:, n + nST:].toarray()
+    return (np.asarray(A), np.asarray(B), np.asarray(C), np.asarray(D), g)
@@ -38,9 +38,209 @@
 # Mocules do import
 #-------------------------------------------------------------------------------
 import sys
-from   netlist2ss import netlist2ss
+import os
+import glob
+import json
+import time
+import argparse
+from   concurrent.futures    import ProcessPoolExecutor, as_completed
+from   concurrent.futures.process import BrokenProcessPool
+from   netlist2ss.netlist2ss import Circuit, simplifyLevels
+from   netlist2ss.tf         import transferMatrix, tfExpr
+from   netlist2ss.mnatf      import mnaTransferMatrix
 import sympy as  si
 
+#-------------------------------------------------------------------------------
+# transferFunctions
+# Calculate the transfer functions of all input/output pairs of a netlist
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   list of input variables
+# outputs:  list of output measurements
+# simplify: simplification level (see simplifyMatrix)
+# workers:  number of processes used to simplify the state space matrices
+# method:   'ss' (from the space state representation) or 'mna' (straight
+#           from the nodal analysis)
+# verbose:  print the run time of each stage
+# cache:    directory of the persistent cache of the space state matrices
+#           (see diskCache). Nothing is cached if None
+# -Outputs
+# H:     transfer matrix (see transferMatrix)
+# times: dictionary with the run time of each stage
+#-------------------------------------------------------------------------------
+def transferFunctions(netlist, inputs, outputs, simplify = 'cancel', \
+                      workers = None, method = 'ss', verbose = False, \
+                      cache = None):
+    s     = si.Symbol('s')
+    times = {}
+    if method == 'ss':
+        circuit = Circuit(netlist, verbose, simplify, workers, cache)
+        (A, B, C, D, DC_OP) = circuit.state_space(inputs, outputs)
+        times = circuit.times
+    if verbose:
+        print("Calculating the transfer function...")
+    start = time.perf_counter()
+    if method == 'ss':
+        H = transferMatrix(A, B, C, D, s, simplify)
+    else:
+        H = mnaTransferMatrix(netlist, inputs, outputs, s, simplify)
+    times['tf'] = time.perf_counter() - start
+    if verbose:
+        print("    tf: %.4f s" % times['tf'])
+    return (H, times)
+
+#-------------------------------------------------------------------------------
+# runJob
+# Run one job of the batch mode. Errors are reported in the result instead of
+# being raised, so the other jobs keep going
+#
+# -Inputs
+# job: dictionary with the file, inputs, outputs, simplify, method, and cache
+# -Outputs
+# res: dictionary with the job, its status, the transfer functions (numerator
+#      and denominator coefficients as strings, highest power first), the run
+#      time of each stage, and the total run time
+#-------------------------------------------------------------------------------
+def runJob(job):
+    res   = dict(job)
+    start = time.perf_counter()
+    try:
+        handle  = open(job['file'], 'r')
+        netlist = handle.read()
+        handle.close()
+        (H, times) = transferFunctions(netlist, job['inputs'], job['outputs'], \
+                                       job['simplify'], None, job['method'], \
+                                       False, job.get('cache'))
+        res['status'] = 'ok'
+        res['tf']     = [{'input':  job['inputs'][j],              \
+                          'output': job['outputs'][i],             \
+                          'num':    [str(c) for c in H[i][j][0]],  \
+                          'den':    [str(c) for c in H[i][j][1]]}  \
+                         for i in range(0, len(job['outputs']))    \
+                         for j in range(0, len(job['inputs']))]
+        res['times']  = times
+    except Exception as e:
+        res['status'] = 'error'
+        res['error']  = type(e).__name__ + ": " + str(e)
+    res['time'] = time.perf_counter() - start
+    return res
+
+#-------------------------------------------------------------------------------
+# readManifest
+# Read the jobs of a manifest file. Each line has a glob  with  the  netlists
+# followed by the comma separated lists of inputs and outputs. Empty lines and
+# lines starting with # are ignored
+#
+# -Inputs
+# filename: path of the manifest
+# -Outputs
+# entries: list of (pattern, inputs, outputs)
+#-------------------------------------------------------------------------------
+def readManifest(filename):
+    entries = []
+    handle  = open(filename, 'r')
+    for (num, line) in enumerate(handle.read().splitlines()):
+        fields = line.split()
+        if len(fields) == 0 or fields[0].startswith('#'):
+            continue
+        if len(fields) != 3:
+            handle.close()
+            raise ValueError(filename + ":" + str(num + 1) + ": expected " + \
+                             "<netlist glob> <inputs> <outputs>")
+        entries.append((fields[0], fields[1].split(','), fields[2].split(',')))
+    handle.close()
+    return entries
+
+#-------------------------------------------------------------------------------
+# jobError
+# Result of a job that raised outside of runJob (its worker died, for example)
+#
+# -Inputs
+# job:   dictionary with the job
+# e:     the exception
+# start: start time of the batch
+# -Outputs
+# res:   dictionary with the error
+#-------------------------------------------------------------------------------
+def jobError(job, e, start):
+    res = dict(job)
+    res['status'] = 'error'
+    res['error']  = type(e).__name__ + ": " + str(e)
+    res['time']   = time.perf_counter() - start
+    return res
+
+#-------------------------------------------------------------------------------
+# batch
+# Run many jobs in a process pool and write one JSON line per job. The lines
+# follow the order of the jobs, and each one is written as soon as the jobs
+# before it are done. A job that raises outside of runJob gets an error line.
+# When a worker dies, the pool is broken and the jobs that didn't finish run
+# again one at a time, each one in its own process, so only the job that kills
+# its worker gets an error line
+#
+# -Inputs
+# entries: list of (pattern, inputs, outputs)
+# args:    parsed command line arguments
+# -Outputs
+# The number of jobs that failed
+#-------------------------------------------------------------------------------
+def batch(entries, args):
+    jobs = []
+    for (pattern, inputs, outputs) in entries:
+        files = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else \
+                [pattern]
+        for filename in files:
+            jobs.append({'file': filename, 'inputs': inputs, \
+                         'outputs': outputs, 'simplify': args.simplify, \
+                         'method': args.method, 'cache': args.cache})
+    out     = sys.stdout if args.output is None else open(args.output, 'w')
+    results = {}
+    written = [0, 0]
+    start   = time.perf_counter()
+    retry   = []
+    with ProcessPoolExecutor(args.jobs) as pool:
+        futures = {pool.submit(runJob, job): k for (k, job) in enumerate(jobs)}
+        for future in as_completed(futures):
+            k = futures[future]
+            try:
+                results[k] = future.result()
+            except BrokenProcessPool:
+                retry.append(k)
+            except Exception as e:
+                results[k] = jobError(jobs[k], e, start)
+            writeResults(results, written, out)
+    for k in sorted(retry):
+        with ProcessPoolExecutor(1) as pool:
+            try:
+                results[k] = pool.submit(runJob, jobs[k]).result()
+            except Exception as e:
+                results[k] = jobError(jobs[k], e, start)
+        writeResults(results, written, out)
+    if out is not sys.stdout:
+        out.close()
+    return written[1]
+
+#-------------------------------------------------------------------------------
+# writeResults
+# Write the results that are next in the order of the jobs
+#
+# -Inputs
+# results: dictionary mapping the index of the jobs into their results (the
+#          written ones are removed)
+# written: list with the number of written results and the number of failed
+#          jobs (it is updated)
+# out:     output file
+#-------------------------------------------------------------------------------
+def writeResults(results, written, out):
+    while written[0] in results:
+        res = results.pop(written[0])
+        if res['status'] != 'ok':
+            written[1] = written[1] + 1
+        out.write(json.dumps(res) + "\n")
+        out.flush()
+        written[0] = written[0] + 1
+
 #-------------------------------------------------------------------------------
 # CLI
 #-------------------------------------------------------------------------------
@@ -48,17 +248,71 @@ def cli():
     #---------------------------------------------------------------------------
     # Check Arguments 
     #---------------------------------------------------------------------------
-    if (len(sys.argv) != 4):
-        print ('Usage:')
-        print ('    ' + sys.argv[0] + \
-               ' filename input_variable output_measurement') 
-        exit(-1)
+    parser = argparse.ArgumentParser(description = "Calculate the transfer " + \
+                                     "function of the circuit represented " + \
+                                     "by a netlist")
+    parser.add_argument('filename', nargs = '?',                          \
+                        help = "netlist (a glob with --batch)")
+    parser.add_argument('input_variable', nargs = '?',                    \
+                        help = "input variable (comma separated list for " + \
+                               "a transfer matrix)")
+    parser.add_argument('output_measurement', nargs = '?',                \
+                        help = "output measurement (comma separated list " + \
+                               "for a transfer matrix)")
+    parser.add_argument('--simplify', choices = simplifyLevels,          \
+                        default = 'cancel',                               \
+                        help = "simplification level (default: cancel)")
+    parser.add_argument('--workers', type = int, default = None,         \
+                        help = "number of processes used to simplify the " + \
+                               "state space matrices")
+    parser.add_argument('--method', choices = ['ss', 'mna'], default = 'ss', \
+                        help = "calculate the transfer function from the " + \
+                               "space state representation (ss) or " + \
+                               "straight from the nodal analysis (mna)")
+    parser.add_argument('--verbose', action = 'store_true',              \
+                        help = "print the run time of each stage")
+    parser.add_argument('--batch', action = 'store_true',                \
+                        help = "treat filename as a glob and write one " + \
+                               "JSON line per netlist")
+    parser.add_argument('--manifest', default = None,                    \
+                        help = "file with one '<netlist glob> <inputs> " + \
+                               "<outputs>' job per line (implies --batch)")
+    parser.add_argument('--jobs', type = int, default = os.cpu_count(),  \
+                        help = "number of processes of the batch mode")
+    parser.add_argument('--cache', default = None,                       \
+                        help = "directory of a persistent cache of the " + \
+                               "space state matrices")
+    parser.add_argument('--output', default = None,                      \
+                        help = "JSON Lines file of the batch mode " + \
+                               "(default: stdout)")
+    args = parser.parse_args()
+
+    #---------------------------------------------------------------------------
+    # Batch mode
+    #---------------------------------------------------------------------------
+    if args.batch or args.manifest is not None:
+        try:
+            entries = [] if args.manifest is None else \
+                      readManifest(args.manifest)
+        except Exception as e:
+            print("Error: " + str(e))
+            exit(-1)
+        if args.filename is not None:
+            if args.output_measurement is None:
+                parser.error("the batch mode needs filename, " + \
+                             "input_variable, and output_measurement")
+            entries.append((args.filename, args.input_variable.split(','), \
+                            args.output_measurement.split(',')))
+        exit(0 if batch(entries, args) == 0 else 1)
+    if args.output_measurement is None:
+        parser.error("the following arguments are required: filename, " + \
+                     "input_variable, output_measurement")
     
     #---------------------------------------------------------------------------
     # Read netlist 
     #---------------------------------------------------------------------------
     try:
-        handle  = open(sys.argv[1], 'r')
+        handle  = open(args.filename, 'r')
         netlist = handle.read()
         handle.close()
     except:
@@ -68,32 +322,38 @@ def cli():
     #---------------------------------------------------------------------------
     # Run netlist2ss and calculate the transfer function
     #---------------------------------------------------------------------------
-    s = si.symbols('s')
+    s       = si.symbols('s')
+    inputs  = args.input_variable.split(',')
+    outputs = args.output_measurement.split(',')
     try:
-        (A, B, C, D, DC_OP) = netlist2ss(netlist, [sys.argv[2]], [sys.argv[3]])
+        (H, times) = transferFunctions(netlist, inputs, outputs,          \
+                                       args.simplify, args.workers,        \
+                                       args.method, args.verbose,          \
+                                       args.cache)
     except Exception as e:
         print("Error: " + str(e))
         exit(-1)
-    H = si.simplify(C*((s*(si.eye(A.shape[0]))-A).inv())*B + D)[0,0]
-    n, d = si.fraction(H)   
 
     #---------------------------------------------------------------------------
     # Print result
     #---------------------------------------------------------------------------
-    n = str(n)                        
-    d = str(d)
-    sizen = len(n)
-    sized = len(d)
-    sizet = max(sizen, sized) + 2 
-    print(" ") 
-    print(" Transfer function of " + sys.argv[1])
-    print(" Input variable: "  + sys.argv[2]) 
-    print(" Output variable: " + sys.argv[3][0:2] + "(" + sys.argv[3][2:] + ")")
-    print(" ") 
-    print("        " + " "*round((sizet - sizen)/2) + n) 
-    print(" H(s) = " + "-"*sizet)
-    print("        " + " "*round((sizet - sized)/2) + d) 
-    print(" ") 
+    for i in range(0, len(outputs)):
+        for j in range(0, len(inputs)):
+            n = str(tfExpr(H[i][j][0], s))
+            d = str(tfExpr(H[i][j][1], s))
+            sizen = len(n)
+            sized = len(d)
+            sizet = max(sizen, sized) + 2 
+            print(" ") 
+            print(" Transfer function of " + args.filename)
+            print(" Input variable: "  + inputs[j]) 
+            print(" Output variable: " + outputs[i][0:2] + "(" + \
+                  outputs[i][2:] + ")")
+            print(" ") 
+            print("        " + " "*round((sizet - sizen)/2) + n) 
+            print(" H(s) = " + "-"*sizet)
+            print("        " + " "*round((sizet - sized)/2) + d) 
+            print(" ") 
 
     exit(0)
     
@@ -0,0 +1,358 @@
+## @package subckt
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    17/10/26 02:41:07
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#      This module reduces the subcircuits (.SUBCKT ... .ENDS) to models that
+#  only have their ports. The unknowns of the nodal analysis of a definition
+#  are split in the kept ones (K), which are the port voltages and the currents
+#  of the devices connected to the ports (voltage sources, capacitors, etc,
+#  whose currents enter the equations of the ports), and the internal ones.
+#  The internal unknowns are solved as a function of K (placeholders), which is
+#  the Schur complement of the system onto K, so the rows of the ports and of
+#  the kept currents become
+#
+#      S*K = N
+#
+#  S and N are stamped in the A and Z matrices of each instance, where the
+#  kept currents are new entries of J. The internal states of the definition
+#  become states of the instances, and their equations (F) and the internal
+#  unknowns (V, J), used by the measurements inside the instances, are kept as
+#  functions of K.
+#
+#      The model is calculated once per definition, and the instances only
+#  rename the placeholders and the states, so many identical cells cost a
+#  single reduction. The states of the instance X1 are named after it
+#  (state_var_X1.C1, state_var_X1.Y1.C1 for the instance Y1 inside X1), the
+#  same names given by flattenStore.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import sympy as si
+from   netlist2ss.netlist2ss import Error, componentList, componentDict, \
+                                    calcNodesnJ, nodalAnalysisMatrices, \
+                                    unknownSymbols, stateEquations, \
+                                    parseOutputs, replaceUnknowns, stamp
+from   netlist2ss.ffsolve    import fractionFreeSolve
+
+#-------------------------------------------------------------------------------
+# reducedModel Class
+# Port model of a subcircuit
+#
+# The parameters of the constructor are listed bellow:
+# P: list with the placeholders of the port voltages
+# Q: list with the placeholders of the kept currents
+# S: matrix of the rows of the ports and of the kept currents as a function of
+#    the port voltages and of the kept currents
+# N: right hand side of the same rows
+# X: list with the internal states
+# F: list with the equation of each internal state
+# V: voltages of the nodes of the definition (the ground is appended as zero)
+# J: J matrix of the definition
+#-------------------------------------------------------------------------------
+class reducedModel:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, P, Q, S, N, X, F, V, J):
+        self.P = P
+        self.Q = Q
+        self.S = S
+        self.N = N
+        self.X = X
+        self.F = F
+        self.V = V
+        self.J = J
+
+#-------------------------------------------------------------------------------
+# instanceState
+# Name of an internal state of a subcircuit in one of its instances
+#
+# -Inputs
+# inst: name of the instance
+# st:   name of the state in the definition (state_var_C1)
+# -Outputs
+# name: name of the state in the instance (state_var_X1.C1)
+#-------------------------------------------------------------------------------
+def instanceState(inst, st):
+    return 'state_var_' + inst + '.' + st[len('state_var_'):]
+
+#-------------------------------------------------------------------------------
+# reduceSubcircuit
+# Reduce a definition to its port model
+#
+# -Inputs
+# defn:  The subcircuit
+# -Outputs
+# model: reducedModel instance
+#-------------------------------------------------------------------------------
+def reduceSubcircuit(defn):
+    compList = componentList(defn.store)
+    (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+    (A, Z)   = nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict)
+    (V, J)   = unknownSymbols(nNodes, nJ)
+    (X, F)   = stateEquations(compList, nodesDict, V, J)
+    k        = len(defn.ports)
+    n        = nNodes + nJ
+    dok      = A.todok()
+
+    #---------------------------------------------------------------------------
+    # Kept unknowns: the ports (the first nodes) and the currents that enter
+    # the rows of the ports
+    #---------------------------------------------------------------------------
+    kept  = sorted(set([col for (row, col) in dok.keys() \
+                        if row < k and col >= nNodes]))
+    P     = [si.Dummy('P%d' % i) for i in range(0, k)]
+    Q     = [si.Dummy('Q%d' % i) for i in range(0, len(kept))]
+    keep  = list(range(0, k)) + kept
+    inner = [i for i in range(k, n) if not i in set(kept)]
+    x     = [si.S.Zero]*n
+    for (i, K) in zip(keep, P + Q):
+        x[i] = K
+
+    #---------------------------------------------------------------------------
+    # Solve the internal unknowns as a function of the kept ones
+    #---------------------------------------------------------------------------
+    if len(inner) != 0:
+        Aii = A.extract(inner, inner)
+        rhs = Z.extract(inner, [0]) - \
+              A.extract(inner, keep)*si.Matrix(len(keep), 1, P + Q)
+        try:
+            sol = fractionFreeSolve(Aii, rhs)
+            if sol is None:
+                sol = Aii.inv()*rhs
+                sol = {i: sol[i] for i in range(0, len(inner))}
+        except:
+            raise Error('Unable to reduce the subcircuit ' + defn.name + \
+                        '. Check its netlist')
+        for (j, i) in enumerate(inner):
+            x[i] = sol[j]
+
+    #---------------------------------------------------------------------------
+    # Rows of the kept unknowns: S*K = N
+    #---------------------------------------------------------------------------
+    pos = {i: j for (j, i) in enumerate(keep)}
+    R   = [-Z[i, 0] for i in keep]
+    for ((row, col), value) in dok.items():
+        if row in pos:
+            R[pos[row]] = R[pos[row]] + value*x[col]
+    zero = {K: 0 for K in P + Q}
+    S  = si.Matrix(len(keep), len(keep), \
+                   lambda a, b: si.cancel(si.diff(R[a], (P + Q)[b])))
+    N  = si.Matrix(len(keep), 1, [si.cancel(-r.xreplace(zero)) for r in R])
+    Vs = si.Matrix(nNodes, 1, x[0:nNodes]).col_join(si.zeros(1, 1))
+    Js = si.Matrix(nJ, 1, x[nNodes:])
+    F  = replaceUnknowns(F, V, J, Vs, Js).applyfunc(si.cancel)
+    return reducedModel(P, Q, S, N, list(X), list(F), Vs, Js)
+
+#-------------------------------------------------------------------------------
+# subcircuitModel
+# Port model of a definition. It is reduced on the first call and shared by all
+# instances
+#
+# -Inputs
+# defn:  The subcircuit
+# -Outputs
+# model: reducedModel instance
+#-------------------------------------------------------------------------------
+def subcircuitModel(defn):
+    if defn.model is None:
+        defn.model = reduceSubcircuit(defn)
+    return defn.model
+
+#-------------------------------------------------------------------------------
+# reduceSubcircuits
+# Reduce all subcircuits used by a netlist, and give to each instance the
+# entries of J of its kept currents (after the entries of the devices)
+#
+# -Inputs
+# store:  componentStore of the netlist
+# -Outputs
+# models: dictionary mapping the name of the subcircuits into their models
+#-------------------------------------------------------------------------------
+def reduceSubcircuits(store):
+    models = {}
+    for inst in store.instances.values():
+        name = inst.getSubckt()
+        if not name in models:
+            models[name] = subcircuitModel(store.subckts[name])
+        if inst.getCurrents() is None:
+            count = len(models[name].Q)
+            inst.setCurrents(list(range(store.nJ, store.nJ + count)))
+            store.nJ = store.nJ + count
+    return models
+
+#-------------------------------------------------------------------------------
+# instanceMap
+# Replacements that turn the model of a definition into one of its instances
+#
+# -Inputs
+# inst:      The subcircuitInstance
+# model:     The model of its subcircuit
+# nodesDict: Dictionary corelating the net name with the node number
+# V, J:      Unknowns of the parent (None to rename the states only)
+# -Outputs
+# sub: dictionary mapping the placeholders and the states of the model into the
+#      unknowns and the states of the instance
+#-------------------------------------------------------------------------------
+def instanceMap(inst, model, nodesDict, V = None, J = None):
+    sub = {st: si.Symbol(instanceState(inst.getName(), str(st))) \
+           for st in model.X}
+    if V is not None:
+        for (p, net) in zip(model.P, inst.getNodes()):
+            sub[p] = V[nodesDict[net]]
+        for (q, e) in zip(model.Q, inst.getCurrents()):
+            sub[q] = J[e]
+    return sub
+
+#-------------------------------------------------------------------------------
+# stampInstances
+# Add the stamps of the instances of subcircuits to the nodal analysis
+# matrices (see stampDevices)
+#
+# -Inputs
+# store:     componentStore of the netlist
+# nNodes:    Number of nodes in the nodal analysis
+# nodesDict: Dictionary corelating the net name with the node number
+# A:         Dictionary of keys of the A matrix
+# Z:         Dictionary of keys of the Z matrix
+#-------------------------------------------------------------------------------
+def stampInstances(store, nNodes, nodesDict, A, Z):
+    for inst in store.instances.values():
+        model = subcircuitModel(store.subckts[inst.getSubckt()])
+        sub   = instanceMap(inst, model, nodesDict)
+        #Rows/columns of the ports (-1 for the ground) and of the currents
+        rows  = [nodesDict[net] for net in inst.getNodes()] + \
+                [nNodes + e for e in inst.getCurrents()]
+        for a in range(0, len(rows)):
+            if rows[a] == -1:
+                continue
+            for b in range(0, len(rows)):
+                if rows[b] != -1 and model.S[a, b] != 0:
+                    stamp(A, rows[a], rows[b], model.S[a, b])
+            if model.N[a] != 0:
+                stamp(Z, rows[a], 0, model.N[a].xreplace(sub))
+
+#-------------------------------------------------------------------------------
+# instanceStates
+# States of the instances of subcircuits and their equations (see
+# stateEquations)
+#
+# -Inputs
+# store:     componentStore of the netlist
+# nodesDict: Dictionary corelating the net name with the node number
+# V, J:      Unknowns of the netlist
+# -Outputs
+# X: list with the states
+# F: list with the equation of each state
+#-------------------------------------------------------------------------------
+def instanceStates(store, nodesDict, V, J):
+    X = []
+    F = []
+    for inst in store.instances.values():
+        model = subcircuitModel(store.subckts[inst.getSubckt()])
+        sub   = instanceMap(inst, model, nodesDict, V, J)
+        X.extend([sub[st] for st in model.X])
+        F.extend([f.xreplace(sub) for f in model.F])
+    return (X, F)
+
+#-------------------------------------------------------------------------------
+# instanceOutput
+# Measurement inside an instance of a subcircuit (see parseOutputs), like
+# VnX1.mid or IdX1.R1
+#
+# -Inputs
+# store:     componentStore of the netlist
+# nodesDict: Dictionary corelating the net name with the node number
+# V, J:      Unknowns of the netlist
+# meas:      type of the measurement (Vn, Id, etc)
+# name:      hierarchical name of the net or of the device
+# -Outputs
+# G: the output equation, or None if the name isn't inside an instance
+#-------------------------------------------------------------------------------
+def instanceOutput(store, nodesDict, V, J, meas, name):
+    (head, sep, tail) = name.partition('.')
+    inst = store.instances.get(head)
+    if inst is None or tail == '':
+        return None
+    defn  = store.subckts[inst.getSubckt()]
+    model = subcircuitModel(defn)
+    G     = parseOutputs(componentDict(defn.store), defn.store.nodesDict, \
+                         model.V, model.J, [meas + tail])
+    return G[0].xreplace(instanceMap(inst, model, nodesDict, V, J))
+
+#-------------------------------------------------------------------------------
+# hierarchyStates
+# Names of the states of a netlist in the order of stateEquations, without
+# reducing the subcircuits
+#
+# -Inputs
+# store: componentStore of the netlist
+# -Outputs
+# names: list with the names of the states
+#-------------------------------------------------------------------------------
+def hierarchyStates(store):
+    names = [str(comp.getST()) for comp in componentList(store) \
+             if comp.getST() is not None]
+    for inst in store.instances.values():
+        defn  = store.subckts[inst.getSubckt()]
+        names.extend([instanceState(inst.getName(), st) for st in \
+                      hierarchyStates(defn.store)])
+    return names
+
+#-------------------------------------------------------------------------------
+# measuredNets
+# Nets of the definitions measured by hierarchical names (X1.m is the net m of
+# the definition of X1)
+#
+# -Inputs
+# store: componentStore of the netlist
+# nets:  list with the names of the measured nets
+# -Outputs
+# measured: dictionary mapping the name of the definitions into the set of
+#           their measured nets
+#-------------------------------------------------------------------------------
+def measuredNets(store, nets):
+    measured = {}
+    for name in nets:
+        parts = name.split('.')
+        defn  = None
+        inner = store
+        for head in parts[:-1]:
+            inst = inner.instances.get(head)
+            if inst is None:
+                defn = None
+                break
+            defn  = inner.subckts[inst.getSubckt()]
+            inner = defn.store
+        if defn is not None:
+            measured.setdefault(defn.name, set()).add(parts[-1])
+    return measured
@@ -0,0 +1,181 @@
+## @package sweep
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 16:20:07
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module evaluates the symbolic space state  representation  of  a
+#  circuit for many parameter samples at once (parameter sweeps, Monte Carlo,
+#  etc). The A, B, C, D, and DC_OP matrices are compiled into  a  vectorized
+#  numpy function and the compiled functions are cached by circuit.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import collections
+import numpy as np
+import sympy as si
+from   netlist2ss.netlist2ss import Error, Circuit
+
+#-------------------------------------------------------------------------------
+# Compiled kernels of the circuits that were already swept. Only the
+# kernelCacheSize most recently used kernels are kept
+#-------------------------------------------------------------------------------
+kernelCache     = collections.OrderedDict()
+kernelCacheSize = 32
+
+#-------------------------------------------------------------------------------
+# ssKernel Class
+# Vectorized numpy version of the A, B, C, D, and DC_OP matrices
+#
+# The parameters of the constructor are listed bellow:
+# A: state matrix
+# B: input matrix
+# C: output matrix
+# D: feedforward matrix
+# DC_OP: operating point
+# names: name of the other parameters of the netlist. They are accepted by
+#        evaluate, but ignored, since they cancel out of the matrices
+#-------------------------------------------------------------------------------
+class ssKernel:
+
+    #---------------------------------------------------------------------------
+    # Constructor
+    #---------------------------------------------------------------------------
+    def __init__(self, A, B, C, D, DC_OP, names = []):
+        self.shapes  = [A.shape, B.shape, C.shape, D.shape]
+        self.nOut    = DC_OP.shape[0]
+        entries      = list(A) + list(B) + list(C) + list(D) + list(DC_OP)
+        free         = set().union(*[si.sympify(e).free_symbols \
+                                     for e in entries])
+        self.symbols = sorted(free, key = lambda sym: sym.name)
+        self.func    = si.lambdify(self.symbols, entries, 'numpy', cse = True)
+        self.names   = set(names) | set(self.getParams())
+
+    #---------------------------------------------------------------------------
+    # Get the name of the parameters used by the matrices
+    #---------------------------------------------------------------------------
+    def getParams(self):
+        return [sym.name for sym in self.symbols]
+
+    #---------------------------------------------------------------------------
+    # Evaluate the matrices
+    #
+    # -Inputs
+    # params: dictionary mapping the name of each parameter into an  array with
+    #         N samples (scalars are used for all samples)
+    # -Outputs
+    # A:      (N, nST, nST) array
+    # B:      (N, nST, nIn) array
+    # C:      (N, nOut, nST) array
+    # D:      (N, nOut, nIn) array
+    # DC_OP:  (N, nOut) array
+    #---------------------------------------------------------------------------
+    def evaluate(self, params):
+        params  = {str(name): value for (name, value) in params.items()}
+        missing = [name for name in self.getParams() if not name in params]
+        if len(missing) != 0:
+            raise Error("Missing values for " + str(missing))
+        #Misspelled names would be silently ignored
+        unknown = sorted(set(params.keys()) - self.names)
+        if len(unknown) != 0:
+            raise Error("Unknown parameters " + str(unknown) + ". The " + \
+                        "matrices depend on " + str(self.getParams()))
+        args = [np.asarray(params[name], dtype = float) \
+                for name in self.getParams()]
+        N    = np.broadcast_shapes(*([arg.shape for arg in args] + [(1,)]))[0]
+        vals = self.func(*args)
+        #The extra column keeps np.stack valid when all matrices are empty
+        vals = np.stack([np.broadcast_to(np.asarray(v, dtype = float), (N,)) \
+                         for v in vals] + [np.zeros(N)], axis = -1)
+        res  = []
+        pos  = 0
+        for (rows, cols) in self.shapes:
+            res.append(vals[:, pos:pos + rows*cols].reshape(N, rows, cols))
+            pos = pos + rows*cols
+        res.append(vals[:, pos:pos + self.nOut])
+        return tuple(res)
+
+#-------------------------------------------------------------------------------
+# compileABCD
+# Compile the results of calcABCD into a vectorized numpy kernel
+#
+# -Inputs
+# A, B, C, D, DC_OP: results of calcABCD (or netlist2ss)
+# names:             name of the other parameters of the netlist (see ssKernel)
+# -Outputs
+# kernel: instance of ssKernel
+#-------------------------------------------------------------------------------
+def compileABCD(A, B, C, D, DC_OP, names = []):
+    return ssKernel(A, B, C, D, DC_OP, names)
+
+#-------------------------------------------------------------------------------
+# netlist2ss_sweep
+# Evaluate the space state representation of a circuit for many  parameter
+# samples. The symbolic derivation and the compiled kernel are cached, so the
+# next sweeps of the same circuit only evaluate the kernel.
+#
+# -Inputs
+# netlist:  A string with a spice netlist
+# inputs:   a list containing the name of variables consired to be the  inputs
+#           of the system
+# outputs:  A list containing the desired measurements from  which  the output
+#           equations will be built
+# params:   dictionary mapping the name of each parameter into an array with N
+#           samples (scalars are used for all samples). The .PARAM values are
+#           used for the parameters that aren't given
+# -Outputs
+# A:      (N, nST, nST) array
+# B:      (N, nST, nIn) array
+# C:      (N, nOut, nST) array
+# D:      (N, nOut, nIn) array
+# DC_OP:  (N, nOut) array
+#
+# -example:
+# (A, B, C, D, OP) = netlist2ss_sweep("v1 n1 gnd in\nr1 n1 c1 r1\n
+#                                      c1 c1 gnd c1", ["in"], ["Vnc1"],
+#                                     {"in": 1, "r1": np.linspace(1, 2, 100),
+#                                      "c1": 1e-9})
+#-------------------------------------------------------------------------------
+def netlist2ss_sweep(netlist, inputs, outputs, params):
+    #The swept parameters are kept symbolic, even if a .PARAM line gives
+    #them a value
+    names = sorted([str(name) for name in params.keys()])
+    key   = (netlist, tuple(inputs), tuple(outputs), tuple(names))
+    if key in kernelCache:
+        kernelCache.move_to_end(key)
+    else:
+        circuit = Circuit(netlist, params = {name: None for name in names})
+        res     = circuit.state_space(inputs, outputs)
+        kernelCache[key] = compileABCD(*res, names = \
+                                       circuit.getComponents()[1].store. \
+                                       symbolNames())
+        while len(kernelCache) > kernelCacheSize:
+            kernelCache.popitem(last = False)
+    return kernelCache[key].evaluate(params)
@@ -0,0 +1,138 @@
+## @package tf
+#
+#  @author  Rodrigo Pedroso Mendes
+#  @version V1.0
+#  @date    16/10/26 18:41:12
+#
+#  #LICENSE#
+#
+#  Copyright (c) 2026 Rodrigo Pedroso Mendes
+#
+#  Permission is hereby granted, free of charge, to any  person   obtaining  a
+#  copy of this software and associated  documentation files (the "Software"),
+#  to deal in the Software without restriction, including  without  limitation
+#  the rights to use, copy, modify,  merge,  publish,  distribute, sublicense,
+#  and/or sell copies of the Software, and  to  permit  persons  to  whom  the
+#  Software is furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included  in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,  EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE  WARRANTIES  OF  MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE  LIABLE FOR ANY  CLAIM,  DAMAGES  OR  OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF  CONTRACT, TORT  OR  OTHERWISE,  ARISING
+#  FROM, OUT OF OR IN CONNECTION  WITH  THE  SOFTWARE  OR  THE  USE  OR  OTHER
+#  DEALINGS IN THE SOFTWARE.
+#
+#  #DESCRIPTION#
+#
+#      This module calculates the transfer functions of a space state  model
+#  without inverting (sI - A). The denominator is the characteristic polynomial
+#  of A (Berkowitz algorithm over the polynomial domain of the parameters) and
+#  the numerator of each input/output pair comes from the rank one update  of
+#  the determinant:
+#
+#      det(sI - A + b*c) = det(sI - A) + c*adj(sI - A)*b
+#
+#  so  c*adj(sI - A)*b + d*det(sI - A) is  the  difference  between  two
+#  characteristic polynomials plus d times the denominator.
+#
+################################################################################
+
+#-------------------------------------------------------------------------------
+# import necessary modules
+#-------------------------------------------------------------------------------
+import sympy as si
+from   netlist2ss.netlist2ss import simplifyMatrix
+
+#-------------------------------------------------------------------------------
+# charPoly
+# Characteristic polynomial det(sI - A) of a matrix that doesn't depend on s
+#
+# -Inputs
+# A: square sympy matrix
+# s: symbol of the Laplace variable
+# -Outputs
+# p: sympy Poly in s
+#-------------------------------------------------------------------------------
+def charPoly(A, s):
+    return si.Poly(A.charpoly(s).as_expr(), s)
+
+#-------------------------------------------------------------------------------
+# tfCoeffs
+# Transfer function of a single input/output pair
+#
+# -Inputs
+# A, B, C, D: space state matrices
+# i:          index of the output
+# j:          index of the input
+# s:          symbol of the Laplace variable
+# den:        characteristic polynomial of A (it is calculated if None)
+# simplify:   simplification level of the coefficients (see simplifyMatrix)
+# -Outputs
+# num: list with the coefficients of the numerator (highest power first)
+# den: list with the coefficients of the denominator (highest power first)
+#-------------------------------------------------------------------------------
+def tfCoeffs(A, B, C, D, i, j, s = si.Symbol('s'), den = None, \
+             simplify = 'cancel'):
+    if den is None:
+        den = charPoly(A, s)
+    num = charPoly(A - B[:, j]*C[i, :], s).as_expr() - den.as_expr() + \
+          D[i, j]*den.as_expr()
+    return tfFromPolys(num, den.as_expr(), s, simplify)
+
+#-------------------------------------------------------------------------------
+# tfFromPolys
+# Cancel the common factors of a numerator and a denominator polynomial in s,
+# clear the denominators of their coefficients and return the coefficients
+#
+# -Inputs
+# num:      numerator as a sympy expression (polynomial in s)
+# den:      denominator as a sympy expression (polynomial in s)
+# s:        symbol of the Laplace variable
+# simplify: simplification level of the coefficients (see simplifyMatrix)
+# cancel:   False if num and den are polynomials without common factors
+# -Outputs
+# num: list with the coefficients of the numerator (highest power first)
+# den: list with the coefficients of the denominator (highest power first)
+#-------------------------------------------------------------------------------
+def tfFromPolys(num, den, s, simplify = 'cancel', cancel = True):
+    (n, d) = si.fraction(si.cancel(num/den)) if cancel else (num, den)
+    n = si.Poly(n, s).all_coeffs()
+    d = si.Poly(d, s).all_coeffs()
+    n = list(simplifyMatrix(si.Matrix(len(n), 1, n), simplify))
+    d = list(simplifyMatrix(si.Matrix(len(d), 1, d), simplify))
+    return (n, d)
+
+#-------------------------------------------------------------------------------
+# transferMatrix
+# Transfer functions of all input/output pairs
+#
+# -Inputs
+# A, B, C, D: space state matrices
+# s:          symbol of the Laplace variable
+# simplify:   simplification level of the coefficients (see simplifyMatrix)
+# -Outputs
+# H: list of lists where H[i][j] = (num, den) is the transfer function from
+#    the input j to the output i as coefficient lists (highest power first)
+#-------------------------------------------------------------------------------
+def transferMatrix(A, B, C, D, s = si.Symbol('s'), simplify = 'cancel'):
+    den = charPoly(A, s)
+    return [[tfCoeffs(A, B, C, D, i, j, s, den, simplify) \
+             for j in range(0, D.shape[1])] for i in range(0, D.shape[0])]
+
+#-------------------------------------------------------------------------------
+# tfExpr
+# Build the polynomial expression from a list of coefficients
+#
+# -Inputs
+# coeffs: list with the coefficients (highest power first)
+# s:      symbol of the Laplace variable
+# -Outputs
+# p:      sympy expression
+#-------------------------------------------------------------------------------
+def tfExpr(coeffs, s = si.Symbol('s')):
+    n = len(coeffs)
+    return si.Add(*[coeffs[k]*s**(n - 1 - k) for k in range(0, n)])
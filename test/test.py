@@ -27,9 +27,34 @@
 #  DEALINGS IN THE SOFTWARE. 
 #    
 ################################################################################
+import os
+import json
+import tempfile
+import io
+import pathlib
+import time
 import unittest
+from   unittest import mock
+from   concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import sympy as si
-from netlist2ss import netlist2ss
+from netlist2ss import netlist2ss, netlist2ss_numeric, netlist2ss_sweep, \
+                       Circuit, transferMatrix, mnaTransferMatrix, ac_sweep
+from netlist2ss.tf         import tfExpr
+from netlist2ss            import sisotf
+from netlist2ss.cache      import diskCache
+from netlist2ss.canon      import netlistHash
+from netlist2ss.instrument import stageStats
+from netlist2ss            import bench
+from netlist2ss            import subckt
+from netlist2ss            import sweep
+from netlist2ss.budget     import budget, BudgetError, residentMemory
+from netlist2ss.numeric    import numericParams, deviceValues, symbolicValue
+from netlist2ss.netlist2ss import Error, netlistParser, streamComponents, \
+                                  componentStore, \
+                                  calcNodesnJ, \
+                                  nodalAnalysisMatrices, solveSystem, \
+                                  unknownSymbols
 
 
 class Test(unittest.TestCase):
@@ -653,9 +678,946 @@ class Test(unittest.TestCase):
         self.assertTrue(C.equals(C_ref))
         self.assertTrue(D.equals(D_ref))
         self.assertTrue(DC_OP.equals(DC_OP_ref))
-        
-        
-                                                                                                                                                     
+
+    ############################################################################
+    # Wheatstone bridge (coupled nodes solved by the fraction-free engine)
+    ############################################################################
+    def testBRIDGE(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 NA  R1\n"
+                   "R2 NA GND R2\n"
+                   "R3 N1 NB  R3\n"
+                   "R4 NB GND R4\n"
+                   "R5 NA NB  R5\n")
+        #Define symbols
+        R1  = si.simplify('R1')
+        R2  = si.simplify('R2')
+        R3  = si.simplify('R3')
+        R4  = si.simplify('R4')
+        R5  = si.simplify('R5')
+        VIN = si.simplify('VIN')
+        VA, VB = si.symbols('VA VB')
+        sol = si.solve([(VA - VIN)/R1 + VA/R2 + (VA - VB)/R5, \
+                        (VB - VIN)/R3 + VB/R4 + (VB - VA)/R5], [VA, VB])
+        VR5 = sol[VA] - sol[VB]
+        #Reference Matrices
+        A_ref = si.Matrix(0, 0, [])
+        B_ref = si.Matrix(0, 1, [])
+        C_ref = si.Matrix(2, 0, [])
+        D_ref = si.Matrix([[si.diff(VR5, VIN)], \
+                           [si.diff(VR5, VIN)/R5]])
+        DC_OP_ref = si.Matrix([[VR5], \
+                               [VR5/R5]])
+        # Run test
+        (A, B, C, D, DC_OP) = netlist2ss( netlist, ['VIN'], ['VdR5', 'IdR5'] )
+
+        #Asserts
+        self.assertTrue(A.equals(A_ref))
+        self.assertTrue(B.equals(B_ref))
+        self.assertTrue(C.equals(C_ref))
+        self.assertTrue(D.equals(D_ref))
+        self.assertTrue(DC_OP.equals(DC_OP_ref))
+
+    ############################################################################
+    # Values that aren't rational functions fall back to the symbolic inverse
+    ############################################################################
+    def testFLOAT(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  0.5*R1\n"
+                   "C1 N2 GND C1\n")
+        #Define symbols
+        R1  = si.simplify('R1')
+        C1  = si.simplify('C1')
+        VIN = si.simplify('VIN')
+        # Run test
+        (A, B, C, D, DC_OP) = netlist2ss( netlist, ['VIN'], ['VnN2'] )
+
+        #Asserts
+        self.assertTrue(A.equals(si.Matrix([[-2/(R1*C1)]])))
+        self.assertTrue(B.equals(si.Matrix([[ 2/(R1*C1)]])))
+        self.assertTrue(C.equals(si.Matrix([[1]])))
+        self.assertTrue(D.equals(si.Matrix([[0]])))
+        self.assertTrue(DC_OP.equals(si.Matrix([[VIN]])))
+
+    ############################################################################
+    # Only the unknowns used by the states and outputs are calculated
+    ############################################################################
+    def testPARTIAL(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  R1\n"
+                   "R2 N2 N3  R2\n"
+                   "R3 N3 N4  R3\n"
+                   "R4 N4 GND R4\n")
+        #Define symbols
+        R1  = si.simplify('R1')
+        R2  = si.simplify('R2')
+        R3  = si.simplify('R3')
+        R4  = si.simplify('R4')
+        VIN = si.simplify('VIN')
+        #Solve the nodal analysis system only for the voltage in N4
+        (compDict, compList) = netlistParser(netlist)
+        (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+        (A, Z) = nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict)
+        (Vp, Jp) = unknownSymbols(nNodes, nJ)
+        (V, J) = solveSystem(A, Z, nNodes, [nodesDict['N4']], (Vp, Jp))
+        VN4 = VIN*R4/(R1 + R2 + R3 + R4)
+
+        #Asserts
+        self.assertTrue(si.simplify(V[nodesDict['N4']] - VN4) == 0)
+        #The unknowns that weren't solved keep their placeholders
+        self.assertEqual(V[nodesDict['N2']], Vp[nodesDict['N2']])
+        self.assertEqual(J[0], Jp[0])
+        self.assertFalse(solveSystem(A, Z, nNodes, [0])[1].has(si.nan))
+        (A, B, C, D, DC_OP) = netlist2ss( netlist, ['VIN'], ['VnN4'] )
+        self.assertTrue(D.equals(si.Matrix([[si.diff(VN4, VIN)]])))
+        self.assertTrue(DC_OP.equals(si.Matrix([[VN4]])))
+
+    ############################################################################
+    # Sparse assembly of the nodal analysis matrices
+    ############################################################################
+    def testMNA(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  R1\n"
+                   "R2 N2 GND R2\n"
+                   "C1 N2 GND C1\n")
+        #Define symbols
+        R1  = si.simplify('R1')
+        R2  = si.simplify('R2')
+        VIN = si.simplify('VIN')
+        VC1 = si.simplify('state_var_C1')
+        #Reference Matrices
+        A_ref = si.Matrix([[ 1/R1, -1/R1,        1, 0], \
+                           [-1/R1,  1/R1 + 1/R2, 0, 1], \
+                           [ 1,     0,           0, 0], \
+                           [ 0,     1,           0, 0]])
+        Z_ref = si.Matrix([[0], [0], [VIN], [VC1]])
+        # Run test
+        (compDict, compList) = netlistParser(netlist)
+        (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+        (A, Z) = nodalAnalysisMatrices(compList, nJ, nNodes, nodesDict)
+
+        #Asserts
+        self.assertTrue(isinstance(A, si.SparseMatrix))
+        self.assertTrue(isinstance(Z, si.SparseMatrix))
+        self.assertEqual(len(A.todok()), 8)
+        self.assertTrue(A.equals(A_ref))
+        self.assertTrue(Z.equals(Z_ref))
+
+    ############################################################################
+    # Numeric mode matches the symbolic one evaluated at the same point
+    ############################################################################
+    def testNUMERIC(self):
+        netlist = ("VIN  VIN  GND  VIN\n"
+                   "EIN  N1   GND  VIN GND Duty\n"
+                   "FIN  VIN  GND  N1  N2  Duty\n"
+                   "RESR VOUT N3   Resr\n"
+                   "COUT N3   GND  Cout\n"
+                   "LIN  N2   VOUT L\n"
+                   "ROUT VOUT GND  Rload\n")
+        params = {'VIN': 12.0, 'Duty': 0.4, 'Resr': 0.1, 'Cout': 1e-4, \
+                  'L': 1e-5, 'Rload': 5.0}
+        inputs  = ['VIN', 'Duty']
+        outputs = ['VnVOUT', 'IdLIN', 'IdVIN']
+        # Run test
+        ref = netlist2ss(netlist, inputs, outputs)
+        res = netlist2ss_numeric(netlist, inputs, outputs, params)
+        sub = {si.Symbol(k): v for (k, v) in params.items()}
+
+        #Asserts
+        for (M, Mn) in zip(ref, res):
+            M = np.array(M.xreplace(sub).evalf(), dtype = float)
+            self.assertTrue(np.allclose(M.reshape(Mn.shape), Mn))
+        with self.assertRaises(Error):
+            netlist2ss_numeric(netlist, inputs, outputs, {'VIN': 12.0})
+
+    ############################################################################
+    # Vectorized evaluation for many parameter samples
+    ############################################################################
+    def testSWEEP(self):
+        netlist = ("V1 N1 GND IN\n"
+                   "R1 N1 N2  R1\n"
+                   "C1 N2 GND C1\n")
+        R1 = np.array([1.0, 2.0, 4.0])
+        # Run test
+        (A, B, C, D, DC_OP) = netlist2ss_sweep(netlist, ['IN'], ['VnN2'], \
+                                               {'IN': 3.0, 'R1': R1, 'C1': 0.5})
+
+        #Asserts
+        self.assertEqual(A.shape, (3, 1, 1))
+        self.assertEqual(DC_OP.shape, (3, 1))
+        self.assertTrue(np.allclose(A[:, 0, 0], -1/(R1*0.5)))
+        self.assertTrue(np.allclose(B[:, 0, 0],  1/(R1*0.5)))
+        self.assertTrue(np.allclose(C, 1))
+        self.assertTrue(np.allclose(D, 0))
+        self.assertTrue(np.allclose(DC_OP, 3))
+        with self.assertRaises(Error):
+            netlist2ss_sweep(netlist, ['IN'], ['VnN2'], {'IN': 3.0})
+        with self.assertRaises(Error):
+            netlist2ss_sweep(netlist, ['IN'], ['VnN2'], \
+                             {'IN': 3.0, 'R1': R1, 'C1': 0.5, 'bogus': 1.0})
+        #The parameters of the netlist that cancel out are ignored
+        (A, B, C, D, DC_OP) = netlist2ss_sweep(netlist + "R2 N1 GND R2\n", \
+                                               ['IN'], ['VnN2'], \
+                                               {'IN': 3.0, 'R1': R1, \
+                                                'C1': 0.5, 'R2': 1.0})
+        self.assertTrue(np.allclose(A[:, 0, 0], -1/(R1*0.5)))
+        #The cache keeps only the most recently used kernels
+        with mock.patch.object(sweep, 'kernelCacheSize', 1):
+            netlist2ss_sweep(netlist + "R2 N2 GND R2\n", ['IN'], ['VnN2'], \
+                             {'IN': 3.0, 'R1': R1, 'C1': 0.5, 'R2': 1.0})
+            self.assertEqual(len(sweep.kernelCache), 1)
+        #The swept .PARAM parameters are symbolic
+        (A, B, C, D, DC_OP) = netlist2ss_sweep(netlist + ".PARAM R1=1e3\n", \
+                                               ['IN'], ['VnN2'], \
+                                               {'IN': 3.0, 'R1': R1, 'C1': 0.5})
+        self.assertTrue(np.allclose(A[:, 0, 0], -1/(R1*0.5)))
+        (A, B, C, D, DC_OP) = netlist2ss_sweep(netlist + ".PARAM R1=1e3\n", \
+                                               ['IN'], ['VnN2'], \
+                                               {'IN': 3.0, 'C1': [0.5, 1.0]})
+        self.assertTrue(np.allclose(A[:, 0, 0], [-1/500.0, -1/1000.0]))
+
+    ############################################################################
+    # Circuit caches the stages shared by several queries
+    ############################################################################
+    def testCIRCUIT(self):
+        netlist = ("VIN  VIN  GND  VIN\n"
+                   "EIN  N1   GND  VIN GND Duty\n"
+                   "FIN  VIN  GND  N1  N2  Duty\n"
+                   "RESR VOUT N3   Resr\n"
+                   "COUT N3   GND  Cout\n"
+                   "LIN  N2   VOUT L\n"
+                   "ROUT VOUT GND  Rload\n")
+        circuit = Circuit(netlist)
+        queries = [(['VIN'], ['VnVOUT']),
+                   (['VIN', 'Duty'], ['IdLIN', 'VnN3']),
+                   (['Duty'], ['IdVIN'])]
+        # Run test
+        for (inputs, outputs) in queries:
+            mna = circuit.getMNA()
+            res = circuit.state_space(inputs, outputs)
+            ref = netlist2ss(netlist, inputs, outputs)
+            #Asserts
+            self.assertTrue(circuit.getMNA() is mna)
+            for (M, M_ref) in zip(res, ref):
+                self.assertTrue(M.equals(M_ref))
+        (nJ, nNodes, nodesDict) = circuit.getNodes()
+        self.assertTrue(nodesDict['N3'] in circuit.solution)
+
+    ############################################################################
+    # All simplification levels return the same matrices
+    ############################################################################
+    def testSIMPLIFY(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  R1\n"
+                   "C1 N2 GND C1\n"
+                   "R2 N2 N3  R2\n"
+                   "C2 N3 GND C2\n")
+        # Run test
+        ref = netlist2ss(netlist, ['VIN'], ['VnN3', 'IdR1'], simplify = 'full')
+        for level in ['none', 'cancel', 'factor']:
+            res = netlist2ss(netlist, ['VIN'], ['VnN3', 'IdR1'], \
+                             simplify = level)
+            #Asserts
+            for (M, M_ref) in zip(res, ref):
+                self.assertTrue(M.equals(M_ref))
+        circuit = Circuit(netlist)
+        circuit.state_space(['VIN'], ['VnN3'])
+        self.assertTrue('solve' in circuit.times)
+        self.assertTrue('simplify' in circuit.times)
+        with self.assertRaises(Error):
+            netlist2ss(netlist, ['VIN'], ['VnN3'], simplify = 'fast')
+
+    ############################################################################
+    # Parallel simplification returns the same matrices as the serial one
+    ############################################################################
+    def testPARALLEL(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  R1\n"
+                   "C1 N2 GND C1\n"
+                   "R2 N2 N3  R2\n"
+                   "C2 N3 GND C2\n"
+                   "L1 N3 N4  L1\n"
+                   "R3 N4 GND R3\n")
+        # Run test
+        ref = netlist2ss(netlist, ['VIN'], ['VnN3', 'IdR1', 'IdL1'], \
+                         simplify = 'full')
+        res = netlist2ss(netlist, ['VIN'], ['VnN3', 'IdR1', 'IdL1'], \
+                         simplify = 'full', workers = 2)
+
+        #Asserts
+        for (M, M_ref) in zip(res, ref):
+            self.assertEqual(M.shape, M_ref.shape)
+            self.assertTrue(M.equals(M_ref))
+
+    ############################################################################
+    # Operating point of state equations that are affine in the states
+    ############################################################################
+    def testLINEAROP(self):
+        netlist = ("V1 N1 GND VIN\n"
+                   "R1 N1 N2  R1\n"
+                   "C1 N2 GND C1\n"
+                   "L1 N2 N3  L1\n"
+                   "R2 N3 GND R2\n")
+        #Define symbols
+        R1  = si.simplify('R1')
+        R2  = si.simplify('R2')
+        VIN = si.simplify('VIN')
+        # Run test without the general sympy solver
+        with mock.patch('sympy.solve') as solve:
+            (A, B, C, D, DC_OP) = netlist2ss(netlist, ['VIN'], ['VnN3'])
+            self.assertFalse(solve.called)
+
+        #Asserts
+        self.assertTrue(DC_OP.equals(si.Matrix([[VIN*R2/(R1 + R2)]])))
+        with self.assertRaises(Error):
+            netlist2ss("I1 GND N1 I1\nC1 N1 GND C1\n", ['I1'], ['VnN1'])
+
+    ############################################################################
+    # Transfer matrix from characteristic polynomials
+    ############################################################################
+    def testTF(self):
+        netlist = ("VIN  VIN  GND  VIN\n"
+                   "EIN  N1   GND  VIN GND Duty\n"
+                   "FIN  VIN  GND  N1  N2  Duty\n"
+                   "RESR VOUT N3   Resr\n"
+                   "COUT N3   GND  Cout\n"
+                   "LIN  N2   VOUT L\n"
+                   "ROUT VOUT GND  Rload\n")
+        s = si.Symbol('s')
+        # Run test
+        (A, B, C, D, DC_OP) = netlist2ss(netlist, ['VIN', 'Duty'], \
+                                         ['VnVOUT', 'IdLIN'])
+        H = transferMatrix(A, B, C, D, s)
+        H_ref = C*((s*(si.eye(A.shape[0]))-A).inv())*B + D
+
+        #Asserts
+        for i in range(0, 2):
+            for j in range(0, 2):
+                (num, den) = H[i][j]
+                self.assertEqual(len(den), 3)
+                n = sum([num[k]*s**(len(num) - 1 - k) \
+                         for k in range(0, len(num))])
+                d = sum([den[k]*s**(len(den) - 1 - k) \
+                         for k in range(0, len(den))])
+                self.assertEqual(si.simplify(n/d - H_ref[i, j]), 0)
+
+    ############################################################################
+    # Transfer matrix from the nodal analysis in the Laplace domain
+    ############################################################################
+    def testMNATF(self):
+        netlist = ("VIN  VIN  GND  VIN\n"
+                   "EIN  N1   GND  VIN GND Duty\n"
+                   "FIN  VIN  GND  N1  N2  Duty\n"
+                   "RESR VOUT N3   Resr\n"
+                   "COUT N3   GND  Cout\n"
+                   "LIN  N2   VOUT L\n"
+                   "ROUT VOUT GND  Rload\n")
+        s = si.Symbol('s')
+        inputs  = ['VIN', 'Duty']
+        outputs = ['VnVOUT', 'IdLIN', 'IdCOUT', 'IdFIN']
+        # Run test
+        H = mnaTransferMatrix(netlist, inputs, outputs, s)
+        (A, B, C, D, DC_OP) = netlist2ss(netlist, inputs, outputs)
+        H_ref = transferMatrix(A, B, C, D, s)
+
+        #Asserts
+        for i in range(0, len(outputs)):
+            for j in range(0, len(inputs)):
+                (num, den) = H[i][j]
+                (num_ref, den_ref) = H_ref[i][j]
+                self.assertEqual(si.cancel(tfExpr(num, s)/tfExpr(den, s) - \
+                                 tfExpr(num_ref, s)/tfExpr(den_ref, s)), 0)
+        with self.assertRaises(Error):
+            mnaTransferMatrix("V1 N1 GND IN\nC1 N1 GND IN\n", ['IN'], \
+                              ['IdC1'])
+
+    ############################################################################
+    # Numeric frequency response
+    ############################################################################
+    def testAC(self):
+        netlist = ("VIN  VIN  GND  VIN\n"
+                   "EIN  N1   GND  VIN GND Duty\n"
+                   "FIN  VIN  GND  N1  N2  Duty\n"
+                   "RESR VOUT N3   Resr\n"
+                   "COUT N3   GND  Cout\n"
+                   "LIN  N2   VOUT L\n"
+                   "ROUT VOUT GND  Rload\n")
+        params  = {'VIN': 12, 'Duty': 0.4, 'Resr': 0.05, 'Cout': 100e-6, \
+                   'L': 10e-6, 'Rload': 5}
+        inputs  = ['VIN', 'Duty']
+        outputs = ['VnVOUT', 'IdLIN', 'IdFIN']
+        freqs   = np.logspace(1, 6, 50)
+        s       = si.Symbol('s')
+        # Run test
+        H_mna  = ac_sweep(netlist, inputs, outputs, freqs, params)
+        H_hess = ac_sweep(netlist, inputs, outputs, freqs, params, \
+                          'hessenberg')
+        (A, B, C, D, DC_OP) = netlist2ss(netlist, inputs, outputs)
+        H = transferMatrix(A, B, C, D, s)
+        P = {si.Symbol(name): value for (name, value) in params.items()}
+
+        #Asserts
+        self.assertEqual(H_mna.shape, (50, 3, 2))
+        for i in range(0, len(outputs)):
+            for j in range(0, len(inputs)):
+                tf = (tfExpr(H[i][j][0], s)/tfExpr(H[i][j][1], s)).xreplace(P)
+                H_ref = si.lambdify(s, tf, 'numpy')(2j*np.pi*freqs)
+                np.testing.assert_allclose(H_mna[:, i, j], H_ref, rtol = 1e-9)
+                np.testing.assert_allclose(H_hess[:, i, j], H_ref, \
+                                           rtol = 1e-9)
+        with self.assertRaises(Error):
+            ac_sweep(netlist, inputs, outputs, freqs, params, 'bode')
+
+    ############################################################################
+    # Batch mode of sisotf
+    ############################################################################
+    def testBATCH(self):
+        netlist = ("V1 N1  GND IN\n"
+                   "R1 N1  OUT RES\n"
+                   "C1 OUT GND COUT\n")
+        tmp = tempfile.mkdtemp()
+        for name in ['a.sp', 'b.sp']:
+            handle = open(os.path.join(tmp, name), 'w')
+            handle.write(netlist)
+            handle.close()
+        manifest = os.path.join(tmp, 'jobs.txt')
+        handle = open(manifest, 'w')
+        handle.write("# glob inputs outputs\n\n" +
+                     os.path.join(tmp, '*.sp') + " IN VnOUT,IdC1\n" +
+                     os.path.join(tmp, 'c.sp') + " IN VnOUT\n")
+        handle.close()
+        output = os.path.join(tmp, 'out.jsonl')
+        args = mock.Mock(simplify = 'cancel', method = 'ss', jobs = 2, \
+                         output = output, cache = None)
+        # Run test
+        failed = sisotf.batch(sisotf.readManifest(manifest), args)
+        handle = open(output, 'r')
+        res = [json.loads(line) for line in handle.read().splitlines()]
+        handle.close()
+
+        #Asserts
+        self.assertEqual(failed, 1)
+        self.assertEqual([r['status'] for r in res], ['ok', 'ok', 'error'])
+        self.assertEqual(res[0]['tf'][0], {'input': 'IN', 'output': 'VnOUT', \
+                                           'num': ['1'], \
+                                           'den': ['COUT*RES', '1']})
+        self.assertEqual(res[0]['tf'][1]['output'], 'IdC1')
+        self.assertTrue('FileNotFoundError' in res[2]['error'])
+        self.assertTrue(res[0]['time'] > 0)
+        #A job that dies doesn't lose the results of the other jobs
+        with mock.patch.object(sisotf, 'ProcessPoolExecutor', \
+                               lambda n: ThreadPoolExecutor(1)), \
+             mock.patch.object(sisotf, 'runJob', side_effect = \
+                               [RuntimeError('worker died')] + res[1:]):
+            failed = sisotf.batch(sisotf.readManifest(manifest), args)
+        handle = open(output, 'r')
+        res = [json.loads(line) for line in handle.read().splitlines()]
+        handle.close()
+        self.assertEqual(failed, 2)
+        self.assertEqual([r['status'] for r in res], ['error', 'ok', 'error'])
+        self.assertTrue('worker died' in res[0]['error'])
+        self.assertEqual(res[1]['tf'][0]['den'], ['COUT*RES', '1'])
+
+    ############################################################################
+    # Persistent cache of the space state matrices
+    ############################################################################
+    def testCACHE(self):
+        netlist = ("V1 N1  GND IN\n"
+                   "R1 N1  OUT RES\n"
+                   "C1 OUT GND COUT\n")
+        tmp = tempfile.mkdtemp()
+        # Run test
+        res = netlist2ss(netlist, ['IN'], ['VnOUT'], cache = tmp)
+        with mock.patch('netlist2ss.netlist2ss.calcABCD') as calc:
+            hit = netlist2ss(netlist, ['IN'], ['VnOUT'], cache = tmp)
+        Circuit(netlist, simplify = 'factor', \
+                cache = diskCache(tmp)).state_space(['IN'], ['VnOUT'])
+
+        #Asserts
+        self.assertEqual(calc.call_count, 0)
+        self.assertEqual(len(os.listdir(tmp)), 2)
+        self.assertEqual(len(hit), len(res))
+        for (M1, M2) in zip(hit, res):
+            self.assertEqual(M1, M2)
+
+        # Version change and eviction
+        cache = diskCache(tmp)
+        key = Circuit(netlist, simplify = 'full', \
+                      cache = cache).cacheKey(['IN'], ['VnOUT'])
+        self.assertIsNotNone(cache.get(key))
+        cache.version = 'other'
+        self.assertIsNone(cache.get(Circuit(netlist, cache = \
+                                    cache).cacheKey(['IN'], ['VnOUT'])))
+        cache = diskCache(tmp, maxSize = 1)
+        cache.put('a', res)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.size(), 0)
+        cache.clear()
+
+    ############################################################################
+    # Canonical netlist hash
+    ############################################################################
+    def testHASH(self):
+        netlist = ("V1 N1  GND IN\n"
+                   "R1 N1  MID 2*RES\n"
+                   "L1 MID OUT L\n"
+                   "C1 OUT GND COUT\n")
+        same = ("* the same circuit\n"
+                "L1 x_7 OUT L\n"
+                "C1   OUT 0   COUT   ; output capacitor\n"
+                "\n"
+                "V1  in gnd IN\n"
+                "R1 in  x_7 RES + RES\n")
+        # Run test
+        key = netlistHash(netlist, ['OUT'])
+
+        #Asserts
+        self.assertEqual(len(key), 64)
+        self.assertEqual(netlistHash(same, ['OUT']), key)
+        self.assertEqual(netlistHash(netlist), netlistHash(same))
+        #The ports keep their names
+        self.assertNotEqual(netlistHash(same, ['OUT', 'in']), key)
+        self.assertNotEqual(netlistHash(netlist.replace('L1 MID OUT', \
+                                                        'L1 OUT MID')), \
+                            netlistHash(netlist))
+        self.assertNotEqual(netlistHash(netlist.replace('2*RES', '3*RES')), \
+                            netlistHash(netlist))
+        #The persistent cache uses the canonical form
+        tmp = tempfile.mkdtemp()
+        res = netlist2ss(netlist, ['IN'], ['VnOUT'], cache = tmp)
+        with mock.patch('netlist2ss.netlist2ss.calcABCD') as calc:
+            hit = netlist2ss(same, ['IN'], ['VnOUT'], cache = tmp)
+        self.assertEqual(calc.call_count, 0)
+        self.assertEqual(hit[0], res[0])
+
+    ############################################################################
+    # Incremental re-analysis
+    ############################################################################
+    def testINCREMENTAL(self):
+        netlist = ("V1 IN  0   VIN\n"
+                   "R1 IN  MID R1\n"
+                   "R2 MID OUT R2\n"
+                   "R3 MID 0   R3\n"
+                   "C1 OUT 0   C1\n")
+        # Run test
+        circuit = Circuit(netlist)
+        circuit.state_space(['VIN'], ['VnOUT'])
+        circuit.times = {}
+        circuit.update_component('R3', '2*R3')
+        upd = circuit.state_space(['VIN'], ['VnOUT'])
+        updTimes = circuit.times
+        circuit.times = {}
+        circuit.add_component('L1 MID OUT L1')
+        add = circuit.state_space(['VIN'], ['VnOUT'])
+        addTimes = circuit.times
+        full1 = netlist2ss(netlist.replace('0   R3', '0   2*R3'), ['VIN'], \
+                           ['VnOUT'])
+        full2 = netlist2ss(netlist.replace('0   R3', '0   2*R3') + \
+                           'L1 MID OUT L1\n', ['VIN'], ['VnOUT'])
+
+        #Asserts
+        #A value change is solved again, an added device is an update
+        self.assertTrue('solve' in updTimes and not 'update' in updTimes)
+        self.assertTrue('update' in addTimes and not 'solve' in addTimes)
+        for (res, full) in [(upd, full1), (add, full2)]:
+            for i in range(0, 4):
+                self.assertEqual(si.simplify(res[i] - full[i]), \
+                                 si.zeros(*full[i].shape))
+        self.assertRaises(Error, circuit.update_component, 'R9', 'R')
+        self.assertRaises(Error, circuit.add_component, 'R1 IN 0 R')
+
+    ############################################################################
+    # Per-stage records delivered to the hooks
+    ############################################################################
+    def testPROFILE(self):
+        netlist = ("V1 IN  0   VIN\n"
+                   "R1 IN  MID R1\n"
+                   "C1 MID 0   C1\n"
+                   "L1 MID OUT L1\n"
+                   "R2 OUT 0   R2\n")
+        events = []
+        stats  = stageStats()
+        # Run test
+        res = netlist2ss(netlist, ['VIN'], ['VnOUT'], profile = True, \
+                         hooks = [stats, lambda e, r: events.append(e)])
+        summary = stats.summary()
+
+        #Asserts
+        self.assertEqual(res, netlist2ss(netlist, ['VIN'], ['VnOUT']))
+        for stage in ['parse', 'nodes', 'mna', 'states', 'outputs', \
+                      'solve', 'calcABCD']:
+            self.assertEqual(summary[stage]['calls'], 1)
+            #The nodes are numbered by the parser
+            if stage != 'nodes':
+                self.assertTrue(summary[stage]['memory'] > 0)
+        self.assertTrue(summary['calcABCD']['ops'] > 0)
+        self.assertTrue(summary['calcABCD']['depth'] > 1)
+        #The parse and nodes stages don't return expressions
+        self.assertFalse('ops' in summary['parse'])
+        self.assertFalse('ops' in summary['nodes'])
+        self.assertEqual(events.count('start'), len(stats.records))
+        self.assertEqual(events.count('end'), len(stats.records))
+        self.assertEqual(len(json.loads(json.dumps(stats.asDict()))\
+                             ['records']), len(stats.records))
+        #The wall time is always recorded, the rest only when profiling
+        circuit = Circuit(netlist)
+        circuit.state_space(['VIN'], ['VnOUT'])
+        self.assertEqual(set(circuit.stats.summary()['solve'].keys()), \
+                         set(['calls', 'time']))
+        self.assertEqual(circuit.stats.summary()['solve']['time'], \
+                         circuit.times['solve'])
+
+    ############################################################################
+    # Benchmark generators and baseline comparison
+    ############################################################################
+    def testBENCH(self):
+        # Run test
+        for (name, gen) in bench.generators.items():
+            (netlist, inputs, outputs) = gen(1)
+            res = netlist2ss(netlist, inputs, outputs, simplify = 'none')
+            #Asserts
+            self.assertEqual(res[2].shape[0], 1)
+        (netlist, inputs, outputs) = bench.rcLadder(3)
+        self.assertEqual(netlist2ss(netlist, inputs, outputs)[0].shape, \
+                         (3, 3))
+        (netlist, inputs, outputs) = bench.buckCascade(2)
+        self.assertEqual(netlist2ss(netlist, inputs, outputs)[0].shape, \
+                         (4, 4))
+        run = bench.runBenchmarks({'rcLadder': [1, 2]})
+        self.assertEqual([r['size'] for r in run['results']], [1, 2])
+        for stage in ['parse', 'solve', 'calcABCD', 'tf', 'total']:
+            self.assertTrue(stage in run['results'][0]['times'])
+        run = json.loads(json.dumps(run))
+        slow = json.loads(json.dumps(run))
+        slow['results'][1]['times']['tf'] = 10.0
+        self.assertEqual(bench.compareBaseline(run, run), [])
+        self.assertEqual(bench.compareBaseline(slow, run)[0][0:3], \
+                         ('rcLadder', 2, 'tf'))
+        slow['python'] = '0.0'
+        self.assertEqual(bench.baselineMismatch(run, run), [])
+        self.assertEqual(bench.baselineMismatch(run, slow), ['python'])
+        #The numeric version must handle 10k sections well under a second
+        res = bench.numericCase(10000)
+        self.assertEqual(res['devices'], 20002)
+        self.assertLess(res['times']['total'], 1.0)
+
+    ############################################################################
+    # Budgets of the symbolic derivation
+    ############################################################################
+    def testBUDGET(self):
+        (netlist, inputs, outputs) = bench.rcLadder(3)
+        values = {'VIN': 1.0, 'R1': 1e3, 'R2': 1e3, 'R3': 2e3, \
+                  'C1': 1e-9, 'C2': 2e-9, 'C3': 1e-9}
+        stats  = stageStats()
+        # Run test
+        res = netlist2ss(netlist, inputs, outputs, hooks = [stats], \
+                         budget = budget(maxTime = 60, maxOps = 10**6))
+        ref = netlist2ss(netlist, inputs, outputs)
+
+        #Asserts
+        self.assertEqual(res, ref)
+        #The records of the worker are delivered to the hooks
+        self.assertEqual(stats.summary()['solve']['calls'], 1)
+        self.assertTrue(stats.summary()['calcABCD']['ops'] > 0)
+        #The worker can simplify in parallel
+        res = netlist2ss(netlist, inputs, outputs, workers = 2, \
+                         simplify = 'full', budget = budget(maxTime = 60))
+        self.assertEqual(res, netlist2ss(netlist, inputs, outputs, \
+                                         simplify = 'full'))
+        #Operation count, in the process and in the worker
+        circuit = Circuit(netlist, budget = budget(maxOps = 5))
+        with self.assertRaises(BudgetError) as cm:
+            circuit.state_space(inputs, outputs)
+        self.assertEqual(cm.exception.kind, 'ops')
+        self.assertTrue(cm.exception.stage in ['mna', 'solve'])
+        with self.assertRaises(BudgetError) as cm:
+            netlist2ss(netlist, inputs, outputs, budget = budget(maxOps = 5))
+        self.assertTrue('ops > 5 ops' in str(cm.exception))
+        #The worker is killed when the time is over
+        (netlist, inputs, outputs) = bench.rlcMesh(3)
+        start = time.perf_counter()
+        with self.assertRaises(BudgetError) as cm:
+            netlist2ss(netlist, inputs, outputs, \
+                       budget = budget(maxTime = 0.5))
+        self.assertEqual(cm.exception.kind, 'time')
+        self.assertTrue(time.perf_counter() - start < 5)
+        #Numeric fallback
+        (netlist, inputs, outputs) = bench.rcLadder(3)
+        res = netlist2ss(netlist, inputs, outputs, fallback = values, \
+                         budget = budget(maxOps = 5))
+        ref = netlist2ss_numeric(netlist, inputs, outputs, values)
+        for (M, M_ref) in zip(res, ref):
+            self.assertTrue(np.allclose(M, M_ref))
+        #The memory limit uses the current resident size, so the memory that
+        #was freed doesn't count
+        if os.path.exists('/proc/self/statm'):
+            big = np.ones(1 << 25)
+            del big
+            limit = residentMemory() + (64 << 20)
+            circuit = Circuit(netlist, budget = budget(maxMemory = limit))
+            circuit.state_space(inputs, outputs)
+            with self.assertRaises(BudgetError) as cm:
+                Circuit(netlist, budget = budget(maxMemory = 1)).state_space( \
+                        inputs, outputs)
+            self.assertEqual(cm.exception.kind, 'memory')
+
+    ############################################################################
+    # Streaming parser
+    ############################################################################
+    def testSTREAM(self):
+        netlist = ("* header\n"
+                   "V1 IN  0   VIN\r\n"
+                   "\n"
+                   "R1 IN  MID R1 ; series resistor\n"
+                   "G1 OUT 0   MID 0 gm\n"
+                   "C1 OUT 0   C1\n")
+        path = os.path.join(tempfile.mkdtemp(), 'stream.sp')
+        with open(path, 'w', newline = '') as handle:
+            handle.write(netlist)
+        # Run test
+        ref = netlistParser(netlist)
+        res = [netlistParser(io.StringIO(netlist)), \
+               netlistParser(pathlib.Path(path))]
+        with mock.patch('netlist2ss.netlist2ss.mmapThreshold', 0):
+            res.append(netlistParser(pathlib.Path(path)))
+
+        #Asserts
+        self.assertEqual(list(ref[0].keys()), ['V1', 'R1', 'G1', 'C1'])
+        self.assertEqual(ref[0]['G1'].getNodes(), ['OUT', '0', 'MID', '0'])
+        self.assertEqual(ref[0]['R1'].getValue(), si.Symbol('R1'))
+        for (compDict, compList) in res:
+            self.assertEqual(str(compList), str(ref[1]))
+        #The components are yielded before the rest of the netlist is read
+        comps = streamComponents(io.StringIO("R1 A 0 R\nbad line\n"))
+        self.assertEqual(next(comps).getName(), 'R1')
+        with self.assertRaises(Error) as cm:
+            next(comps)
+        self.assertTrue('Line 2:' in str(cm.exception))
+        with self.assertRaises(Error) as cm:
+            netlistParser("R1 A 0 R\n* comment\nR1 A B R\n")
+        self.assertTrue('Line 3: R1: Duplicated device' in str(cm.exception))
+        with self.assertRaises(Error) as cm:
+            netlistParser("R1 A 0 R\nR2 A 0 R**\n")
+        self.assertTrue('Line 2: Unable to parse' in str(cm.exception))
+
+    ############################################################################
+    # Array-backed component store
+    ############################################################################
+    def testSTORE(self):
+        netlist = ("V1 IN  gnd VIN\n"
+                   "R1 IN  MID R\n"
+                   "R2 MID 0   R\n"
+                   "H1 OUT GND MID 0 rm\n"
+                   "C1 OUT 0   C1\n")
+        # Run test
+        (compDict, compList) = netlistParser(netlist)
+        (nJ, nNodes, nodesDict) = calcNodesnJ(compList)
+        arrays = compList.store.arrays()
+        #The numbering of the parser is the same of the loop over the devices
+        ref = calcNodesnJ(list(compList))
+
+        #Asserts
+        self.assertEqual((nJ, nNodes, nodesDict), ref)
+        self.assertEqual(nodesDict, {'IN': 0, 'gnd': -1, 'MID': 1, \
+                                     '0': -1, 'OUT': 2, 'GND': -1})
+        self.assertEqual(list(arrays['types']), [0, 3, 3, 6, 4])
+        self.assertEqual(arrays['nets'].shape, (5, 4))
+        self.assertEqual(list(arrays['e1']), [0, -1, -1, 1, 3])
+        self.assertEqual(list(arrays['e2']), [-1, -1, -1, 2, -1])
+        #Equal values share the same entry of the value table
+        self.assertEqual(arrays['vals'][1], arrays['vals'][2])
+        self.assertEqual(len(compList.store.values), 4)
+        self.assertEqual(compDict['H1'].getNodes(), ['OUT', 'GND', 'MID', '0'])
+        self.assertEqual(compDict['H1'].getE2Idx(), 2)
+        self.assertEqual(compDict['R1'].getE1Idx(), None)
+        self.assertEqual(compDict['C1'].getST(), si.Symbol('state_var_C1'))
+        self.assertEqual(compList[-1].getName(), 'C1')
+        self.assertEqual(list(compDict.keys()), ['V1', 'R1', 'R2', 'H1', 'C1'])
+        compDict['R2'].setValue('2*R')
+        self.assertEqual(compList[2].getValue(), 2*si.Symbol('R'))
+        self.assertEqual(compList[1].getValue(), si.Symbol('R'))
+        store = componentStore()
+        store.append('E1', ['A', '0', 'B', '0'], 'k')
+        self.assertEqual((store.nJ, store.nNodes), (1, 2))
+        with self.assertRaises(Error):
+            store.append('E1', ['A', '0', 'B', '0'], 'k')
+        with self.assertRaises(Error):
+            store.append('E2', ['A', '0'], 'k')
+
+    ############################################################################
+    # Lazy device values and their numeric evaluation
+    ############################################################################
+    def testVALUES(self):
+        netlist = ("V1 IN  0   VIN\n"
+                   "R1 IN  MID 1/gm2\n"
+                   "R2 MID 0   1/gm2\n"
+                   "C1 MID 0   cp2*(1+k)\n"
+                   "G1 MID 0   IN 0 sqrt(gm2)\n"
+                   "H1 OUT 0   MID 0 VIN**2/2\n")
+        params  = {'gm2': 4.0, 'cp2': 1e-12, 'k': 0.5, 'VIN': 3.0}
+        # Run test
+        (compDict, compList) = netlistParser(netlist)
+        store   = compList.store
+        #The values are shared and they aren't sympified while parsing
+        lazy    = [expr is None for expr in store.values]
+        P       = numericParams(params)
+        VIN     = si.Symbol('VIN')
+        values  = deviceValues(compList, P, [VIN], 1)
+        ref     = [symbolicValue(comp.getValue(), P, [VIN], 1, {VIN}) \
+                   for comp in compList]
+
+        #Asserts
+        self.assertEqual(len(store.texts), 5)
+        self.assertTrue(all(lazy))
+        self.assertEqual(compDict['R1'].getValueId(), \
+                         compDict['R2'].getValueId())
+        self.assertEqual(compDict['C1'].getNumericValue(params), 1.5e-12)
+        #sqrt isn't a parameter, so it must be evaluated by sympy
+        self.assertEqual(compDict['G1'].getNumericValue(params), None)
+        self.assertEqual(compDict['R1'].getNumericValue({}), None)
+        for (value, expected) in zip(values, ref):
+            self.assertAlmostEqual(getattr(value, 'val', value), \
+                                   getattr(expected, 'val', expected))
+        self.assertEqual(values[-1].grad, {1: 3.0})
+        self.assertEqual(compDict['R1'].getValue(), 1/si.Symbol('gm2'))
+        with self.assertRaises(Error):
+            netlistParser("R1 IN 0 R*/2\n")
+
+    ############################################################################
+    # Subcircuit definitions, instances and hierarchical names
+    ############################################################################
+    def testSUBCKT(self):
+        netlist = ("V1 in 0 VIN\n"
+                   "X1 in a cell\n"
+                   "X2 a b cell\n"
+                   "X3 b out pair  ; nested instance\n"
+                   "RL out gnd RL\n"
+                   ".SUBCKT cell p q\n"
+                   "R1 p m R\n"
+                   "C1 m 0 C\n"
+                   "G1 m2 0 m 0 gm\n"
+                   "R2 m2 0 Ro\n"
+                   "E1 q 0 m2 0 A  ; the port q is driven by a voltage source\n"
+                   ".ENDS cell\n"
+                   ".subckt pair p q\n"
+                   "X1 p t cell\n"
+                   "L1 t q L\n"
+                   ".ends\n")
+        outputs = ['Vnout', 'VnX1.m', 'IdX3.L1', 'VnX3.X1.m2', 'IdX2.E1']
+        params  = {'VIN': 1.0, 'R': 1e3, 'C': 1e-9, 'gm': 1e-3, 'Ro': 1e4, \
+                   'A': 2.0, 'RL': 1e3, 'L': 1e-6}
+        sub     = {si.Symbol(k): v for (k, v) in params.items()}
+        # Run test
+        with mock.patch.object(subckt, 'reduceSubcircuit', \
+                               wraps = subckt.reduceSubcircuit) as reduce:
+            hier = Circuit(netlist, simplify = 'none')
+            res  = hier.state_space(['VIN'], outputs)
+        flat = Circuit(netlist, simplify = 'none')
+        flat.comps = netlistParser(netlist, True)
+        ref  = flat.state_space(['VIN'], outputs)
+        num  = netlist2ss_numeric(netlist, ['VIN'], outputs, params)
+
+        #Asserts
+        #One reduction per definition, shared by the instances
+        self.assertEqual(reduce.call_count, 2)
+        self.assertTrue('reduce' in hier.times)
+        self.assertEqual(len(hier.getNodes()[2]), 6)
+        self.assertEqual(list(flat.getComponents()[0].keys())[2:5], \
+                         ['X1.R1', 'X1.C1', 'X1.G1'])
+        self.assertEqual(res[0].shape, (4, 4))
+        for (M, R, N) in zip(res[0:4], ref[0:4], num[0:4]):
+            M = np.array(M.xreplace(sub), dtype = float)
+            self.assertTrue(np.allclose(M, np.array(R.xreplace(sub), \
+                                                    dtype = float)))
+            self.assertTrue(np.allclose(M, N))
+        #The hash depends on the definitions
+        self.assertNotEqual(netlistHash(netlist), \
+                            netlistHash(netlist.replace('R2 m2 0 Ro', \
+                                                        'R2 m2 0 Rx')))
+        #The nets measured inside the instances are part of the cache key
+        cell = ("V1 in 0 VIN\n"
+                "X1 in 0 cell\n"
+                ".SUBCKT cell p q\n"
+                "R1 p m RA\n"
+                "R2 m q RB\n"
+                "R3 p k RC\n"
+                "R4 k q RD\n"
+                ".ENDS\n")
+        swap = cell.replace('p m RA', 'p k RA').replace('m q RB', 'k q RB') \
+                   .replace('p k RC', 'p m RC').replace('k q RD', 'm q RD')
+        tmp  = tempfile.mkdtemp()
+        netlist2ss(cell, ['VIN'], ['VnX1.m'], cache = tmp)
+        OP   = netlist2ss(swap, ['VIN'], ['VnX1.m'], cache = tmp)[4]
+        self.assertEqual(si.simplify(OP[0] - si.sympify('RD*VIN/(RC + RD)')), \
+                         0)
+        for (text, msg) in [("X1 a 0 foo\n", "Unknown subcircuit"), \
+                            ("X1 a 0 s\n.SUBCKT s p\nR1 p 0 R\n.ENDS\n", \
+                             "has 1 ports"), \
+                            (".SUBCKT s p\nR1 p 0 R\n", "Missing .ENDS"), \
+                            (".SUBCKT s p\nX1 p s\n.ENDS\n", \
+                             "instantiates itself"), \
+                            (".ENDS\n", "without .SUBCKT")]:
+            with self.assertRaises(Error) as ctx:
+                netlistParser(text)
+            self.assertTrue(msg in str(ctx.exception))
+
+    ############################################################################
+    # .PARAM lines and the params argument
+    ############################################################################
+    def testPARAM(self):
+        circuit = ("V1 in 0 VIN\n"
+                   "R1 in x R\n"
+                   "C1 x 0 C\n"
+                   "G1 x 0 x 0 gm\n"
+                   "L1 x out L\n"
+                   "RL out 0 2*R\n")
+        netlist = circuit + (".PARAM R=1e3 C = 2*k*R  ; comment\n"
+                             ".param k=1e-12 L=1.5e-6\n")
+        known   = {'R': 1000, 'k': si.Rational(1, 10**12), 'L': \
+                   si.Rational(3, 2*10**6)}
+        known['C'] = 2*known['k']*known['R']
+        sub     = {si.Symbol(k): v for (k, v) in known.items()}
+        # Run test
+        (compDict, compList) = netlistParser(netlist)
+        ref  = netlist2ss(circuit, ['VIN'], ['Vnout'], simplify = 'none')
+        res  = netlist2ss(netlist, ['VIN'], ['Vnout'], simplify = 'none')
+        keep = netlist2ss(netlist, ['VIN'], ['Vnout'], simplify = 'none', \
+                          params = {'R': None})
+        over = netlist2ss(netlist, ['VIN'], ['Vnout'], simplify = 'none', \
+                          params = {'R': 2000})
+        num  = netlist2ss_numeric(netlist, ['VIN'], ['Vnout'], \
+                                  {'VIN': 1.0, 'gm': 1e-3})
+
+        #Asserts
+        self.assertEqual(compList.store.params['C'], '2*k*R')
+        self.assertEqual({str(k): v for (k, v) in \
+                          compList.store.known.items()}, known)
+        self.assertEqual(compDict['C1'].getValue(), known['C'])
+        for (M, R) in zip(res, ref):
+            self.assertEqual(si.simplify(M - R.xreplace(sub)), \
+                             si.zeros(*M.shape))
+            self.assertFalse(M.has(si.Float))
+        self.assertEqual(res[0].free_symbols, {si.Symbol('gm')})
+        self.assertTrue(si.Symbol('R') in keep[0].free_symbols)
+        sub.update({si.Symbol('R'): 2000, si.Symbol('C'): 4*known['k']*1000})
+        self.assertEqual(si.simplify(over[0] - ref[0].xreplace(sub)), \
+                         si.zeros(*over[0].shape))
+        gm = {si.Symbol('gm'): si.Rational(1, 1000), si.Symbol('VIN'): 1}
+        for (M, N) in zip(res, num):
+            self.assertTrue(np.allclose(np.array(M.xreplace(gm), \
+                                                 dtype = float), N))
+        #The inputs must be symbolic
+        with self.assertRaises(Error):
+            netlist2ss(netlist + ".PARAM VIN=1\n", ['VIN'], ['Vnout'])
+        for (text, msg) in [(".PARAM R=1\n.PARAM R=2\n", "Duplicated"), \
+                            (".PARAM R=*2\n", "Unable to parse"), \
+                            (".PARAM R=2*C C=R\n", "depends on itself"), \
+                            (".SUBCKT s p\n.PARAM R=1\n.ENDS\n", \
+                             "inside subcircuits")]:
+            with self.assertRaises(Error) as ctx:
+                netlistParser(text)
+            self.assertTrue(msg in str(ctx.exception))
+
 if __name__ == '__main__':
     unittest.main()
     